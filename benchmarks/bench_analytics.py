@@ -0,0 +1,83 @@
+"""Сравнение векторной аналитики (server/analytics.py) с накоплением сумм в словаре.
+
+На синтетическом журнале каждая задача решается на Python и на NumPy:
+- totals - итоги по категориям: прежний способ ShowStat.collect_data (цикл по
+  транзакциям-словарям с накоплением итога в dict) против np.bincount
+- summary - итоги, средние, перцентили и крупнейшие транзакции:
+  analytics.category_summary без NumPy и с ним
+
+Отдельно показано время загрузки строк в колонки (TransactionColumns.from_rows),
+которое не входит в замеры вычислений.
+
+Запуск:
+    python benchmarks/bench_analytics.py --rows 1000000
+"""
+import argparse
+import os
+import sys
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+from bench_indexes import generate_rows
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "server"))
+
+
+def best_of(fn: Callable[[], Any], repeats: int) -> float:
+    """Возвращает лучшее время вызова fn в миллисекундах."""
+    best: float = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def dict_loop(transactions: List[Dict[str, Any]]) -> Dict[str, float]:
+    """Итоги по категориям накоплением в словаре, по одной транзакции за шаг."""
+    totals: Dict[str, float] = {}
+    for row in transactions:
+        totals[row["category"]] = totals.get(row["category"], 0) + row["amount"]
+    return totals
+
+
+def run(rows: int, repeats: int) -> None:
+    """Генерирует журнал и печатает время каждого способа."""
+    import analytics
+
+    np = analytics.load_numpy()
+    if np is None:
+        sys.exit("NumPy is not installed: pip install numpy")
+    data = [(transaction_id, amount, category)
+            for transaction_id, (amount, category, _, _, _) in enumerate(generate_rows(rows, minor_units=True), 1)]
+    transactions: List[Dict[str, Any]] = [{"id": transaction_id, "amount": amount / 100, "category": category}
+                                          for transaction_id, amount, category in data]
+
+    started = time.perf_counter()
+    columns = analytics.TransactionColumns.from_rows(data)
+    load_ms: float = (time.perf_counter() - started) * 1000
+    python_columns = analytics.TransactionColumns(list(columns.ids), list(columns.amounts),
+                                                  list(columns.codes), columns.categories)
+
+    # Задача -> (время на Python, время на NumPy)
+    results: Dict[str, Tuple[float, float]] = {
+        "totals (dict loop / bincount)": (
+            best_of(lambda: dict_loop(transactions), repeats),
+            best_of(lambda: np.bincount(columns.codes, weights=columns.amounts), repeats)),
+        "summary (python / numpy)": (
+            best_of(lambda: analytics._summary_python(
+                python_columns, analytics.PERCENTILES, analytics.TOP_TRANSACTIONS), repeats),
+            best_of(lambda: analytics.category_summary(columns), repeats)),
+    }
+    print(f"{rows} transactions, {len(columns.categories)} categories; "
+          f"loading columns took {load_ms:.0f} ms\n")
+    print(f"{'task':<32}{'python, ms':>12}{'numpy, ms':>12}{'speedup':>10}")
+    for name, (python_ms, numpy_ms) in results.items():
+        print(f"{name:<32}{python_ms:>12.1f}{numpy_ms:>12.1f}{python_ms / numpy_ms:>9.0f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000, help="размер синтетического журнала")
+    parser.add_argument("--repeats", type=int, default=5, help="сколько раз выполнять каждый способ")
+    args = parser.parse_args()
+    run(args.rows, args.repeats)
@@ -0,0 +1,230 @@
+"""Замер пропускной способности сервера при конкурентных чтениях и записях.
+
+Поднимает сервер из N процессов над временной базой и нагружает его
+параллельными клиентами. Сервер устроен как sync-воркеры gunicorn: общий
+слушающий сокет, в каждом процессе свое приложение create_app и свой пул
+соединений. Сравниваются конфигурации из CONFIGS: настройки SQLite по
+умолчанию (журнал отката), SQLITE_PRAGMAS из app.py (WAL, synchronous=NORMAL,
+busy_timeout, mmap_size, cache_size), многопоточные процессы (как gunicorn
+--threads) и многопоточные процессы с групповой фиксацией вставок.
+
+Нагрузки:
+- read - GET /api/stats и GET /api/transactions со случайными параметрами
+  (чтобы не попадать в кэш ответов)
+- write - POST /api/transactions
+- mixed - 80% чтений и 20% записей
+
+С --ledgers N клиенты распределяются по N журналам (журнал по умолчанию и
+N-1 журналов /api/ledgers/<id>/ со своими файлами SQLite, см. server/ledgers.py):
+записи в разные журналы не ждут общую блокировку записи.
+
+Запуск:
+    python benchmarks/bench_concurrency.py --rows 100000 --workers 1,2,4 --clients 16 --duration 10
+    python benchmarks/bench_concurrency.py --configs threads,group --workloads write
+    python benchmarks/bench_concurrency.py --configs tuned --workloads write --ledgers 1,4
+"""
+import argparse
+import datetime as dt
+import logging
+import multiprocessing
+import os
+import random
+import socket
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Tuple
+
+import requests
+
+from bench_indexes import CATEGORIES, DAYS, START_DATE, TYPES, generate_rows
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "server"))
+
+WORKLOADS: Dict[str, float] = {"read": 0.0, "write": 1.0, "mixed": 0.2}  # Нагрузка -> доля записей
+# Конфигурация -> (параметры create_app, обрабатывает ли процесс сервера запросы в нескольких потоках)
+CONFIGS: Dict[str, Tuple[Dict[str, Any], bool]] = {
+    "default": ({"SQLITE_PRAGMAS": {}}, False),
+    "tuned": ({}, False),
+    "threads": ({}, True),
+    "group": ({"GROUP_COMMIT": True}, True),
+}
+
+
+def seed(path: str, rows: int) -> None:
+    """Создает базу с текущей схемой и синтетическим журналом (в режиме журнала отката)."""
+    from app import create_app, db, upgrade
+
+    app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}", "SQLITE_PRAGMAS": {}})
+    with app.app_context():
+        upgrade(db.engine, db.metadata)
+        db.engine.dispose()
+    with sqlite3.connect(path) as conn:
+        conn.executemany(
+            "INSERT INTO transactions (amount, category, date, type, description) VALUES (?, ?, ?, ?, ?)",
+            generate_rows(rows, minor_units=True)
+        )
+
+
+def serve(path: str, overrides: Dict[str, Any], threaded: bool, fd: int) -> None:
+    """Обслуживает запросы на общем сокете fd в отдельном процессе."""
+    from werkzeug.serving import make_server
+
+    from app import create_app
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    config: Dict[str, Any] = {"SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}", **overrides}
+    make_server("127.0.0.1", 0, create_app(config), threaded=threaded, fd=fd).serve_forever()
+
+
+def start_server(path: str, workers: int, overrides: Dict[str, Any],
+                 threaded: bool) -> Tuple[List[multiprocessing.Process], int]:
+    """Запускает workers процессов сервера и возвращает их вместе с портом."""
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(128)
+    context = multiprocessing.get_context("fork")
+    processes: List[multiprocessing.Process] = [
+        context.Process(target=serve, args=(path, overrides, threaded, listener.fileno()), daemon=True)
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    port: int = listener.getsockname()[1]
+    listener.close()  # Сокет остается открытым в дочерних процессах
+    return processes, port
+
+
+def random_read(session: requests.Session, api_url: str, rnd: random.Random, rows: int) -> requests.Response:
+    """Выполняет случайный читающий запрос."""
+    if rnd.random() < 0.5:
+        start = START_DATE + dt.timedelta(days=rnd.randrange(DAYS))
+        end = start + dt.timedelta(days=rnd.randrange(1, 365))
+        return session.get(f"{api_url}/stats", params={"from": start.isoformat(), "to": end.isoformat()})
+    return session.get(f"{api_url}/transactions",
+                       params={"offset": rnd.randrange(max(rows, 1)), "limit": 50})
+
+
+def random_write(session: requests.Session, api_url: str, rnd: random.Random) -> requests.Response:
+    """Добавляет случайную транзакцию."""
+    date = START_DATE + dt.timedelta(days=rnd.randrange(DAYS))
+    return session.post(f"{api_url}/transactions", json={
+        "amount": round(rnd.uniform(1, 10000), 2),
+        "category": rnd.choice(CATEGORIES),
+        "date": date.isoformat(),
+        "type": rnd.choice(TYPES),
+    })
+
+
+def load(port: int, clients: int, duration: float, write_share: float, rows: int,
+         ledgers: int = 1) -> Dict[str, float]:
+    """Нагружает сервер clients потоками в течение duration секунд, распределяя их по ledgers журналам."""
+    api_urls: List[str] = [f"http://127.0.0.1:{port}/api"] + [
+        f"http://127.0.0.1:{port}/api/ledgers/bench{n}" for n in range(1, ledgers)
+    ]
+    latencies: List[float] = []
+    errors: List[int] = [0]
+    lock = threading.Lock()
+    deadline: float = time.perf_counter() + duration
+
+    def client(seed: int) -> None:
+        rnd = random.Random(seed)
+        api_url: str = api_urls[seed % len(api_urls)]
+        own_latencies: List[float] = []
+        own_errors: int = 0
+        with requests.Session() as session:
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    if rnd.random() < write_share:
+                        response = random_write(session, api_url, rnd)
+                    else:
+                        response = random_read(session, api_url, rnd, rows)
+                    failed = response.status_code >= 500
+                except requests.RequestException:
+                    failed = True
+                own_latencies.append(time.perf_counter() - started)
+                own_errors += failed
+        with lock:
+            latencies.extend(own_latencies)
+            errors[0] += own_errors
+
+    threads = [threading.Thread(target=client, args=(seed,)) for seed in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else [0.0] * 99
+    return {
+        "requests": len(latencies),
+        "errors": errors[0],
+        "rps": len(latencies) / duration,
+        "p50_ms": quantiles[49] * 1000,
+        "p95_ms": quantiles[94] * 1000,
+    }
+
+
+def wait_ready(port: int, timeout: float = 30.0) -> None:
+    """Ждет, пока сервер начнет отвечать."""
+    deadline = time.perf_counter() + timeout
+    while True:
+        try:
+            requests.get(f"http://127.0.0.1:{port}/api/stats", timeout=1)
+            return
+        except requests.RequestException:
+            if time.perf_counter() > deadline:
+                raise
+            time.sleep(0.1)
+
+
+def run(rows: int, workers_list: List[int], clients: int, duration: float,
+        configs: List[str], workloads: List[str], ledgers_list: List[int]) -> None:
+    """Прогоняет нагрузки для каждой комбинации конфигурации, числа процессов и числа журналов."""
+    with tempfile.TemporaryDirectory() as tmp:
+        template: str = os.path.join(tmp, "template.db")
+        seed(template, rows)
+        print(f"{'config':<9} {'workers':>7} {'ledgers':>7} {'workload':<8} "
+              f"{'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7}")
+        for label in configs:
+            overrides, threaded = CONFIGS[label]
+            for workers in workers_list:
+                for ledgers in ledgers_list:
+                    for workload in workloads:
+                        write_share: float = WORKLOADS[workload]
+                        # Каждый прогон на свежей копии: WAL сохраняется в файле базы
+                        name: str = f"{label}-{workers}-{ledgers}-{workload}"
+                        path: str = os.path.join(tmp, f"{name}.db")
+                        with open(template, "rb") as src, open(path, "wb") as dst:
+                            dst.write(src.read())
+                        # Остальные журналы создаются пустыми при первом запросе к ним
+                        ledger_config: Dict[str, Any] = {"LEDGER_DIR": os.path.join(tmp, f"{name}-ledgers"),
+                                                         "LEDGER_AUTO_CREATE": True}
+                        processes, port = start_server(path, workers, {**overrides, **ledger_config}, threaded)
+                        try:
+                            wait_ready(port)
+                            result = load(port, clients, duration, write_share, rows, ledgers)
+                        finally:
+                            for process in processes:
+                                process.terminate()
+                                process.join()
+                        print(f"{label:<9} {workers:>7} {ledgers:>7} {workload:<8} {result['rps']:>8.0f} "
+                              f"{result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f} {result['errors']:>7}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000, help="количество транзакций в базе")
+    parser.add_argument("--workers", default="1,2,4", help="количество процессов сервера через запятую")
+    parser.add_argument("--clients", type=int, default=16, help="количество параллельных клиентов")
+    parser.add_argument("--duration", type=float, default=10.0, help="длительность каждой нагрузки, с")
+    parser.add_argument("--configs", default=",".join(CONFIGS), help="конфигурации сервера через запятую")
+    parser.add_argument("--workloads", default=",".join(WORKLOADS), help="нагрузки через запятую")
+    parser.add_argument("--ledgers", default="1", help="количество журналов, по которым распределяются клиенты, "
+                                                      "через запятую")
+    args = parser.parse_args()
+    run(args.rows, [int(workers) for workers in args.workers.split(",")], args.clients, args.duration,
+        args.configs.split(","), args.workloads.split(","), [int(ledgers) for ledgers in args.ledgers.split(",")])
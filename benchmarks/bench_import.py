@@ -0,0 +1,54 @@
+"""Замер скорости потокового импорта CSV (import_csv) в локальную базу SQLite.
+
+Генерирует временный CSV-файл с синтетическими транзакциями и импортирует
+его во временную базу тем же конвейером, что и POST /api/transactions/import.
+Цель - не меньше 1 000 000 строк в минуту.
+
+Запуск:
+    python benchmarks/bench_import.py --rows 1000000
+"""
+import argparse
+import csv
+import os
+import resource
+import sys
+import tempfile
+import time
+from typing import Any, Dict
+
+from bench_indexes import generate_rows
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "server"))
+
+
+def run(rows: int, chunk_size: int) -> None:
+    """Генерирует CSV, импортирует его и печатает скорость."""
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "statement.csv")
+        with open(csv_path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["amount", "category", "date", "type", "description"])
+            writer.writerows(generate_rows(rows))
+
+        from app import create_app, db, import_csv, upgrade
+
+        app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.path.join(tmp, 'bench.db')}"})
+        with app.app_context():
+            upgrade(db.engine, db.metadata)
+            started = time.perf_counter()
+            with open(csv_path, encoding="utf-8", newline="") as lines:
+                report: Dict[str, Any] = import_csv(lines, chunk_size=chunk_size)
+            elapsed = time.perf_counter() - started
+            db.engine.dispose()
+
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"imported {report['imported']} rows ({report['failed']} failed) in {elapsed:.1f}s")
+    print(f"throughput: {report['imported'] / elapsed * 60:,.0f} rows/min, peak RSS: {peak_rss_mb:.0f} MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000, help="количество строк в CSV")
+    parser.add_argument("--chunk-size", type=int, default=20000, help="строк на один коммит")
+    args = parser.parse_args()
+    run(args.rows, args.chunk_size)
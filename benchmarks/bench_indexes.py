@@ -0,0 +1,140 @@
+"""Сравнение старой схемы (строковая дата без индексов) и текущей схемы Transaction.
+
+Создает две временные базы SQLite с одинаковым синтетическим журналом
+и замеряет выборку по диапазону дат и удаление по (category, date, type).
+
+Запуск:
+    python benchmarks/bench_indexes.py --rows 1000000
+"""
+import argparse
+import datetime as dt
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, Iterator, List, Tuple, Union
+
+from sqlalchemy import create_engine
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "server"))
+
+LEGACY_SCHEMA: str = """
+    CREATE TABLE transactions (
+        id INTEGER NOT NULL,
+        amount FLOAT NOT NULL,
+        category VARCHAR NOT NULL,
+        date VARCHAR NOT NULL,
+        type VARCHAR NOT NULL,
+        description VARCHAR NOT NULL,
+        PRIMARY KEY (id)
+    )
+"""
+CATEGORIES: List[str] = [f"Категория {i}" for i in range(50)]
+TYPES: List[str] = ["доход", "расход"]
+START_DATE: dt.date = dt.date(2015, 1, 1)
+DAYS: int = 3650
+# Слова описаний: частые и редкие, чтобы замерять полнотекстовый поиск
+DESCRIPTION_WORDS: List[str] = [
+    "оплата", "покупка", "перевод", "кофе", "продукты", "такси", "аренда", "зарплата", "подписка", "кафе",
+    "аптека", "бензин", "подарок", "кино", "ремонт", "связь", "книги", "спорт", "одежда", "налог",
+] + [f"слово{i}" for i in range(2000)]
+
+
+def generate_rows(count: int, seed: int = 42,
+                  minor_units: bool = False) -> Iterator[Tuple[Union[float, int], str, str, str, str]]:
+    """Генерирует синтетические транзакции (amount, category, date, type, description).
+
+    Сумма - в рублях (как в CSV и API) или, при minor_units, в копейках (как в таблице transactions).
+    """
+    rnd = random.Random(seed)
+    for _ in range(count):
+        date = START_DATE + dt.timedelta(days=rnd.randrange(DAYS))
+        kopecks = rnd.randrange(100, 1_000_001)
+        yield (kopecks if minor_units else kopecks / 100, rnd.choice(CATEGORIES), date.isoformat(),
+               rnd.choice(TYPES), random_description(rnd))
+
+
+def random_description(rnd: random.Random) -> str:
+    """Генерирует описание из 1-4 слов: частые слова встречаются чаще редких."""
+    return " ".join(DESCRIPTION_WORDS[min(int(rnd.paretovariate(0.5)) - 1, len(DESCRIPTION_WORDS) - 1)]
+                    for _ in range(rnd.randint(1, 4)))
+
+
+def seed_legacy(path: str, rows: int) -> None:
+    """Создает базу со старой схемой."""
+    with sqlite3.connect(path) as conn:
+        conn.execute(LEGACY_SCHEMA)
+        conn.executemany(
+            "INSERT INTO transactions (amount, category, date, type, description) VALUES (?, ?, ?, ?, ?)",
+            generate_rows(rows)
+        )
+
+
+def seed_current(path: str, rows: int) -> None:
+    """Создает базу с текущей схемой модели Transaction (DATE и индексы)."""
+    from app import Transaction
+
+    engine = create_engine(f"sqlite:///{path}")
+    Transaction.metadata.create_all(engine)
+    engine.dispose()
+    with sqlite3.connect(path) as conn:
+        conn.executemany(
+            "INSERT INTO transactions (amount, category, date, type, description) VALUES (?, ?, ?, ?, ?)",
+            generate_rows(rows, minor_units=True)
+        )
+
+
+def measure(conn: sqlite3.Connection, sql: str, params: List[Tuple], rollback: bool = False) -> float:
+    """Возвращает среднее время выполнения запроса в миллисекундах."""
+    started = time.perf_counter()
+    for args in params:
+        conn.execute(sql, args).fetchall()
+        if rollback:
+            conn.rollback()
+    return (time.perf_counter() - started) / len(params) * 1000
+
+
+def run(rows: int, repeats: int) -> None:
+    """Заполняет обе базы и печатает сравнение."""
+    rnd = random.Random(7)
+    ranges: List[Tuple[str, str]] = []
+    keys: List[Tuple[str, str, str]] = []
+    for _ in range(repeats):
+        start = START_DATE + dt.timedelta(days=rnd.randrange(DAYS - 31))
+        ranges.append((start.isoformat(), (start + dt.timedelta(days=30)).isoformat()))
+        keys.append((rnd.choice(CATEGORIES), start.isoformat(), rnd.choice(TYPES)))
+
+    queries: Dict[str, Callable[[sqlite3.Connection], float]] = {
+        "range select (30 days)": lambda conn: measure(
+            conn, "SELECT count(*), sum(amount) FROM transactions WHERE date BETWEEN ? AND ?", ranges),
+        "stats by type/category (30 days)": lambda conn: measure(
+            conn, "SELECT type, category, sum(amount) FROM transactions "
+                  "WHERE date BETWEEN ? AND ? GROUP BY type, category", ranges),
+        "delete by (category, date, type)": lambda conn: measure(
+            conn, "DELETE FROM transactions WHERE category = ? AND date = ? AND type = ?", keys, rollback=True),
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results: Dict[str, Dict[str, float]] = {}
+        for name, seed in (("legacy", seed_legacy), ("current", seed_current)):
+            path = os.path.join(tmp, f"{name}.db")
+            started = time.perf_counter()
+            seed(path, rows)
+            print(f"{name}: seeded {rows} rows in {time.perf_counter() - started:.1f}s")
+            with sqlite3.connect(path) as conn:
+                results[name] = {query: bench(conn) for query, bench in queries.items()}
+
+    print(f"\n{'query':<36}{'legacy, ms':>14}{'current, ms':>14}{'speedup':>10}")
+    for query in queries:
+        legacy, current = results["legacy"][query], results["current"][query]
+        print(f"{query:<36}{legacy:>14.2f}{current:>14.2f}{legacy / current:>9.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000, help="размер синтетического журнала")
+    parser.add_argument("--repeats", type=int, default=20, help="сколько раз выполнять каждый запрос")
+    args = parser.parse_args()
+    run(args.rows, args.repeats)
@@ -0,0 +1,161 @@
+"""Замер времени запуска сервера и клиента с отчетом python -X importtime.
+
+Каждый сценарий выполняется в отдельном процессе интерпретатора (холодный
+запуск): время - от запуска процесса до его завершения, медиана по --repeats
+прогонам. Затем сценарий выполняется еще раз с -X importtime, и отчет
+интерпретатора о времени импорта сворачивается по пакетам верхнего уровня
+(сумма собственного времени модулей пакета): видно, какие зависимости
+задерживают появление главного окна и готовность API.
+
+Сценарии:
+- python - пустой интерпретатор (нижняя граница для остальных сценариев)
+- server-import - import app
+- server-ready - create_app, схема пустой базы и первый GET /api/stats
+- client-import - import main
+- client-window - создание и отрисовка главного окна (нужен дисплей)
+
+Клиенту подставляется временный домашний каталог, чтобы не трогать
+локальную копию журнала и outbox пользователя.
+
+Запуск:
+    python benchmarks/bench_startup.py --repeats 5 --top 10
+    python benchmarks/bench_startup.py --scenarios server-import,server-ready --output startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+ROOT: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+SERVER_DIR: str = os.path.join(ROOT, "server")
+CLIENT_DIR: str = os.path.join(ROOT, "client")
+IMPORT_TIME_PREFIX: str = "import time:"
+
+SERVER_READY: str = """
+import os, sys
+from app import create_app, db
+from migrations import upgrade
+app = create_app({"SQLALCHEMY_DATABASE_URI": "sqlite:///" + os.path.join(sys.argv[1], "startup.db"),
+                  "LEDGER_DIR": os.path.join(sys.argv[1], "ledgers"), "MAINTENANCE": False})
+with app.app_context():
+    upgrade(db.engine, db.metadata)
+assert app.test_client().get("/api/stats").status_code == 200
+"""
+CLIENT_WINDOW: str = """
+import main
+app = main.Application()
+app.update()
+app.on_close()
+"""
+# Сценарий -> (рабочий каталог, код для python -c)
+SCENARIOS: Dict[str, Tuple[str, str]] = {
+    "python": (ROOT, "pass"),
+    "server-import": (SERVER_DIR, "import app"),
+    "server-ready": (SERVER_DIR, SERVER_READY),
+    "client-import": (CLIENT_DIR, "import main"),
+    "client-window": (CLIENT_DIR, CLIENT_WINDOW),
+}
+
+
+def parse_import_times(report: str) -> List[Tuple[str, int, int]]:
+    """Разбирает отчет -X importtime.
+
+    Args:
+        report: Вывод интерпретатора в stderr (строки вида
+            "import time: self [us] | cumulative | imported package").
+
+    Returns:
+        List[Tuple[str, int, int]]: (модуль, собственное время, суммарное время) в микросекундах.
+    """
+    modules: List[Tuple[str, int, int]] = []
+    for line in report.splitlines():
+        if not line.startswith(IMPORT_TIME_PREFIX):
+            continue
+        own, cumulative, name = line[len(IMPORT_TIME_PREFIX):].split("|", 2)
+        if not own.strip().isdigit():  # Строка заголовка
+            continue
+        modules.append((name.strip(), int(own), int(cumulative)))
+    return modules
+
+
+def by_package(modules: List[Tuple[str, int, int]]) -> Dict[str, float]:
+    """Собственное время импорта модулей, сложенное по пакетам верхнего уровня, в мс (по убыванию)."""
+    totals: Dict[str, int] = {}
+    for name, own, _ in modules:
+        package: str = name.split(".", 1)[0]
+        totals[package] = totals.get(package, 0) + own
+    return {package: own / 1000 for package, own in sorted(totals.items(), key=lambda item: -item[1])}
+
+
+def run_once(scenario: str, tmp: str, import_time: bool = False) -> Tuple[float, subprocess.CompletedProcess]:
+    """Выполняет сценарий в новом процессе и возвращает время в мс и результат процесса."""
+    cwd, code = SCENARIOS[scenario]
+    env: Dict[str, str] = {**os.environ, "HOME": tmp, "PYTHONDONTWRITEBYTECODE": "1"}
+    command: List[str] = [sys.executable] + (["-X", "importtime"] if import_time else []) + ["-c", code, tmp]
+    started: float = time.perf_counter()
+    process = subprocess.run(command, cwd=cwd, env=env, capture_output=True, text=True)
+    return (time.perf_counter() - started) * 1000, process
+
+
+def measure(scenario: str, repeats: int, top: int) -> Dict[str, Any]:
+    """Замеряет сценарий: медиана и минимум времени запуска и импорт по пакетам."""
+    timings: List[float] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for repeat in range(repeats):
+            run_dir: str = os.path.join(tmp, str(repeat))  # Каждый прогон - с пустой базой и пустым HOME
+            os.makedirs(run_dir)
+            elapsed, process = run_once(scenario, run_dir)
+            if process.returncode != 0:
+                error: str = (process.stderr.strip().splitlines() or ["exit code %d" % process.returncode])[-1]
+                return {"scenario": scenario, "error": error}
+            timings.append(elapsed)
+        profile_dir: str = os.path.join(tmp, "importtime")
+        os.makedirs(profile_dir)
+        _, process = run_once(scenario, profile_dir, import_time=True)
+    modules: List[Tuple[str, int, int]] = parse_import_times(process.stderr)
+    packages: Dict[str, float] = by_package(modules)
+    return {
+        "scenario": scenario,
+        "median_ms": statistics.median(timings),
+        "min_ms": min(timings),
+        "import_ms": sum(own for _, own, _ in modules) / 1000,
+        "modules": len(modules),
+        "top_packages": dict(list(packages.items())[:top]),
+    }
+
+
+def run(scenarios: List[str], repeats: int, top: int, output: Optional[str]) -> None:
+    """Замеряет сценарии, печатает таблицу и пакеты с наибольшим временем импорта."""
+    results: List[Dict[str, Any]] = []
+    print(f"{'scenario':<14} {'median ms':>10} {'min ms':>8} {'import ms':>10} {'modules':>8}")
+    for scenario in scenarios:
+        result: Dict[str, Any] = measure(scenario, repeats, top)
+        results.append(result)
+        if "error" in result:
+            print(f"{scenario:<14} skipped: {result['error']}")
+            continue
+        print(f"{scenario:<14} {result['median_ms']:>10.1f} {result['min_ms']:>8.1f} "
+              f"{result['import_ms']:>10.1f} {result['modules']:>8}")
+    for result in results:
+        if result.get("top_packages"):
+            print(f"\n{result['scenario']}: импорт по пакетам, мс")
+            for package, own in result["top_packages"].items():
+                print(f"  {package:<24} {own:>8.1f}")
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="сценарии через запятую")
+    parser.add_argument("--repeats", type=int, default=5, help="количество прогонов каждого сценария")
+    parser.add_argument("--top", type=int, default=10, help="сколько пакетов показывать в отчете об импорте")
+    parser.add_argument("--output", help="файл для JSON-отчета")
+    args = parser.parse_args()
+    run(args.scenarios.split(","), args.repeats, args.top, args.output)
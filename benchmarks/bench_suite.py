@@ -0,0 +1,352 @@
+"""Воспроизводимый набор замеров производительности API и клиента.
+
+Для каждого размера журнала создает временную базу SQLite с синтетическими
+транзакциями и замеряет:
+- все маршруты server/app.py через тестовый клиент Flask (без сети)
+- те же маршруты через локальный HTTP-сервер
+- функции FinanceClient из client/api_client.py
+- ShowStat.collect_data из client/main.py (если доступны tkinter и matplotlib)
+
+Для каждого сценария считаются p50/p95/p99 задержки в миллисекундах и
+пропускная способность при последовательных запросах. Каждый размер
+замеряется в отдельном процессе, поэтому пиковый RSS относится только к нему.
+Результат печатается (или записывается в --output) в JSON, а --compare
+сравнивает его с результатом предыдущего прогона.
+
+Запуск:
+    python benchmarks/bench_suite.py --sizes 10000 --output before.json
+    python benchmarks/bench_suite.py --sizes 10000 --compare before.json
+    python benchmarks/bench_suite.py --sizes 10000,1000000,10000000 --repeats 50
+"""
+import argparse
+import csv
+import datetime as dt
+import io
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import types
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import requests
+
+from bench_concurrency import seed
+from bench_indexes import CATEGORIES, DAYS, DESCRIPTION_WORDS, START_DATE, TYPES, generate_rows, random_description
+
+ROOT: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "server"))
+sys.path.insert(0, os.path.join(ROOT, "client"))
+
+FULL_SCAN_LIMIT: int = 1_000_000  # Больше этого размера сценарии, читающие весь журнал, пропускаются
+FULL_SCAN_REPEATS: int = 3  # Сколько раз повторяются сценарии, читающие весь журнал
+REGRESSION_THRESHOLD: float = 1.2  # --compare отмечает сценарии, чей p50 вырос больше чем в 1.2 раза
+
+# Запрос сценария: (метод, путь, параметры query string, JSON-тело, сырое тело, заголовки)
+Request = Tuple[str, str, Optional[Dict[str, Any]], Any, Optional[str], Optional[Dict[str, str]]]
+
+
+def summarize(samples: List[float], elapsed: float) -> Dict[str, float]:
+    """Считает перцентили задержки (мс) и пропускную способность по замерам в секундах."""
+    if len(samples) > 1:
+        quantiles = statistics.quantiles(samples, n=100, method="inclusive")
+        p50, p95, p99 = quantiles[49], quantiles[94], quantiles[98]
+    else:
+        p50 = p95 = p99 = samples[0]
+    return {
+        "requests": len(samples),
+        "p50_ms": round(p50 * 1000, 3),
+        "p95_ms": round(p95 * 1000, 3),
+        "p99_ms": round(p99 * 1000, 3),
+        "throughput_rps": round(len(samples) / elapsed, 1),
+    }
+
+
+def time_calls(fn: Callable[[], Any], repeats: int) -> Dict[str, float]:
+    """Вызывает fn repeats раз подряд и возвращает сводку задержек."""
+    samples: List[float] = []
+    started = time.perf_counter()
+    for _ in range(repeats):
+        call_started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - call_started)
+    return summarize(samples, time.perf_counter() - started)
+
+
+def random_row(rnd: random.Random) -> Dict[str, Any]:
+    """Генерирует транзакцию для запросов на запись."""
+    date = START_DATE + dt.timedelta(days=rnd.randrange(DAYS))
+    return {"amount": round(rnd.uniform(1, 10000), 2), "category": rnd.choice(CATEGORIES),
+            "date": date.isoformat(), "type": rnd.choice(TYPES), "description": random_description(rnd)}
+
+
+def random_range(rnd: random.Random) -> Dict[str, str]:
+    """Генерирует случайный диапазон дат до года."""
+    start = START_DATE + dt.timedelta(days=rnd.randrange(DAYS))
+    return {"from": start.isoformat(), "to": (start + dt.timedelta(days=rnd.randrange(1, 365))).isoformat()}
+
+
+def csv_body(rows: int, seed_value: int) -> str:
+    """Формирует CSV для POST /api/transactions/import."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["amount", "category", "date", "type", "description"])
+    writer.writerows(generate_rows(rows, seed_value))
+    return buffer.getvalue()
+
+
+def route_scenarios(rows: int) -> Dict[str, Tuple[Callable[[random.Random], Request], bool]]:
+    """Сценарии для всех маршрутов API: имя -> (генератор запроса, читает ли весь журнал).
+
+    Параметры выбираются случайно, чтобы запросы не попадали в кэш ответов.
+    Сначала идут чтения, затем записи.
+    """
+    import_body: str = csv_body(1000, 1)
+    return {
+        "GET /api/transactions?after_id&limit=100": (lambda rnd: (
+            "GET", "/api/transactions", {"after_id": rnd.randrange(rows), "limit": 100}, None, None, None), False),
+        "GET /api/transactions?sort=amount&offset&limit=100": (lambda rnd: (
+            "GET", "/api/transactions",
+            {"sort": "amount", "order": "desc", "offset": rnd.randrange(rows), "limit": 100}, None, None, None), False),
+        "GET /api/transactions?category&from&to&limit=100": (lambda rnd: (
+            "GET", "/api/transactions",
+            {"category": rnd.choice(CATEGORIES), "limit": 100, **random_range(rnd)}, None, None, None), False),
+        "GET /api/transactions?format=columnar&limit=1000": (lambda rnd: (
+            "GET", "/api/transactions",
+            {"format": "columnar", "after_id": rnd.randrange(rows), "limit": 1000}, None, None, None), False),
+        "GET /api/transactions?format=ndjson&limit=1000": (lambda rnd: (
+            "GET", "/api/transactions",
+            {"format": "ndjson", "after_id": rnd.randrange(rows), "limit": 1000}, None, None, None), False),
+        "GET /api/transactions (full)": (lambda rnd: (
+            "GET", "/api/transactions", {"after_id": rnd.randrange(2)}, None, None, None), True),
+        "GET /api/stats": (lambda rnd: (
+            "GET", "/api/stats", None, None, None, None), False),
+        "GET /api/stats?from&to": (lambda rnd: (
+            "GET", "/api/stats", random_range(rnd), None, None, None), False),
+        "GET /api/transactions/search?q&limit=50": (lambda rnd: (
+            "GET", "/api/transactions/search", {"q": rnd.choice(DESCRIPTION_WORDS)[:4], "limit": 50},
+            None, None, None), False),
+        "GET /api/transactions/search?q&min_amount&from&to": (lambda rnd: (
+            "GET", "/api/transactions/search",
+            {"q": rnd.choice(DESCRIPTION_WORDS), "min_amount": rnd.randrange(5000), **random_range(rnd)},
+            None, None, None), False),
+        "GET /api/timeseries?bucket&category&from&to": (lambda rnd: (
+            "GET", "/api/timeseries",
+            {"bucket": rnd.choice(("day", "week", "month")), "category": rnd.choice(CATEGORIES),
+             **random_range(rnd)}, None, None, None), False),
+        "GET /api/transactions/export?format=csv&category&from&to": (lambda rnd: (
+            "GET", "/api/transactions/export",
+            {"format": "csv", "category": rnd.choice(CATEGORIES), **random_range(rnd)}, None, None, None), False),
+        "GET /api/transactions/export?format=xlsx&category&from&to": (lambda rnd: (
+            "GET", "/api/transactions/export",
+            {"format": "xlsx", "category": rnd.choice(CATEGORIES), **random_range(rnd)}, None, None, None), False),
+        "GET /api/transactions/export?format=csv (full)": (lambda rnd: (
+            "GET", "/api/transactions/export", {"format": "csv"}, None, None, None), True),
+        "GET /api/changes?since&limit=1000": (lambda rnd: (
+            "GET", "/api/changes", {"since": rnd.randrange(rows), "limit": 1000}, None, None, None), False),
+        "POST /api/transactions": (lambda rnd: (
+            "POST", "/api/transactions", None, random_row(rnd), None, None), False),
+        "POST /api/transactions/batch (100)": (lambda rnd: (
+            "POST", "/api/transactions/batch", None, [random_row(rnd) for _ in range(100)], None, None), False),
+        "POST /api/transactions/batch (100, idempotency_key)": (lambda rnd: (
+            "POST", "/api/transactions/batch", None,
+            [{**random_row(rnd), "idempotency_key": f"{rnd.getrandbits(64):016x}"} for _ in range(100)],
+            None, None), False),
+        "POST /api/transactions/import (1000)": (lambda rnd: (
+            "POST", "/api/transactions/import", None, None, import_body, {"Content-Type": "text/csv"}), False),
+        "DELETE /api/transactions/batch (100 ids)": (lambda rnd: (
+            "DELETE", "/api/transactions/batch", None,
+            {"ids": [rnd.randrange(1, rows + 1) for _ in range(100)]}, None, None), False),
+        "DELETE /api/transactions/range (category, type)": (lambda rnd: (
+            "DELETE", "/api/transactions/range", None,
+            {"category": rnd.choice(CATEGORIES), "type": rnd.choice(TYPES), **random_range(rnd)}, None, None), False),
+        "DELETE /api/transactions": (lambda rnd: (
+            "DELETE", "/api/transactions", None,
+            {k: v for k, v in random_row(rnd).items() if k in ("category", "date", "type")}, None, None), False),
+    }
+
+
+def run_routes(send: Callable[[Request], None], rows: int, repeats: int) -> Dict[str, Any]:
+    """Замеряет все сценарии маршрутов через функцию отправки запроса send."""
+    results: Dict[str, Any] = {}
+    rnd = random.Random(42)
+    for name, (make_request, full_scan) in route_scenarios(rows).items():
+        if full_scan and rows > FULL_SCAN_LIMIT:
+            results[name] = {"skipped": f"ledger is larger than {FULL_SCAN_LIMIT} rows"}
+            continue
+        results[name] = time_calls(lambda: send(make_request(rnd)), FULL_SCAN_REPEATS if full_scan else repeats)
+    return results
+
+
+def run_api_client(client: Any, rows: int, repeats: int) -> Dict[str, Any]:
+    """Замеряет функции FinanceClient."""
+    rnd = random.Random(43)
+    scenarios: Dict[str, Tuple[Callable[[], Any], bool]] = {
+        "get_transactions_page(limit=100)": (lambda: client.get_transactions_page(rnd.randrange(rows), 100), False),
+        "get_transaction_columns(limit=1000)": (
+            lambda: client.get_transaction_columns(rnd.randrange(rows), 1000), False),
+        "iter_transactions (10 pages of 1000)": (
+            lambda: list(islice(client.iter_transactions(1000), 10000)), False),
+        "stream_transactions (full)": (lambda: sum(1 for _ in client.stream_transactions()), True),
+        "get_stats": (lambda: client.get_stats(**dict(zip(("date_from", "date_to"),
+                                                              random_range(rnd).values()))), False),
+        "get_timeseries(month)": (lambda: client.get_timeseries("month", category=rnd.choice(CATEGORIES)), False),
+        "get_changes(limit=1000)": (lambda: client.get_changes(rnd.randrange(rows), 1000), False),
+        "add_transaction": (lambda: client.add_transaction(**{
+            ("transaction_type" if k == "type" else k): v for k, v in random_row(rnd).items()}), False),
+        "add_transactions(100)": (lambda: client.add_transactions([random_row(rnd) for _ in range(100)]), False),
+        "delete_transaction": (lambda: client.delete_transaction(
+            rnd.choice(CATEGORIES), random_row(rnd)["date"], rnd.choice(TYPES)), False),
+    }
+    results: Dict[str, Any] = {}
+    for name, (fn, full_scan) in scenarios.items():
+        if full_scan and rows > FULL_SCAN_LIMIT:
+            results[name] = {"skipped": f"ledger is larger than {FULL_SCAN_LIMIT} rows"}
+            continue
+        results[name] = time_calls(fn, FULL_SCAN_REPEATS if full_scan else repeats)
+    return results
+
+
+def run_show_stat(client: Any, tmp: str, rows: int, repeats: int) -> Dict[str, Any]:
+    """Замеряет ShowStat.collect_data: первую синхронизацию локальной копии и повторные вызовы."""
+    try:
+        from main import ShowStat  # matplotlib для collect_data не нужен (см. main.load_charting)
+    except ImportError as e:  # Нет tkinter
+        return {"skipped": f"client GUI is not importable: {e}"}
+    if rows > FULL_SCAN_LIMIT:
+        return {"skipped": f"ledger is larger than {FULL_SCAN_LIMIT} rows"}
+    from replica import LocalReplica
+
+    # collect_data использует только replica и data_version, поэтому окно Tk не создается
+    window = types.SimpleNamespace(replica=LocalReplica(os.path.join(tmp, "replica.db"), client=client),
+                                   data_version=None)
+    initial = time_calls(lambda: ShowStat.collect_data(window), 1)
+    rnd = random.Random(44)
+
+    def after_write() -> None:
+        client.add_transaction(**{("transaction_type" if k == "type" else k): v
+                                  for k, v in random_row(rnd).items()})
+        ShowStat.collect_data(window)
+
+    return {
+        "collect_data (initial sync)": initial,
+        "collect_data (no changes)": time_calls(lambda: ShowStat.collect_data(window), repeats),
+        "add_transaction + collect_data": time_calls(after_write, repeats),
+    }
+
+
+def run_size(rows: int, repeats: int) -> Dict[str, Any]:
+    """Замеряет все сценарии на журнале из rows транзакций (выполняется в отдельном процессе)."""
+    from werkzeug.serving import make_server
+
+    from api_client import FinanceClient
+    from app import create_app
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    with tempfile.TemporaryDirectory() as tmp:
+        path: str = os.path.join(tmp, "bench.db")
+        started = time.perf_counter()
+        seed(path, rows)
+        result: Dict[str, Any] = {"seed_seconds": round(time.perf_counter() - started, 1)}
+
+        app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}"})
+        test_client = app.test_client()
+
+        def send_test_client(req: Request) -> None:
+            method, url, params, body, data, headers = req
+            test_client.open(url, method=method, query_string=params, json=body, data=data,
+                             headers=headers).get_data()
+
+        result["test_client"] = run_routes(send_test_client, rows, repeats)
+
+        server = make_server("127.0.0.1", 0, app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url: str = f"http://127.0.0.1:{server.port}"
+        try:
+            with requests.Session() as session:
+                def send_http(req: Request) -> None:
+                    method, url, params, body, data, headers = req
+                    session.request(method, base_url + url, params=params, json=body,
+                                    data=data.encode() if data else None, headers=headers).content
+
+                result["http"] = run_routes(send_http, rows, repeats)
+            with FinanceClient(base_url) as client:
+                result["api_client"] = run_api_client(client, rows, repeats)
+                result["show_stat"] = run_show_stat(client, tmp, rows, repeats)
+        finally:
+            server.shutdown()
+
+    result["peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    return result
+
+
+def git_commit() -> Optional[str]:
+    """Возвращает хеш текущего коммита или None, если git недоступен."""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any]) -> None:
+    """Печатает изменение p50 по всем сценариям относительно baseline."""
+    print(f"{'size':>10}  {'group':<12} {'scenario':<56} {'before':>9} {'after':>9} {'ratio':>6}")
+    for size, groups in report["sizes"].items():
+        for group, scenarios in groups.items():
+            if not isinstance(scenarios, dict):
+                continue
+            for name, stats in scenarios.items():
+                before = baseline.get("sizes", {}).get(size, {}).get(group, {}).get(name, {})
+                if "p50_ms" not in stats or "p50_ms" not in before:
+                    continue
+                ratio = stats["p50_ms"] / before["p50_ms"] if before["p50_ms"] else 1.0
+                mark = "  <- regression" if ratio > REGRESSION_THRESHOLD else ""
+                print(f"{size:>10}  {group:<12} {name:<56} {before['p50_ms']:>9.2f} "
+                      f"{stats['p50_ms']:>9.2f} {ratio:>5.2f}x{mark}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000", help="размеры журнала через запятую, например 10000,1000000")
+    parser.add_argument("--repeats", type=int, default=100, help="сколько раз выполнять каждый сценарий")
+    parser.add_argument("--output", help="файл для JSON-отчета (по умолчанию - stdout)")
+    parser.add_argument("--compare", help="JSON-отчет предыдущего прогона для сравнения")
+    args = parser.parse_args()
+
+    report: Dict[str, Any] = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeats": args.repeats,
+        "sizes": {},
+    }
+    context = multiprocessing.get_context("spawn")  # Чистый процесс на каждый размер - честный пиковый RSS
+    for size in (int(value) for value in args.sizes.split(",")):
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            report["sizes"][str(size)] = executor.submit(run_size, size, args.repeats).result()
+
+    text: str = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
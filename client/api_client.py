@@ -1,24 +1,401 @@
+import asyncio
+import json
+import os
+import threading
+from collections import OrderedDict
+from urllib.parse import quote
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-API_URL = "http://localhost:5000/api/transactions"
+try:
+    import msgpack  # Необязательная зависимость: ответы сервера в формате MessagePack
+except ImportError:
+    msgpack = None
+
+BASE_URL = "http://localhost:5000"
+PAGE_SIZE = 1000
+BATCH_SIZE = 1000
+TIMEOUT = (3.05, 30)  # (подключение, чтение) в секундах
+RETRIES = 3
+BACKOFF_FACTOR = 0.3  # Паузы между повторами: 0.3, 0.6, 1.2 ... секунд
+POOL_SIZE = 10
+EXPORT_CHUNK_SIZE = 64 * 1024  # Размер части файла выгрузки, записываемой на диск за раз
+ETAG_CACHE_SIZE = 64  # Сколько последних ответов GET-запросов хранить для условных запросов
+
+
+class FinanceClient:
+    """Клиент REST API финансового менеджера.
+
+    Все запросы идут через один requests.Session с пулом keep-alive соединений,
+    поэтому TCP-соединение не открывается заново на каждый вызов. У каждого
+    запроса есть таймаут, а ошибки соединения и ответы 502/503/504 повторяются
+    с экспоненциальной паузой (POST повторяется только при ошибке соединения,
+    когда запрос точно не дошел до сервера).
+
+    С параметром ledger все запросы идут к журналу ledger (/api/ledgers/<ledger>/...),
+    у которого на сервере своя база; без него - к журналу по умолчанию.
+    """
+
+    def __init__(self, base_url=BASE_URL, timeout=TIMEOUT, retries=RETRIES,
+                 backoff_factor=BACKOFF_FACTOR, pool_size=POOL_SIZE, ledger=None,
+                 etag_cache_size=ETAG_CACHE_SIZE):
+        self.base_url = base_url.rstrip("/")
+        self.api_prefix = "/api" if ledger is None else f"/api/ledgers/{quote(ledger, safe='')}"
+        self.timeout = timeout
+        self.session = requests.Session()
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,  # Без POST: повтор мог бы создать дубликаты
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        # Последние ответы GET-запросов (LRU): (путь, параметры) -> (ETag, тело).
+        # Клиентом пользуются несколько потоков (фоновые задачи GUI, пул ThreadPoolExecutor)
+        self._etag_cache = OrderedDict()
+        self._etag_cache_size = etag_cache_size
+        self._etag_lock = threading.Lock()
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _request(self, method, path, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        if path.startswith("/api/") and not path.startswith("/api/ledgers"):
+            path = self.api_prefix + path[len("/api"):]
+        response = self.session.request(method, self.base_url + path, **kwargs)
+        response.raise_for_status()
+        return response
+
+    def _get_json(self, path, params=None):
+        """Выполняет условный GET: при неизменившемся ETag сервер отвечает 304 и тело берется из кэша."""
+        key = (path, tuple(sorted((params or {}).items())))
+        with self._etag_lock:
+            cached = self._etag_cache.get(key)
+            if cached:
+                self._etag_cache.move_to_end(key)
+        headers = {"If-None-Match": cached[0]} if cached else {}
+        response = self._request("GET", path, params=params, headers=headers)
+        if response.status_code == 304 and cached:
+            return cached[1]
+        data = response.json()
+        if "ETag" in response.headers:
+            with self._etag_lock:
+                self._etag_cache[key] = (response.headers["ETag"], data)
+                self._etag_cache.move_to_end(key)
+                if len(self._etag_cache) > self._etag_cache_size:
+                    self._etag_cache.popitem(last=False)
+        return data
+
+    def get_transactions(self):
+        return self._get_json("/api/transactions")
+
+    def iter_transactions(self, page_size=PAGE_SIZE):
+        """Постранично перебирает транзакции, используя keyset-пагинацию сервера."""
+        after_id = 0
+        while True:
+            response = self._request("GET", "/api/transactions", params={"after_id": after_id, "limit": page_size})
+            yield from response.json()
+            next_after_id = response.headers.get("X-Next-After-Id")
+            if next_after_id is None:
+                return
+            after_id = int(next_after_id)
+
+    def get_transactions_page(self, offset=0, limit=PAGE_SIZE, sort="id", descending=False, filters=None):
+        """Возвращает страницу транзакций и общее количество подходящих под фильтры.
+
+        Сортировка и фильтрация выполняются на сервере. filters - словарь с
+        необязательными ключами category, type, from и to (см. GET /api/transactions).
+
+        Returns:
+            Кортеж (список транзакций, общее количество). Сервер считает количество
+            только для первой страницы (offset=0), для остальных вместо него None.
+        """
+        params = {"offset": offset, "limit": limit, "sort": sort, "order": "desc" if descending else "asc"}
+        params.update({k: v for k, v in (filters or {}).items() if v})
+        response = self._request("GET", "/api/transactions", params=params)
+        total = response.headers.get("X-Total-Count")
+        return response.json(), int(total) if total is not None else None
+
+    def get_transaction_columns(self, offset=0, limit=None, sort="id", descending=False, filters=None):
+        """Возвращает транзакции в колоночном виде: словарь "поле -> список значений".
+
+        Если установлен msgpack, ответ запрашивается в формате MessagePack,
+        иначе в ?format=columnar. В обоих случаях клиент не создает словарь
+        на каждую транзакцию. Параметры совпадают с get_transactions_page.
+        """
+        params = {"offset": offset, "sort": sort, "order": "desc" if descending else "asc"}
+        if limit is not None:
+            params["limit"] = limit
+        params.update({k: v for k, v in (filters or {}).items() if v})
+        if msgpack is not None:
+            response = self._request("GET", "/api/transactions", params=params,
+                                     headers={"Accept": "application/x-msgpack"})
+            return msgpack.unpackb(response.content)
+        params["format"] = "columnar"
+        return self._request("GET", "/api/transactions", params=params).json()
+
+    def search_transactions(self, query, offset=0, limit=50, filters=None):
+        """Ищет транзакции по словам из описания и категории (см. GET /api/transactions/search).
+
+        filters - словарь с необязательными ключами category, type, from, to,
+        min_amount и max_amount.
+
+        Returns:
+            Кортеж (список транзакций, offset следующей страницы или None).
+        """
+        params = {"q": query, "offset": offset, "limit": limit}
+        params.update({k: v for k, v in (filters or {}).items() if v is not None and v != ""})
+        response = self._request("GET", "/api/transactions/search", params=params)
+        next_offset = response.headers.get("X-Next-Offset")
+        return response.json(), int(next_offset) if next_offset is not None else None
+
+    def stream_transactions(self):
+        """Перебирает транзакции из одного потокового NDJSON-ответа сервера."""
+        with self._request("GET", "/api/transactions", params={"format": "ndjson"}, stream=True) as response:
+            for line in response.iter_lines():
+                if line:
+                    yield json.loads(line)
+
+    def export_transactions(self, path, fmt="csv", filters=None, chunk_size=EXPORT_CHUNK_SIZE):
+        """Сохраняет выгрузку транзакций (см. GET /api/transactions/export) в файл path.
+
+        Ответ читается частями и сразу пишется на диск, поэтому файл любого размера
+        не загружается в память. Пока выгрузка идет, данные пишутся во временный
+        файл path + ".part", который заменяет path только после успешного завершения.
+        fmt - "csv" или "xlsx"; filters - словарь с необязательными ключами
+        category, type, from и to.
+
+        Returns:
+            Количество записанных байт.
+        """
+        params = {"format": fmt}
+        params.update({k: v for k, v in (filters or {}).items() if v is not None and v != ""})
+        partial = path + ".part"
+        written = 0
+        try:
+            with self._request("GET", "/api/transactions/export", params=params, stream=True) as response, \
+                    open(partial, "wb") as file:
+                for chunk in response.iter_content(chunk_size):
+                    file.write(chunk)
+                    written += len(chunk)
+            os.replace(partial, path)
+        except BaseException:
+            if os.path.exists(partial):
+                os.remove(partial)
+            raise
+        return written
+
+    def get_stats(self, date_from=None, date_to=None):
+        """Возвращает суммы транзакций, сгруппированные по типу и категории."""
+        params = {"from": date_from, "to": date_to}
+        return self._get_json("/api/stats", {k: v for k, v in params.items() if v})
+
+    def get_timeseries(self, bucket="month", date_from=None, date_to=None, category=None):
+        """Возвращает доходы, расходы и нарастающий остаток по периодам (см. GET /api/timeseries)."""
+        params = {"bucket": bucket, "from": date_from, "to": date_to, "category": category}
+        return self._get_json("/api/timeseries", {k: v for k, v in params.items() if v})
+
+    def get_ledgers(self):
+        """Возвращает идентификаторы журналов сервера."""
+        return self._request("GET", "/api/ledgers").json()["ledgers"]
+
+    def create_ledger(self, ledger):
+        """Создает на сервере журнал ledger, если его еще нет."""
+        self._request("PUT", f"/api/ledgers/{quote(ledger, safe='')}")
+
+    def get_changes(self, since=0, limit=PAGE_SIZE):
+        """Возвращает изменения журнала с номером больше since (см. GET /api/changes)."""
+        return self._request("GET", "/api/changes", params={"since": since, "limit": limit}).json()
+
+    def add_transaction(self, amount, category, date, transaction_type, description=""):
+        """Добавляет транзакцию и возвращает ее id.
+
+        Если сервер работает с групповой фиксацией в режиме надежности "async"
+        (FINANCE_GROUP_COMMIT_DURABILITY=async), он принимает транзакцию в очередь
+        без записи и отвечает 202 без id - тогда возвращается None.
+        """
+        response = self._request("POST", "/api/transactions", json={
+            "amount": amount,
+            "category": category,
+            "date": date,
+            "type": transaction_type,
+            "description": description
+        })
+        if response.status_code == 202:
+            return None
+        return response.json()["id"]
+
+    def add_transactions(self, transactions, chunk_size=BATCH_SIZE):
+        """Добавляет транзакции пачками по chunk_size и возвращает список их id.
+
+        Каждая транзакция - словарь с полями amount, category, date, type и description.
+        """
+        ids = []
+        iterator = iter(transactions)
+        while chunk := list(islice(iterator, chunk_size)):
+            ids.extend(self._request("POST", "/api/transactions/batch", json=chunk).json()["ids"])
+        return ids
+
+    def delete_transaction(self, category, date, transaction_type):
+        """Удаляет транзакции по критериям и возвращает их количество."""
+        response = self._request("DELETE", "/api/transactions", json={
+            "category": category,
+            "date": date,
+            "type": transaction_type,
+        })
+        return response.json()["deleted_count"]
+
+    def delete_transactions(self, ids, soft=False, chunk_size=BATCH_SIZE):
+        """Удаляет транзакции по списку id и возвращает их количество.
+
+        Длинный список отправляется несколькими запросами по chunk_size id.
+        При soft=True транзакции переносятся в корзину и их можно восстановить
+        через restore_transactions.
+        """
+        ids = iter(ids)
+        deleted = 0
+        while chunk := list(islice(ids, chunk_size)):
+            response = self._request("DELETE", "/api/transactions/batch", json={"ids": chunk, "soft": soft})
+            deleted += response.json()["deleted_count"]
+        return deleted
+
+    def delete_range(self, date_from, date_to, category=None, transaction_type=None, soft=False):
+        """Удаляет транзакции за период (даты включительно) и возвращает их количество."""
+        payload = {"from": date_from, "to": date_to, "category": category, "type": transaction_type, "soft": soft}
+        response = self._request("DELETE", "/api/transactions/range",
+                                 json={k: v for k, v in payload.items() if v is not None})
+        return response.json()["deleted_count"]
+
+    def restore_transactions(self, ids):
+        """Восстанавливает транзакции из корзины и возвращает словарь "прежний id -> id в журнале"."""
+        response = self._request("POST", "/api/transactions/restore", json={"ids": list(ids)})
+        return {int(old): new for old, new in response.json()["ids"].items()}
+
+
+class AsyncFinanceClient:
+    """Обертка над FinanceClient, позволяющая вызывать его из asyncio (await).
+
+    Это не асинхронный HTTP-клиент: каждый вызов - блокирующий запрос requests,
+    который выполняется в пуле из concurrency потоков и занимает поток ОС на
+    все время запроса. Поэтому одновременно выполняется не больше concurrency
+    запросов, остальные ждут на семафоре; для тысяч одновременных соединений
+    нужен настоящий неблокирующий клиент (например, aiohttp или httpx).
+    Пул соединений сессии совпадает по размеру с лимитом параллельности.
+    """
+
+    def __init__(self, base_url=BASE_URL, concurrency=POOL_SIZE, **client_options):
+        self.client = FinanceClient(base_url, pool_size=concurrency, **client_options)
+        self._executor = ThreadPoolExecutor(max_workers=concurrency)
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    async def close(self):
+        self._executor.shutdown(wait=True)
+        self.client.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def _call(self, method, *args):
+        async with self._semaphore:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, method, *args)
+
+    async def get_stats(self, date_from=None, date_to=None):
+        return await self._call(self.client.get_stats, date_from, date_to)
+
+    async def get_timeseries(self, bucket="month", date_from=None, date_to=None, category=None):
+        return await self._call(self.client.get_timeseries, bucket, date_from, date_to, category)
+
+    async def get_changes(self, since=0, limit=PAGE_SIZE):
+        return await self._call(self.client.get_changes, since, limit)
+
+    async def add_transaction(self, amount, category, date, transaction_type, description=""):
+        return await self._call(self.client.add_transaction, amount, category, date, transaction_type, description)
+
+    async def add_transactions(self, transactions, chunk_size=BATCH_SIZE):
+        """Отправляет пачки транзакций параллельными запросами и возвращает id в исходном порядке."""
+        iterator = iter(transactions)
+        chunks = []
+        while chunk := list(islice(iterator, chunk_size)):
+            chunks.append(chunk)
+        results = await asyncio.gather(*(self._call(self.client.add_transactions, chunk, chunk_size)
+                                         for chunk in chunks))
+        return [transaction_id for ids in results for transaction_id in ids]
+
+    async def delete_transaction(self, category, date, transaction_type):
+        return await self._call(self.client.delete_transaction, category, date, transaction_type)
+
+    async def delete_transactions(self, ids, soft=False, chunk_size=BATCH_SIZE):
+        return await self._call(self.client.delete_transactions, ids, soft, chunk_size)
+
+
+# Клиент по умолчанию для функций модуля
+_client = FinanceClient()
 
 def get_transactions():
-    response = requests.get(API_URL)
-    return response.json()
+    return _client.get_transactions()
+
+def iter_transactions(page_size=PAGE_SIZE):
+    return _client.iter_transactions(page_size)
+
+def get_transactions_page(offset=0, limit=PAGE_SIZE, sort="id", descending=False, filters=None):
+    return _client.get_transactions_page(offset, limit, sort, descending, filters)
+
+def get_transaction_columns(offset=0, limit=None, sort="id", descending=False, filters=None):
+    return _client.get_transaction_columns(offset, limit, sort, descending, filters)
+
+def search_transactions(query, offset=0, limit=50, filters=None):
+    return _client.search_transactions(query, offset, limit, filters)
+
+def stream_transactions():
+    return _client.stream_transactions()
+
+def export_transactions(path, fmt="csv", filters=None, chunk_size=EXPORT_CHUNK_SIZE):
+    return _client.export_transactions(path, fmt, filters, chunk_size)
+
+def get_stats(date_from=None, date_to=None):
+    return _client.get_stats(date_from, date_to)
+
+def get_timeseries(bucket="month", date_from=None, date_to=None, category=None):
+    return _client.get_timeseries(bucket, date_from, date_to, category)
+
+def get_ledgers():
+    return _client.get_ledgers()
+
+def create_ledger(ledger):
+    return _client.create_ledger(ledger)
+
+def get_changes(since=0, limit=PAGE_SIZE):
+    return _client.get_changes(since, limit)
 
 def add_transaction(amount, category, date, transaction_type, description=""):
-    requests.post(API_URL, json={
-        "amount": amount,
-        "category": category,
-        "date": date,
-        "type": transaction_type,
-        "description": description
-    })
+    return _client.add_transaction(amount, category, date, transaction_type, description)
+
+def add_transactions(transactions, chunk_size=BATCH_SIZE):
+    return _client.add_transactions(transactions, chunk_size)
 
 def delete_transaction(category, date, transaction_type):
-    requests.delete(API_URL, json={
-        "category": category,
-        "date": date,
-        "type": transaction_type,
-        
-    })
\ No newline at end of file
+    return _client.delete_transaction(category, date, transaction_type)
+
+def delete_transactions(ids, soft=False, chunk_size=BATCH_SIZE):
+    return _client.delete_transactions(ids, soft, chunk_size)
+
+def delete_range(date_from, date_to, category=None, transaction_type=None, soft=False):
+    return _client.delete_range(date_from, date_to, category, transaction_type, soft)
+
+def restore_transactions(ids):
+    return _client.restore_transactions(ids)
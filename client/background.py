@@ -0,0 +1,103 @@
+"""Выполнение запросов к API вне главного потока Tk.
+
+Tkinter можно трогать только из главного потока, а сетевые запросы могут
+надолго блокировать его. BackgroundRunner выполняет функции в пуле потоков,
+а результаты передает обратно через очередь, которую главный поток
+опрашивает методом after().
+"""
+import queue
+import tkinter as tk
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Optional, Tuple
+
+POLL_INTERVAL_MS: int = 50
+
+
+class Task:
+    """Фоновая задача, результат которой можно отменить.
+
+    Attributes:
+        future: Future из пула потоков.
+        on_success: Вызывается в главном потоке с результатом функции.
+        on_error: Вызывается в главном потоке с исключением функции.
+        owner: Виджет, которому нужен результат; если он уже закрыт, обработчики не вызываются.
+        cancelled: Отменена ли задача (ее результат будет проигнорирован).
+    """
+
+    def __init__(self, future: Future, on_success: Optional[Callable[[Any], None]],
+                 on_error: Optional[Callable[[BaseException], None]], owner: Optional[tk.Misc]) -> None:
+        self.future: Future = future
+        self.on_success: Optional[Callable[[Any], None]] = on_success
+        self.on_error: Optional[Callable[[BaseException], None]] = on_error
+        self.owner: Optional[tk.Misc] = owner
+        self.cancelled: bool = False
+
+    def cancel(self) -> None:
+        """Отменяет задачу: если она еще не началась, она не запустится, иначе ее результат не будет доставлен."""
+        self.cancelled = True
+        self.future.cancel()
+
+
+class BackgroundRunner:
+    """Пул потоков для блокирующих вызовов с доставкой результатов в главный поток Tk.
+
+    Attributes:
+        root: Корневое окно, в цикле которого опрашивается очередь результатов.
+    """
+
+    def __init__(self, root: tk.Misc, max_workers: int = 4) -> None:
+        """Создает пул потоков и запускает опрос очереди результатов.
+
+        Args:
+            root: Корневое окно приложения.
+            max_workers: Количество рабочих потоков.
+        """
+        self.root: tk.Misc = root
+        self._executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=max_workers)
+        self._results: "queue.Queue[Tuple[Task, Future]]" = queue.Queue()
+        self._poll()
+
+    def submit(self, fn: Callable[..., Any], *args: Any,
+               on_success: Optional[Callable[[Any], None]] = None,
+               on_error: Optional[Callable[[BaseException], None]] = None,
+               owner: Optional[tk.Misc] = None) -> Task:
+        """Запускает fn(*args) в фоновом потоке.
+
+        Args:
+            fn: Блокирующая функция (например, запрос к API).
+            *args: Аргументы функции.
+            on_success: Обработчик результата, вызывается в главном потоке.
+            on_error: Обработчик исключения, вызывается в главном потоке.
+            owner: Окно, которому нужен результат. Если к моменту готовности
+                оно закрыто, обработчики не вызываются.
+
+        Returns:
+            Task: Задача, которую можно отменить, если ее результат больше не нужен.
+        """
+        future: Future = self._executor.submit(fn, *args)
+        task: Task = Task(future, on_success, on_error, owner)
+        future.add_done_callback(lambda done: self._results.put((task, done)))
+        return task
+
+    def _poll(self) -> None:
+        """Доставляет готовые результаты обработчикам и планирует следующий опрос."""
+        self.root.after(POLL_INTERVAL_MS, self._poll)  # Заранее, чтобы ошибка в обработчике не остановила опрос
+        while True:
+            try:
+                task, future = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if task.cancelled or future.cancelled():
+                continue
+            if task.owner is not None and not task.owner.winfo_exists():
+                continue
+            error: Optional[BaseException] = future.exception()
+            if error is None:
+                if task.on_success is not None:
+                    task.on_success(future.result())
+            elif task.on_error is not None:
+                task.on_error(error)
+
+    def shutdown(self) -> None:
+        """Останавливает пул, не дожидаясь выполняющихся задач."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -1,56 +1,301 @@
+import math
 import tkinter as tk
-from tkinter import ttk
-from api_client import add_transaction, get_transactions, delete_transaction
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from typing import Dict, List, Any, Optional
+from collections import OrderedDict
+from tkinter import filedialog, ttk
+from requests import HTTPError, RequestException
+from api_client import delete_transaction, export_transactions, get_transactions_page
+from background import BackgroundRunner, Task
+from outbox import Outbox
+from replica import LocalReplica
+from typing import TYPE_CHECKING, Callable, Dict, List, Any, Optional, Tuple
+
+if TYPE_CHECKING:
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
+LIST_PAGE_SIZE: int = 200  # Сколько транзакций запрашивается у сервера за раз
+LIST_BUFFER_PAGES: int = 1  # Сколько страниц подгружается заранее выше и ниже видимой области
+LIST_CACHED_PAGES: int = 20  # Сколько загруженных страниц хранится в памяти
+OUTBOX_CLOSE_TIMEOUT: float = 2.0  # Сколько секунд при закрытии ждать начатой отправки журнала
 
 
 class TransationListWindow(tk.Toplevel):
-    """Окно для отображения списка транзакций в виде таблицы.
+    """Окно для отображения списка транзакций в виде виртуальной таблицы.
+
+    В Treeview хранится только столько строк, сколько помещается на экране.
+    Данные запрашиваются у сервера страницами по LIST_PAGE_SIZE при прокрутке
+    (с запасом LIST_BUFFER_PAGES выше и ниже видимой области), а сортировка и
+    фильтрация выполняются на сервере. Поэтому время открытия окна и память
+    не зависят от размера журнала. Запросы выполняются в фоновом потоке, а
+    запросы страниц, ушедших из видимой области, отменяются.
 
     Attributes:
         parent: Родительское окно.
-        transactions: Список транзакций, полученный из API.
+        runner: Пул фоновых потоков для запросов к API.
+        total: Количество транзакций, подходящих под фильтры.
+        first_row: Номер первой видимой строки.
+        visible_rows: Количество видимых строк.
+        sort: Колонка сортировки (ключ COLUMNS).
+        descending: Сортировка по убыванию.
+        filters: Фильтры списка (category, type, from, to).
+        pages: Загруженные страницы по номеру в порядке последнего использования.
+        page_tasks: Фоновые загрузки страниц по номеру.
+        row_items: Идентификаторы строк Treeview, которые переиспользуются при прокрутке.
+        status_label: Надпись о загрузке или ошибке.
+        category_entry, type_entry, date_from_entry, date_to_entry: Поля фильтров.
+        filter_button: Кнопка применения фильтров.
+        export_button: Кнопка сохранения отфильтрованного списка в файл CSV или XLSX.
         tree: Виджет Treeview для отображения данных.
-        scrollbar: Полоса прокрутки для таблицы.
+        scrollbar: Полоса прокрутки, отражающая положение во всем списке.
     """
 
-    def __init__(self, parent: tk.Tk) -> None:
-        """Инициализирует окно списка транзакций.
+    # Колонка Treeview -> (параметр sort API, заголовок)
+    COLUMNS: Dict[str, Tuple[str, str]] = {
+        "ID": ("id", "ID"),
+        "Amount": ("amount", "Цена"),
+        "Category": ("category", "Категория"),
+        "Type": ("type", "Тип"),
+        "Data": ("date", "Дата"),
+    }
+
+    def __init__(self, parent: "Application") -> None:
+        """Инициализирует окно списка транзакций и запрашивает первую страницу.
 
         Args:
             parent: Родительское окно приложения.
         """
         super().__init__(parent)
         self.title("Отсчет")
-        self.transactions: List[Dict[str, Any]] = get_transactions()  # Предполагается, что это возвращает список словарей
+        self.runner: BackgroundRunner = parent.runner
+        self.total: int = 0
+        self.first_row: int = 0
+        self.visible_rows: int = 20
+        self.sort: str = "id"
+        self.descending: bool = False
+        self.filters: Dict[str, str] = {}
+        self.pages: "OrderedDict[int, List[Dict[str, Any]]]" = OrderedDict()
+        self.page_tasks: Dict[int, Task] = {}
+        self.row_items: List[str] = []
+        self.status_label: ttk.Label = ttk.Label(self, text="Загрузка...")
+        
+        # Фильтры
+        self.filter_frame: ttk.Frame = ttk.Frame(self)
+        self.category_entry: ttk.Entry = ttk.Entry(self.filter_frame, width=15)
+        self.type_entry: ttk.Combobox = ttk.Combobox(self.filter_frame, values=("", "доход", "расход"),
+                                                     width=8, state="readonly")
+        self.date_from_entry: ttk.Entry = ttk.Entry(self.filter_frame, width=11)
+        self.date_to_entry: ttk.Entry = ttk.Entry(self.filter_frame, width=11)
+        self.filter_button: ttk.Button = ttk.Button(self.filter_frame, text="Применить", command=self.apply_filters)
+        self.export_button: ttk.Button = ttk.Button(self.filter_frame, text="Сохранить в файл",
+                                                    command=self.export_to_file)
         
         # Создаем Treeview
-        self.tree: ttk.Treeview = ttk.Treeview(self, columns=("ID", "Amount", "Category", "Type", "Data"), show="headings")
-        self.tree.heading("ID", text="ID")
-        self.tree.heading("Amount", text="Цена")
-        self.tree.heading("Category", text="Категория")
-        self.tree.heading("Type", text="Тип")
-        self.tree.heading("Data", text="Дата")
-        
-        # Заполняем данными (используем ключи словаря)
-        for transaction in self.transactions:
-            self.tree.insert("", tk.END, values=(
-                transaction['id'], 
-                transaction['amount'], 
-                transaction['category'], 
-                transaction['type'],
-                transaction['date']
-            ))
-        
-        self.scrollbar: ttk.Scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.tree.yview)
-        self.tree.configure(yscroll=self.scrollbar.set)
+        self.tree: ttk.Treeview = ttk.Treeview(self, columns=tuple(self.COLUMNS), show="headings",
+                                               height=self.visible_rows)
+        for column in self.COLUMNS:
+            self.tree.heading(column, command=lambda column=column: self.sort_by(column))
+        self.update_headings()
+        
+        self.scrollbar: ttk.Scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.on_scrollbar)
+        self.tree.bind("<MouseWheel>", self.on_mousewheel)
+        self.tree.bind("<Button-4>", self.on_mousewheel)
+        self.tree.bind("<Button-5>", self.on_mousewheel)
+        self.tree.bind("<Configure>", self.on_resize)
         
         self.pack_widgets()
+        self.reload()
+    
+    def reload(self) -> None:
+        """Сбрасывает загруженные страницы и запрашивает список заново с первой строки."""
+        for task in self.page_tasks.values():
+            task.cancel()
+        self.page_tasks.clear()
+        self.pages.clear()
+        self.first_row = 0
+        self.status_label.config(text="Загрузка...")
+        self.request_page(0)
+        self.render()
+    
+    def request_page(self, page: int) -> None:
+        """Запрашивает страницу в фоновом потоке, если она еще не загружена и не запрошена."""
+        if page in self.pages or page in self.page_tasks:
+            return
+        self.page_tasks[page] = self.runner.submit(
+            get_transactions_page, page * LIST_PAGE_SIZE, LIST_PAGE_SIZE,
+            self.sort, self.descending, dict(self.filters),
+            on_success=lambda result, page=page: self.on_page_loaded(page, result),
+            on_error=self.show_error,
+            owner=self
+        )
+    
+    def on_page_loaded(self, page: int, result: Tuple[List[Dict[str, Any]], Optional[int]]) -> None:
+        """Сохраняет загруженную страницу и перерисовывает таблицу.
+
+        Общее количество приходит только с первой страницей, поэтому для
+        остальных сохраняется прежнее значение.
+        """
+        self.page_tasks.pop(page, None)
+        self.pages[page], total = result
+        if total is not None:
+            self.total = total
+        while len(self.pages) > LIST_CACHED_PAGES:
+            self.pages.popitem(last=False)
+        self.status_label.config(text="")
+        self.render()
+    
+    def show_error(self, error: BaseException) -> None:
+        """Показывает ошибку загрузки."""
+        self.page_tasks = {page: task for page, task in self.page_tasks.items() if not task.future.done()}
+        self.status_label.config(text=f"Ошибка загрузки: {error}")
+    
+    def render(self) -> None:
+        """Заполняет видимые строки из загруженных страниц и запрашивает недостающие."""
+        self.first_row = max(0, min(self.first_row, self.total - self.visible_rows))
+        while len(self.row_items) < self.visible_rows:
+            self.row_items.append(self.tree.insert("", tk.END))
+        while len(self.row_items) > self.visible_rows:
+            self.tree.delete(self.row_items.pop())
+        
+        for offset, item in enumerate(self.row_items):
+            index: int = self.first_row + offset
+            page, position = divmod(index, LIST_PAGE_SIZE)
+            rows: Optional[List[Dict[str, Any]]] = self.pages.get(page)
+            if index >= self.total:
+                values: Tuple[Any, ...] = ()
+            elif rows is None or position >= len(rows):
+                values = ("...",)  # Страница еще загружается
+            else:
+                self.pages.move_to_end(page)
+                transaction: Dict[str, Any] = rows[position]
+                values = (
+                    transaction['id'], 
+                    transaction['amount'], 
+                    transaction['category'], 
+                    transaction['type'],
+                    transaction['date']
+                )
+            self.tree.item(item, values=values)
+        
+        if self.total:
+            self.scrollbar.set(self.first_row / self.total,
+                               min(1.0, (self.first_row + self.visible_rows) / self.total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+        
+        # Нужны видимые страницы и запас вокруг них; остальные загрузки больше не нужны
+        first_page: int = max(0, self.first_row // LIST_PAGE_SIZE - LIST_BUFFER_PAGES)
+        last_page: int = (self.first_row + self.visible_rows) // LIST_PAGE_SIZE + LIST_BUFFER_PAGES
+        last_page = min(last_page, max(0, self.total - 1) // LIST_PAGE_SIZE)
+        for page in [page for page in self.page_tasks if not first_page <= page <= last_page]:
+            self.page_tasks.pop(page).cancel()
+        for page in range(first_page, last_page + 1):
+            self.request_page(page)
+    
+    def scroll_to(self, first_row: int) -> None:
+        """Прокручивает таблицу так, чтобы первой видимой была строка first_row."""
+        self.first_row = first_row
+        self.render()
+    
+    def on_scrollbar(self, action: str, *args: str) -> None:
+        """Обрабатывает перемещение полосы прокрутки ("moveto" или "scroll")."""
+        if action == "moveto":
+            self.scroll_to(int(float(args[0]) * self.total))
+        elif action == "scroll":
+            step: int = self.visible_rows if args[1] == "pages" else 1
+            self.scroll_to(self.first_row + int(args[0]) * step)
+    
+    def on_mousewheel(self, event: tk.Event) -> str:
+        """Прокручивает таблицу колесом мыши на три строки."""
+        if event.num == 4 or event.delta > 0:
+            self.scroll_to(self.first_row - 3)
+        else:
+            self.scroll_to(self.first_row + 3)
+        return "break"  # Treeview не должен прокручивать свои строки сам
+    
+    def on_resize(self, event: tk.Event) -> None:
+        """Пересчитывает количество видимых строк по высоте таблицы."""
+        bbox = self.tree.bbox(self.row_items[0]) if self.row_items else None
+        if not bbox:
+            return
+        _, header_height, _, row_height = bbox
+        visible_rows: int = max(1, (event.height - header_height) // row_height)
+        if visible_rows != self.visible_rows:
+            self.visible_rows = visible_rows
+            self.render()
+    
+    def sort_by(self, column: str) -> None:
+        """Сортирует список по колонке; повторный щелчок меняет направление."""
+        sort: str = self.COLUMNS[column][0]
+        self.descending = not self.descending if sort == self.sort else False
+        self.sort = sort
+        self.update_headings()
+        self.reload()
+    
+    def update_headings(self) -> None:
+        """Отмечает стрелкой колонку и направление сортировки в заголовках."""
+        for column, (sort, text) in self.COLUMNS.items():
+            if sort == self.sort:
+                text += " ▼" if self.descending else " ▲"
+            self.tree.heading(column, text=text)
+    
+    def apply_filters(self) -> None:
+        """Применяет фильтры из полей ввода и загружает список заново."""
+        self.filters = {
+            "category": self.category_entry.get().strip(),
+            "type": self.type_entry.get(),
+            "from": self.date_from_entry.get().strip(),
+            "to": self.date_to_entry.get().strip(),
+        }
+        self.reload()
+    
+    def export_to_file(self) -> None:
+        """Сохраняет транзакции с текущими фильтрами в выбранный файл.
+
+        Файл скачивается в фоновом потоке и пишется на диск частями,
+        поэтому окно не блокируется даже на большом журнале.
+        """
+        path: str = filedialog.asksaveasfilename(
+            parent=self, defaultextension=".csv",
+            filetypes=(("CSV", "*.csv"), ("Excel", "*.xlsx")), initialfile="transactions.csv"
+        )
+        if not path:
+            return
+        fmt: str = "xlsx" if path.lower().endswith(".xlsx") else "csv"
+        self.export_button.config(state=tk.DISABLED)
+        self.status_label.config(text="Сохранение...")
+        self.runner.submit(
+            export_transactions, path, fmt, dict(self.filters),
+            on_success=lambda _: self.on_exported(path),
+            on_error=self.on_export_failed,
+            owner=self
+        )
+    
+    def on_exported(self, path: str) -> None:
+        """Сообщает о сохраненном файле."""
+        self.export_button.config(state=tk.NORMAL)
+        self.status_label.config(text=f"Сохранено: {path}")
+    
+    def on_export_failed(self, error: BaseException) -> None:
+        """Показывает ошибку сохранения."""
+        self.export_button.config(state=tk.NORMAL)
+        self.status_label.config(text=f"Ошибка сохранения: {error}")
     
     def pack_widgets(self) -> None:
         """Упаковывает виджеты в окне."""
+        self.status_label.pack(side=tk.TOP, fill=tk.X)
+        
+        self.filter_frame.pack(side=tk.TOP, fill=tk.X)
+        ttk.Label(self.filter_frame, text="Категория:").pack(side=tk.LEFT)
+        self.category_entry.pack(side=tk.LEFT)
+        ttk.Label(self.filter_frame, text="Тип:").pack(side=tk.LEFT)
+        self.type_entry.pack(side=tk.LEFT)
+        ttk.Label(self.filter_frame, text="С (гггг-мм-дд):").pack(side=tk.LEFT)
+        self.date_from_entry.pack(side=tk.LEFT)
+        ttk.Label(self.filter_frame, text="По:").pack(side=tk.LEFT)
+        self.date_to_entry.pack(side=tk.LEFT)
+        self.filter_button.pack(side=tk.LEFT)
+        self.export_button.pack(side=tk.LEFT)
+        
         self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
 
@@ -58,8 +303,12 @@ class TransationListWindow(tk.Toplevel):
 class Add_Notes(tk.Toplevel):
     """Окно для добавления новых транзакций.
 
+    Транзакции записываются в локальный журнал (см. outbox.Outbox), который
+    отправляет их на сервер в фоне, поэтому добавление не ждет сети.
+
     Attributes:
         parent: Родительское окно.
+        outbox: Журнал транзакций, ожидающих отправки на сервер.
         title_label: Заголовок окна.
         amount_label, amount_entry: Поле для ввода суммы.
         category_label, category_entry: Поле для ввода категории.
@@ -68,7 +317,7 @@ class Add_Notes(tk.Toplevel):
         add_button: Кнопка добавления транзакции.
     """
 
-    def __init__(self, parent: tk.Tk) -> None:
+    def __init__(self, parent: "Application") -> None:
         """Инициализирует окно добавления транзакций.
 
         Args:
@@ -76,6 +325,7 @@ class Add_Notes(tk.Toplevel):
         """
         super().__init__(parent)
         self.title("Добавление записей")
+        self.outbox: Outbox = parent.outbox
         
         self.title_label: tk.Label = tk.Label(self, text="Добавление записей", font=("Helvetica", 24))
         
@@ -116,17 +366,18 @@ class Add_Notes(tk.Toplevel):
         self.add_button.pack(pady=10)
     
     def add_transaction(self) -> None:
-        """Добавляет новую транзакцию через API."""
+        """Записывает новую транзакцию в локальный журнал для отправки на сервер."""
         try:
             amount: float = float(self.amount_entry.get())
             category: str = self.category_entry.get()
             date: str = self.date_entry.get()
             transaction_type: str = self.type_entry.get()
-            
-            add_transaction(amount, category, date, transaction_type)
-            print("Транзакция добавлена!")
         except ValueError:
             print("Ошибка ввода данных!")
+            return
+        
+        self.outbox.add(amount, category, date, transaction_type)
+        print(f"Транзакция добавлена! Ожидают отправки: {self.outbox.pending()}")
 
 
 class Del_Notes(tk.Toplevel):
@@ -134,6 +385,7 @@ class Del_Notes(tk.Toplevel):
 
     Attributes:
         parent: Родительское окно.
+        runner: Пул фоновых потоков для запросов к API.
         title_label: Заголовок окна.
         category_label, category_entry: Поле для ввода категории.
         type_label, type_entry: Поле для ввода типа транзакции.
@@ -141,7 +393,7 @@ class Del_Notes(tk.Toplevel):
         delete_button: Кнопка удаления транзакции.
     """
 
-    def __init__(self, parent: tk.Tk) -> None:
+    def __init__(self, parent: "Application") -> None:
         """Инициализирует окно удаления транзакций.
 
         Args:
@@ -149,6 +401,7 @@ class Del_Notes(tk.Toplevel):
         """
         super().__init__(parent)
         self.title("Удаление записей")
+        self.runner: BackgroundRunner = parent.runner
         
         self.title_label: tk.Label = tk.Label(self, text="Удаление записей", font=("Helvetica", 24))
         
@@ -182,28 +435,162 @@ class Del_Notes(tk.Toplevel):
         self.delete_button.pack(pady=10)
     
     def delete_transaction(self) -> None:
-        """Удаляет транзакцию через API."""
-        try:
-            category: str = self.category_entry.get()
-            date: str = self.date_entry.get()
-            transaction_type: str = self.type_entry.get()
-            
-            delete_transaction(category, date, transaction_type)
-            print("Транзакция удалена!")
-        except ValueError:
+        """Удаляет транзакцию через API в фоновом потоке."""
+        category: str = self.category_entry.get()
+        date: str = self.date_entry.get()
+        transaction_type: str = self.type_entry.get()
+        
+        self.delete_button.config(state=tk.DISABLED)  # Пока запрос не завершен
+        self.runner.submit(
+            delete_transaction, category, date, transaction_type,
+            on_success=self.on_deleted, on_error=self.on_failed, owner=self
+        )
+    
+    def on_deleted(self, deleted_count: int) -> None:
+        """Сообщает об успешном удалении."""
+        print("Транзакция удалена!")
+        self.delete_button.config(state=tk.NORMAL)
+    
+    def on_failed(self, error: BaseException) -> None:
+        """Сообщает об ошибке сервера."""
+        if isinstance(error, RequestException):
+            print(f"Ошибка сервера: {error}")
+        else:
             print("Ошибка ввода данных!")
+        self.delete_button.config(state=tk.NORMAL)
+
+
+def load_charting() -> Tuple[type, type]:
+    """Импортирует matplotlib при первом вызове (повторные вызовы берут модули из sys.modules).
+
+    matplotlib нужен только окну статистики, а его импорт занимает заметную часть
+    запуска, поэтому главное окно открывается без него. ShowStat вызывает эту
+    функцию в главном потоке перед первой загрузкой данных: импорт backend_tkagg
+    трогает Tk, а Tk можно использовать только из главного потока.
+
+    Returns:
+        Tuple[type, type]: Классы Figure и FigureCanvasTkAgg.
+    """
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+    return Figure, FigureCanvasTkAgg
+
+
+class CategoryChart:
+    """Диаграмма сумм по категориям на постоянной фигуре matplotlib.
+
+    Фигура и холст создаются один раз. Если набор категорий не изменился,
+    update меняет данные существующих секторов или столбцов на месте,
+    иначе перестраивает оси. Перерисовка откладывается через draw_idle.
+
+    Attributes:
+        kind: Вид диаграммы: "pie" или "bar".
+        title: Заголовок диаграммы.
+        figure: Фигура matplotlib.
+        ax: Оси диаграммы.
+        canvas: Холст Tk, на котором нарисована фигура.
+        categories: Категории, по которым построены текущие секторы или столбцы.
+        patches: Секторы или столбцы диаграммы.
+        texts: Подписи секторов круговой диаграммы.
+        autotexts: Проценты секторов круговой диаграммы.
+    """
+
+    FIG_SIZE: Tuple[int, int] = (5, 4)
+    MARGIN: float = 0.2
+
+    def __init__(self, master: tk.Misc, kind: str, title: str) -> None:
+        """Создает фигуру и холст диаграммы.
+
+        Args:
+            master: Виджет, в котором размещается холст.
+            kind: Вид диаграммы: "pie" или "bar".
+            title: Заголовок диаграммы.
+        """
+        Figure, FigureCanvasTkAgg = load_charting()
+        self.kind: str = kind
+        self.title: str = title
+        self.figure: "Figure" = Figure(figsize=self.FIG_SIZE)
+        self.ax = self.figure.add_subplot(111)
+        self.figure.subplots_adjust(left=self.MARGIN, right=1-self.MARGIN, top=1-self.MARGIN, bottom=self.MARGIN)
+        self.canvas: "FigureCanvasTkAgg" = FigureCanvasTkAgg(self.figure, master=master)
+        self.categories: List[str] = []
+        self.patches: List[Any] = []
+        self.texts: List[Any] = []
+        self.autotexts: List[Any] = []
+        self.rebuild({})
+    
+    def update(self, data: Dict[str, float]) -> None:
+        """Показывает новые суммы по категориям.
+
+        Args:
+            data: Словарь "категория -> сумма".
+        """
+        if list(data) != self.categories or (self.kind == "pie" and not sum(data.values())):
+            self.rebuild(data)
+        elif self.kind == "pie":
+            self.update_pie(list(data.values()))
+        else:
+            for patch, value in zip(self.patches, data.values()):
+                patch.set_height(value)
+            self.ax.relim()
+            self.ax.autoscale_view()
+        self.canvas.draw_idle()
+    
+    def rebuild(self, data: Dict[str, float]) -> None:
+        """Перестраивает оси под новый набор категорий."""
+        self.ax.clear()
+        self.categories = list(data)
+        self.texts, self.autotexts = [], []
+        if self.kind == "pie":
+            if sum(data.values()):
+                self.patches, self.texts, self.autotexts = self.ax.pie(
+                    data.values(), labels=data.keys(), autopct="%1.1f%%", radius=1.0
+                )
+            else:
+                self.patches = []  # matplotlib не рисует круговую диаграмму без данных
+        else:
+            self.patches = list(self.ax.bar(self.categories, list(data.values())))
+            self.ax.tick_params(axis='x', rotation=45)  # Поворачиваем подписи для читаемости
+        self.ax.set_title(self.title)
+    
+    def update_pie(self, values: List[float]) -> None:
+        """Меняет углы секторов и положение подписей круговой диаграммы на месте."""
+        total: float = sum(values)
+        theta1: float = 0.0
+        for wedge, text, autotext, value in zip(self.patches, self.texts, self.autotexts, values):
+            theta2: float = theta1 + 360.0 * value / total
+            wedge.set_theta1(theta1)
+            wedge.set_theta2(theta2)
+            middle: float = math.radians((theta1 + theta2) / 2)
+            x, y = math.cos(middle), math.sin(middle)
+            # Те же расстояния, что по умолчанию у ax.pie: подпись на 1.1 радиуса, процент на 0.6
+            text.set_position((1.1 * x, 1.1 * y))
+            text.set_horizontalalignment("left" if x > 0 else "right")
+            autotext.set_position((0.6 * x, 0.6 * y))
+            autotext.set_text(f"{100.0 * value / total:1.1f}%")
+            theta1 = theta2
 
 
 class ShowStat(tk.Toplevel):
     """Окно для отображения статистики по транзакциям.
 
+    Диаграммы каждого вида создаются один раз и при повторном показе
+    обновляются на месте (см. CategoryChart). Суммы по категориям
+    пересчитываются, только если локальная копия журнала изменилась.
+
     Attributes:
         parent: Родительское окно.
-        transactions: Список транзакций.
+        replica: Локальная копия журнала транзакций.
+        runner: Пул фоновых потоков для загрузки данных.
+        load_task: Текущая фоновая загрузка данных (предыдущая отменяется при новом запросе).
+        data_version: Номер последнего изменения журнала, по которому посчитаны суммы.
+        status_label: Надпись о загрузке или ошибке.
         pie_frame: Фрейм для круговых диаграмм.
-        pie_canvas_1, pie_canvas_2: Холсты для круговых диаграмм.
+        pie_charts: Круговые диаграммы доходов и расходов.
+        pie_version: Значение data_version, по которому нарисованы круговые диаграммы.
         bar_frame: Фрейм для столбчатых диаграмм.
-        bar_canvas_1, bar_canvas_2: Холсты для столбчатых диаграмм.
+        bar_charts: Столбчатые диаграммы доходов и расходов.
+        bar_version: Значение data_version, по которому нарисованы столбчатые диаграммы.
         title_label: Заголовок окна.
         show_pie_button, hide_pie_button: Кнопки управления круговыми диаграммами.
         show_bar_button, hide_bar_button: Кнопки управления столбчатыми диаграммами.
@@ -211,7 +598,7 @@ class ShowStat(tk.Toplevel):
         categories_expenditure: Словарь категорий расходов.
     """
 
-    def __init__(self, parent: tk.Tk) -> None:
+    def __init__(self, parent: "Application") -> None:
         """Инициализирует окно статистики.
 
         Args:
@@ -219,19 +606,23 @@ class ShowStat(tk.Toplevel):
         """
         super().__init__(parent)
         self.title("Статистика")
-        self.transactions: List[Dict[str, Any]] = get_transactions()
+        self.replica: LocalReplica = parent.replica
+        self.runner: BackgroundRunner = parent.runner
+        self.load_task: Optional[Task] = None
+        self.data_version: Optional[int] = None
         
         # Для круговых диаграмм
-        self.pie_frame: Optional[ttk.Frame] = None
-        self.pie_canvas_1: Optional[FigureCanvasTkAgg] = None
-        self.pie_canvas_2: Optional[FigureCanvasTkAgg] = None
+        self.pie_frame: ttk.Frame = ttk.Frame(self)
+        self.pie_charts: Optional[Tuple[CategoryChart, CategoryChart]] = None
+        self.pie_version: Optional[int] = None
         
         # Для столбчатых диаграмм
-        self.bar_frame: Optional[ttk.Frame] = None
-        self.bar_canvas_1: Optional[FigureCanvasTkAgg] = None
-        self.bar_canvas_2: Optional[FigureCanvasTkAgg] = None
+        self.bar_frame: ttk.Frame = ttk.Frame(self)
+        self.bar_charts: Optional[Tuple[CategoryChart, CategoryChart]] = None
+        self.bar_version: Optional[int] = None
         
         self.title_label: ttk.Label = ttk.Label(self, text="Статистика", font=("Helvetica", 24))
+        self.status_label: ttk.Label = ttk.Label(self, text="")
         
         # Кнопки для круговых диаграмм
         self.show_pie_button: ttk.Button = ttk.Button(
@@ -264,139 +655,131 @@ class ShowStat(tk.Toplevel):
         self.pack_widgets()
         
     def collect_data(self) -> None:
-        """Собирает данные по категориям из списка транзакций."""
-        self.categories_income.clear()
-        self.categories_expenditure.clear()
-        
-        for t in self.transactions:
-            if t["type"] == 'доход':
-                self.categories_income[t["category"]] = self.categories_income.get(t["category"], 0) + t["amount"]
+        """Собирает суммы по категориям из локальной копии журнала.
+
+        Выполняется в фоновом потоке, поэтому словари заполняются заново
+        и подменяются целиком, а не изменяются на месте. Если после
+        синхронизации номер последнего изменения журнала не изменился,
+        пересчет пропускается.
+        """
+        self.replica.sync()  # Запрашивает у сервера только изменения с прошлого обновления
+        version: int = self.replica.last_seq
+        if version == self.data_version:
+            return
+        
+        categories_income: Dict[str, float] = {}
+        categories_expenditure: Dict[str, float] = {}
+        for row in self.replica.stats():
+            if row["type"] == 'доход':
+                categories = categories_income
             else:
-                self.categories_expenditure[t["category"]] = self.categories_expenditure.get(t["category"], 0) + t["amount"]
+                categories = categories_expenditure
+            categories[row["category"]] = categories.get(row["category"], 0) + row["total"]
+        
+        self.categories_income = categories_income
+        self.categories_expenditure = categories_expenditure
+        self.data_version = version
+    
+    def load_data(self, on_ready: Callable[[], None]) -> None:
+        """Загружает данные в фоновом потоке и вызывает on_ready в главном потоке.
+
+        Незавершенная предыдущая загрузка отменяется, чтобы устаревший
+        результат не перерисовал диаграммы. matplotlib импортируется здесь,
+        в главном потоке (см. load_charting), а в фоне остаются только
+        синхронизация и подсчет сумм.
+
+        Args:
+            on_ready: Функция отрисовки, вызываемая после загрузки.
+        """
+        if self.load_task is not None:
+            self.load_task.cancel()
+        try:
+            load_charting()
+        except ImportError as error:
+            self.on_load_failed(error)
+            return
+        self.status_label.config(text="Загрузка...")
+        self.load_task = self.runner.submit(
+            self.collect_data,
+            on_success=lambda _: self.on_data_loaded(on_ready),
+            on_error=self.on_load_failed,
+            owner=self
+        )
+    
+    def on_data_loaded(self, on_ready: Callable[[], None]) -> None:
+        """Убирает надпись о загрузке и рисует диаграммы."""
+        self.status_label.config(text="")
+        on_ready()
+    
+    def on_load_failed(self, error: BaseException) -> None:
+        """Показывает ошибку загрузки."""
+        self.status_label.config(text=f"Ошибка загрузки: {error}")
+    
+    def create_charts(self, frame: ttk.Frame, kind: str) -> Tuple[CategoryChart, CategoryChart]:
+        """Создает пару диаграмм доходов и расходов в фрейме.
+
+        Args:
+            frame: Фрейм для холстов диаграмм.
+            kind: Вид диаграмм: "pie" или "bar".
+
+        Returns:
+            Tuple[CategoryChart, CategoryChart]: Диаграммы доходов и расходов.
+        """
+        income: CategoryChart = CategoryChart(frame, kind, 'Доходы')
+        expenditure: CategoryChart = CategoryChart(frame, kind, 'Расходы')
+        income.canvas.get_tk_widget().pack(side=tk.LEFT, padx=10, fill=tk.BOTH, expand=True)
+        expenditure.canvas.get_tk_widget().pack(side=tk.RIGHT, padx=10, fill=tk.BOTH, expand=True)
+        return income, expenditure
     
     def show_pie(self) -> None:
-        """Отображает круговые диаграммы доходов и расходов."""
-        self.collect_data()
-        
-        # Очищаем предыдущие диаграммы
-        if self.pie_frame:
-            self.pie_frame.destroy()
-            
-        self.pie_frame = ttk.Frame(self)
+        """Загружает данные и отображает круговые диаграммы доходов и расходов."""
+        self.load_data(self.draw_pie)
+    
+    def draw_pie(self) -> None:
+        """Обновляет круговые диаграммы доходов и расходов по уже собранным данным."""
+        if self.pie_charts is None:
+            self.pie_charts = self.create_charts(self.pie_frame, "pie")
+        if self.pie_version != self.data_version:  # Данные не менялись - перерисовка не нужна
+            self.pie_charts[0].update(self.categories_income)
+            self.pie_charts[1].update(self.categories_expenditure)
+            self.pie_version = self.data_version
         self.pie_frame.pack(pady=10)
 
-        # Общие параметры для диаграмм
-        fig_size = (5, 4)
-        margin = 0.2
-
-        # Диаграмма доходов
-        fig_1 = plt.Figure(figsize=fig_size)
-        ax_1 = fig_1.add_subplot(111)
-        fig_1.subplots_adjust(left=margin, right=1-margin, top=1-margin, bottom=margin)
-        ax_1.pie(self.categories_income.values(), 
-               labels=self.categories_income.keys(), 
-               autopct="%1.1f%%", 
-               radius=1.0)
-        ax_1.set_title('Доходы')
-
-        # Диаграмма расходов
-        fig_2 = plt.Figure(figsize=fig_size)
-        ax_2 = fig_2.add_subplot(111)
-        fig_2.subplots_adjust(left=margin, right=1-margin, top=1-margin, bottom=margin)
-        ax_2.pie(self.categories_expenditure.values(), 
-               labels=self.categories_expenditure.keys(), 
-               autopct="%1.1f%%", 
-               radius=1.0)
-        ax_2.set_title('Расходы')
-
-        # Размещаем диаграммы
-        self.pie_canvas_1 = FigureCanvasTkAgg(fig_1, master=self.pie_frame)
-        self.pie_canvas_1.draw()
-        self.pie_canvas_1.get_tk_widget().pack(side=tk.LEFT, padx=10, fill=tk.BOTH, expand=True)
-
-        self.pie_canvas_2 = FigureCanvasTkAgg(fig_2, master=self.pie_frame)
-        self.pie_canvas_2.draw()
-        self.pie_canvas_2.get_tk_widget().pack(side=tk.RIGHT, padx=10, fill=tk.BOTH, expand=True)
-
         # Обновляем кнопки
         self.show_pie_button.config(state=tk.DISABLED)
         self.hide_pie_button.config(state=tk.NORMAL)
         self.show_bar_button.config(state=tk.DISABLED)
     
     def hide_pie_chart(self) -> None:
-        """Скрывает круговые диаграммы."""
-        if self.pie_frame:
-            self.pie_frame.destroy()
-            self.pie_frame = None
-            plt.close('all')  # Закрываем все фигуры matplotlib
-            self.pie_canvas_1 = None
-            self.pie_canvas_2 = None
+        """Скрывает круговые диаграммы (фигуры сохраняются для повторного показа)."""
+        self.pie_frame.pack_forget()
             
         self.show_pie_button.config(state=tk.NORMAL)
         self.hide_pie_button.config(state=tk.DISABLED)
         self.show_bar_button.config(state=tk.NORMAL)
     
     def show_bar(self) -> None:
-        """Отображает столбчатые диаграммы доходов и расходов."""
-        self.collect_data()
-        
-        # Очищаем предыдущие диаграммы
-        if self.bar_frame:
-            self.bar_frame.destroy()
-            
-        self.bar_frame = ttk.Frame(self)
+        """Загружает данные и отображает столбчатые диаграммы доходов и расходов."""
+        self.load_data(self.draw_bar)
+    
+    def draw_bar(self) -> None:
+        """Обновляет столбчатые диаграммы доходов и расходов по уже собранным данным."""
+        if self.bar_charts is None:
+            self.bar_charts = self.create_charts(self.bar_frame, "bar")
+        if self.bar_version != self.data_version:  # Данные не менялись - перерисовка не нужна
+            self.bar_charts[0].update(self.categories_income)
+            self.bar_charts[1].update(self.categories_expenditure)
+            self.bar_version = self.data_version
         self.bar_frame.pack(pady=10)
 
-        # Общие параметры для диаграмм
-        fig_size = (5, 4)
-        margin = 0.2
-
-        # Диаграмма доходов
-        fig_1 = plt.Figure(figsize=fig_size)
-        ax_1 = fig_1.add_subplot(111)
-        fig_1.subplots_adjust(left=margin, right=1-margin, top=1-margin, bottom=margin)
-        
-        # Создаем столбчатую диаграмму для доходов
-        categories = list(self.categories_income.keys())
-        values = list(self.categories_income.values())
-        ax_1.bar(categories, values)
-        ax_1.set_title('Доходы')
-        ax_1.tick_params(axis='x', rotation=45)  # Поворачиваем подписи для читаемости
-
-        # Диаграмма расходов
-        fig_2 = plt.Figure(figsize=fig_size)
-        ax_2 = fig_2.add_subplot(111)
-        fig_2.subplots_adjust(left=margin, right=1-margin, top=1-margin, bottom=margin)
-        
-        # Создаем столбчатую диаграмму для расходов
-        categories = list(self.categories_expenditure.keys())
-        values = list(self.categories_expenditure.values())
-        ax_2.bar(categories, values)
-        ax_2.set_title('Расходы')
-        ax_2.tick_params(axis='x', rotation=45)  # Поворачиваем подписи для читаемости
-
-        # Размещаем диаграммы
-        self.bar_canvas_1 = FigureCanvasTkAgg(fig_1, master=self.bar_frame)
-        self.bar_canvas_1.draw()
-        self.bar_canvas_1.get_tk_widget().pack(side=tk.LEFT, padx=10, fill=tk.BOTH, expand=True)
-
-        self.bar_canvas_2 = FigureCanvasTkAgg(fig_2, master=self.bar_frame)
-        self.bar_canvas_2.draw()
-        self.bar_canvas_2.get_tk_widget().pack(side=tk.RIGHT, padx=10, fill=tk.BOTH, expand=True)
-
         # Обновляем кнопки
         self.show_bar_button.config(state=tk.DISABLED)
         self.hide_bar_button.config(state=tk.NORMAL)
         self.show_pie_button.config(state=tk.DISABLED)
     
     def hide_bar_chart(self) -> None:
-        """Скрывает столбчатые диаграммы."""
-        if self.bar_frame:
-            self.bar_frame.destroy()
-            self.bar_frame = None
-            plt.close('all')  # Закрываем все фигуры matplotlib
-            self.bar_canvas_1 = None
-            self.bar_canvas_2 = None
+        """Скрывает столбчатые диаграммы (фигуры сохраняются для повторного показа)."""
+        self.bar_frame.pack_forget()
             
         self.show_bar_button.config(state=tk.NORMAL)
         self.hide_bar_button.config(state=tk.DISABLED)
@@ -405,6 +788,7 @@ class ShowStat(tk.Toplevel):
     def pack_widgets(self) -> None:
         """Упаковывает виджеты в окне."""
         self.title_label.pack(pady=10)
+        self.status_label.pack()
         
         # Кнопки для круговых диаграмм
         self.show_pie_button.pack(pady=5)
@@ -419,6 +803,9 @@ class Application(tk.Tk):
     """Главное окно приложения финансового менеджера.
 
     Attributes:
+        replica: Локальная копия журнала транзакций, общая для всех окон.
+        outbox: Журнал добавленных транзакций, ожидающих отправки на сервер.
+        runner: Пул фоновых потоков для запросов к API, общий для всех окон.
         title_label: Заголовок приложения.
         add_notes_button: Кнопка для открытия окна добавления записей.
         del_notes_button: Кнопка для открытия окна удаления записей.
@@ -430,6 +817,11 @@ class Application(tk.Tk):
         """Инициализирует главное окно приложения."""
         super().__init__()
         self.title("Финансовый менеджер")
+        self.replica: LocalReplica = LocalReplica()
+        self.outbox: Outbox = Outbox(on_error=self.on_outbox_error)
+        self.outbox.start()
+        self.runner: BackgroundRunner = BackgroundRunner(self)
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
         
         self.title_label: tk.Label = tk.Label(self, text="Финансовый менеджер", font=("Helvetica", 24))
         self.add_notes_button: ttk.Button = ttk.Button(self, text="Добавить запись", command=self.open_add_notes)
@@ -442,6 +834,19 @@ class Application(tk.Tk):
         )
         self.pack_widgets()
     
+    def on_close(self) -> None:
+        """Останавливает фоновые потоки и закрывает приложение."""
+        self.runner.shutdown()
+        self.outbox.close(timeout=OUTBOX_CLOSE_TIMEOUT)
+        self.destroy()
+    
+    def on_outbox_error(self, error: BaseException) -> None:
+        """Сообщает об ошибке отправки журнала (вызывается из фонового потока)."""
+        if isinstance(error, HTTPError) and error.response is not None and error.response.status_code == 400:
+            print(f"Сервер отклонил транзакции (сохранены в журнале как отклоненные): {error}")
+        else:
+            print(f"Транзакции не отправлены, повтор позже: {error}")
+    
     def transaction_list_show(self) -> None:
         """Открывает окно списка транзакций."""
         TransationListWindow(self)
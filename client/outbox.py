@@ -0,0 +1,214 @@
+"""Локальный журнал добавляемых транзакций с фоновой отправкой на сервер пачками.
+
+Outbox.add записывает транзакцию в локальную базу SQLite и сразу возвращает
+управление: ввод данных не ждет сети, а запись не теряется, если сервер
+недоступен или приложение закрыто до отправки. Фоновый поток отправляет
+накопленные записи через POST /api/transactions/batch пачками по batch_size
+и удаляет их из журнала только после ответа сервера.
+
+У каждой записи есть ключ идемпотентности (idempotency_key): если ответ
+потерялся и пачка отправляется повторно, сервер не добавляет транзакции
+второй раз, а возвращает их прежние id.
+"""
+import os
+import sqlite3
+import threading
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from requests import HTTPError, RequestException
+
+from api_client import FinanceClient, add_transactions
+
+DEFAULT_PATH: str = os.path.join(os.path.expanduser("~"), ".finance_manager", "outbox.db")
+FLUSH_BATCH_SIZE: int = 500  # Сколько записей отправляется одним запросом
+FLUSH_DELAY: float = 0.5  # Сколько секунд после записи ждать следующих, чтобы отправить их одной пачкой
+RETRY_DELAY: float = 1.0  # Пауза перед первым повтором после ошибки сети, в секундах
+MAX_RETRY_DELAY: float = 60.0  # Предельная пауза между повторами (пауза удваивается после каждой ошибки)
+
+SCHEMA: str = """
+    PRAGMA journal_mode = WAL;
+    CREATE TABLE IF NOT EXISTS outbox (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        idempotency_key TEXT NOT NULL UNIQUE,
+        amount REAL NOT NULL,
+        category TEXT NOT NULL,
+        date TEXT NOT NULL,
+        type TEXT NOT NULL,
+        description TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS rejected (
+        seq INTEGER PRIMARY KEY,
+        idempotency_key TEXT NOT NULL,
+        amount REAL NOT NULL,
+        category TEXT NOT NULL,
+        date TEXT NOT NULL,
+        type TEXT NOT NULL,
+        description TEXT NOT NULL,
+        error TEXT NOT NULL
+    );
+"""
+FIELDS: Tuple[str, ...] = ("idempotency_key", "amount", "category", "date", "type", "description")
+
+
+class Outbox:
+    """Журнал транзакций, ожидающих отправки на сервер.
+
+    Записи, которые сервер отклонил при проверке (ответ 400), переносятся в
+    таблицу rejected, чтобы они не блокировали отправку остальных.
+
+    Attributes:
+        path: Путь к файлу локальной базы журнала.
+        conn: Соединение с локальной базой.
+        batch_size: Сколько записей отправляется одним запросом.
+        delay: Сколько секунд ждать следующих записей перед отправкой.
+        on_error: Вызывается из фонового потока с исключением отправки или отказа сервера.
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH, client: Optional[FinanceClient] = None,
+                 batch_size: int = FLUSH_BATCH_SIZE, delay: float = FLUSH_DELAY,
+                 on_error: Optional[Callable[[BaseException], None]] = None) -> None:
+        """Открывает (или создает) журнал; отправка начинается после start().
+
+        Args:
+            path: Путь к файлу локальной базы журнала.
+            client: Клиент API для отправки (None - клиент api_client по умолчанию).
+            batch_size: Сколько записей отправляется одним запросом.
+            delay: Сколько секунд ждать следующих записей перед отправкой.
+            on_error: Обработчик ошибок отправки (вызывается из фонового потока).
+        """
+        self.path: str = path
+        self._add_transactions: Callable[..., List[int]] = (
+            client.add_transactions if client is not None else add_transactions
+        )
+        self.batch_size: int = batch_size
+        self.delay: float = delay
+        self.on_error: Optional[Callable[[BaseException], None]] = on_error
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn: sqlite3.Connection = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+        self._lock: threading.Lock = threading.Lock()  # Соединение используется из GUI и из потока отправки
+        self._wakeup: threading.Event = threading.Event()
+        self._stopping: threading.Event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, amount: float, category: str, date: str, transaction_type: str, description: str = "") -> str:
+        """Записывает транзакцию в журнал и будит поток отправки.
+
+        Args:
+            amount: Сумма транзакции.
+            category: Категория транзакции.
+            date: Дата в формате "YYYY-MM-DD".
+            transaction_type: Тип транзакции ("доход" или "расход").
+            description: Описание транзакции.
+
+        Returns:
+            str: Ключ идемпотентности записи.
+        """
+        key: str = uuid.uuid4().hex
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO outbox (idempotency_key, amount, category, date, type, description) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, amount, category, date, transaction_type, description)
+            )
+        self._wakeup.set()
+        return key
+
+    def pending(self) -> int:
+        """Количество записей, ожидающих отправки."""
+        with self._lock:
+            return self.conn.execute("SELECT count(*) FROM outbox").fetchone()[0]
+
+    def rejected(self) -> List[Dict[str, Any]]:
+        """Записи, отклоненные сервером, с текстом ошибки в поле "error"."""
+        with self._lock:
+            cursor = self.conn.execute(f"SELECT {', '.join(FIELDS)}, error FROM rejected ORDER BY seq")
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor]
+
+    def flush(self) -> int:
+        """Отправляет все накопленные записи пачками по batch_size.
+
+        Пачка удаляется из журнала в одной локальной транзакции после ответа
+        сервера, поэтому прерванная отправка продолжится с той же пачки.
+
+        Returns:
+            int: Количество добавленных на сервер транзакций.
+
+        Raises:
+            RequestException: Если сервер недоступен или ответил ошибкой (кроме 400).
+        """
+        sent = 0
+        while True:
+            with self._lock:
+                rows = self.conn.execute(
+                    f"SELECT seq, {', '.join(FIELDS)} FROM outbox ORDER BY seq LIMIT ?", (self.batch_size,)
+                ).fetchall()
+            if not rows:
+                return sent
+            batch = [dict(zip(FIELDS, row[1:])) for row in rows]
+            try:
+                self._add_transactions(batch, chunk_size=self.batch_size)
+            except HTTPError as e:
+                if e.response is None or e.response.status_code != 400:
+                    raise
+                self._reject(rows, e)
+                continue
+            with self._lock, self.conn:
+                self.conn.execute("DELETE FROM outbox WHERE seq BETWEEN ? AND ?", (rows[0][0], rows[-1][0]))
+            sent += len(rows)
+
+    def _reject(self, rows: List[Tuple[Any, ...]], error: HTTPError) -> None:
+        """Переносит в rejected записи пачки, которые сервер назвал некорректными."""
+        try:
+            errors: Dict[int, str] = {item["index"]: item["error"] for item in error.response.json()["errors"]}
+        except (ValueError, KeyError, TypeError):
+            errors = {index: str(error) for index in range(len(rows))}  # Без списка ошибок - отклонена вся пачка
+        with self._lock, self.conn:
+            for index, message in errors.items():
+                self.conn.execute(
+                    f"INSERT OR REPLACE INTO rejected (seq, {', '.join(FIELDS)}, error) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (*rows[index], message)
+                )
+                self.conn.execute("DELETE FROM outbox WHERE seq = ?", (rows[index][0],))
+        if self.on_error is not None:
+            self.on_error(error)
+
+    def start(self) -> None:
+        """Запускает поток отправки; записи, оставшиеся с прошлого запуска, отправляются сразу."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._wakeup.set()
+        self._thread = threading.Thread(target=self._run, name="outbox-flush", daemon=True)
+        self._thread.start()
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Останавливает поток отправки; неотправленные записи остаются в журнале до следующего запуска.
+
+        Args:
+            timeout: Сколько секунд ждать завершения начатой отправки (None - без ограничения).
+        """
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stopping.set()
+            self._wakeup.set()
+            thread.join(timeout)
+
+    def _run(self) -> None:
+        """Ждет новых записей, отправляет их и повторяет отправку с растущей паузой при ошибках сети."""
+        retry_delay: Optional[float] = None
+        while True:
+            self._wakeup.wait(retry_delay)
+            if self._stopping.is_set() or self._stopping.wait(self.delay):
+                return
+            self._wakeup.clear()
+            try:
+                self.flush()
+                retry_delay = None
+            except RequestException as e:
+                retry_delay = min(retry_delay * 2, MAX_RETRY_DELAY) if retry_delay else RETRY_DELAY
+                if self.on_error is not None:
+                    self.on_error(e)
@@ -0,0 +1,126 @@
+"""Локальная копия журнала транзакций в SQLite с дельта-синхронизацией.
+
+После первой синхронизации окна клиента читают данные из локальной базы,
+а каждое обновление запрашивает у сервера только изменения с последнего
+известного номера (GET /api/changes).
+"""
+import os
+import sqlite3
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from api_client import FinanceClient, get_changes
+
+DEFAULT_PATH: str = os.path.join(os.path.expanduser("~"), ".finance_manager", "replica.db")
+SYNC_PAGE_SIZE: int = 5000
+
+SCHEMA: str = """
+    CREATE TABLE IF NOT EXISTS transactions (
+        id INTEGER PRIMARY KEY,
+        amount REAL NOT NULL,
+        category TEXT NOT NULL,
+        date TEXT NOT NULL,
+        type TEXT NOT NULL,
+        description TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS ix_transactions_type_category ON transactions (type, category);
+    CREATE TABLE IF NOT EXISTS meta (
+        key TEXT PRIMARY KEY,
+        value INTEGER NOT NULL
+    );
+"""
+
+
+class LocalReplica:
+    """Локальная копия таблицы transactions сервера.
+
+    Attributes:
+        path: Путь к файлу локальной базы.
+        conn: Соединение с локальной базой.
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH, client: Optional[FinanceClient] = None) -> None:
+        """Открывает (или создает) локальную базу.
+
+        Args:
+            path: Путь к файлу локальной базы.
+            client: Клиент API для синхронизации (None - клиент api_client по умолчанию).
+        """
+        self.path: str = path
+        self._get_changes: Callable[[int, int], Dict[str, Any]] = (
+            client.get_changes if client is not None else get_changes
+        )
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn: sqlite3.Connection = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+        self._lock: threading.Lock = threading.Lock()  # Соединение используется из фоновых потоков GUI
+
+    @property
+    def last_seq(self) -> int:
+        """Номер последнего примененного изменения сервера."""
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'last_seq'").fetchone()
+        return row[0] if row else 0
+
+    def sync(self) -> int:
+        """Применяет к локальной копии все изменения сервера с last_seq.
+
+        Каждая страница изменений применяется в одной локальной транзакции
+        вместе с новым last_seq, поэтому прерванная синхронизация продолжится
+        с места остановки.
+
+        Returns:
+            int: Количество примененных изменений.
+        """
+        applied = 0
+        with self._lock:
+            since = self.last_seq
+            while True:
+                page: Dict[str, Any] = self._get_changes(since, SYNC_PAGE_SIZE)
+                if since > page["current_seq"]:
+                    # База сервера пересоздана - начинаем синхронизацию заново
+                    with self.conn:
+                        self.conn.execute("DELETE FROM transactions")
+                        self.conn.execute("DELETE FROM meta")
+                    since = 0
+                    continue
+                with self.conn:
+                    # Изменения применяются строго по порядку seq: транзакцию могут изменить или удалить после добавления
+                    for change in page["changes"]:
+                        if change["op"] == "upsert":
+                            t = change["transaction"]
+                            self.conn.execute(
+                                "INSERT OR REPLACE INTO transactions VALUES (?, ?, ?, ?, ?, ?)",
+                                (t["id"], t["amount"], t["category"], t["date"], t["type"], t["description"])
+                            )
+                        else:
+                            self.conn.execute("DELETE FROM transactions WHERE id = ?", (change["id"],))
+                    self.conn.execute(
+                        "INSERT OR REPLACE INTO meta (key, value) VALUES ('last_seq', ?)", (page["next_since"],)
+                    )
+                applied += len(page["changes"])
+                since = page["next_since"]
+                if not page["has_more"]:
+                    return applied
+
+    def transactions(self) -> List[Dict[str, Any]]:
+        """Возвращает все транзакции локальной копии в порядке id."""
+        with self._lock:
+            cursor = self.conn.execute(
+                "SELECT id, amount, category, date, type, description FROM transactions ORDER BY id"
+            )
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor]
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Возвращает суммы по типу и категории в формате GET /api/stats.
+
+        Суммы складываются в копейках, поэтому итог не накапливает ошибку округления float.
+        """
+        with self._lock:
+            cursor = self.conn.execute(
+                "SELECT type, category, sum(CAST(round(amount * 100) AS INTEGER)) / 100.0, count(*) "
+                "FROM transactions GROUP BY type, category"
+            )
+            return [{"type": transaction_type, "category": category, "total": total, "count": count}
+                    for transaction_type, category, total, count in cursor]
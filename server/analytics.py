@@ -0,0 +1,195 @@
+"""Аналитика сумм транзакций по категориям: итоги, средние, перцентили и крупнейшие транзакции.
+
+Колонки транзакций загружаются в массивы NumPy, и все показатели считаются
+векторными операциями без цикла по транзакциям в Python:
+- одна сортировка по ключу (категория, сумма) разбивает суммы на группы
+- итоги - np.add.reduceat по началам групп, количества - np.bincount
+- перцентили - выборка из отсортированных групп с линейной интерполяцией
+  (как np.percentile с method="linear")
+- крупнейшие N транзакций - по порогу из N-го с конца элемента каждой группы
+
+NumPy - необязательная зависимость: без него те же показатели считаются
+на чистом Python (заметно медленнее на больших журналах). Он импортируется
+при первом расчете (см. load_numpy), а не при запуске сервера.
+Суммы на входе и в результате - в копейках (см. app.MINOR_UNITS).
+"""
+import functools
+import math
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+
+PERCENTILES: Tuple[float, ...] = (50, 90, 99)
+TOP_TRANSACTIONS: int = 5  # Сколько крупнейших транзакций возвращается по каждой категории
+
+
+@functools.lru_cache(maxsize=None)
+def load_numpy() -> Any:
+    """Импортирует NumPy при первом вызове и возвращает модуль (None, если он не установлен)."""
+    try:
+        import numpy  # Необязательная зависимость для векторных вычислений
+    except ImportError:
+        return None
+    return numpy
+
+
+class TransactionColumns:
+    """Колонки транзакций для аналитики: массивы NumPy или списки, если NumPy не установлен.
+
+    Attributes:
+        ids: Идентификаторы транзакций.
+        amounts: Суммы в копейках.
+        codes: Номер категории каждой транзакции (индекс в categories).
+        categories: Названия категорий.
+    """
+
+    def __init__(self, ids: Sequence[int], amounts: Sequence[int], codes: Sequence[int],
+                 categories: List[str]) -> None:
+        np: Any = load_numpy()
+        self.ids: Any = np.asarray(ids, dtype=np.int64) if np is not None else list(ids)
+        self.amounts: Any = np.asarray(amounts, dtype=np.int64) if np is not None else list(amounts)
+        self.codes: Any = np.asarray(codes, dtype=np.int64) if np is not None else list(codes)
+        self.categories: List[str] = categories
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple[int, int, str]]) -> "TransactionColumns":
+        """Собирает колонки из строк (id, amount, category).
+
+        Категории кодируются номерами в порядке первого появления, поэтому
+        дальнейшие вычисления работают с целыми числами, а не со строками.
+        """
+        index: Dict[str, int] = {}
+        ids: List[int] = []
+        amounts: List[int] = []
+        codes: List[int] = []
+        for transaction_id, amount, category in rows:
+            ids.append(transaction_id)
+            amounts.append(amount)
+            codes.append(index.setdefault(category, len(index)))
+        return cls(ids, amounts, codes, list(index))
+
+
+def category_summary(columns: TransactionColumns, percentiles: Sequence[float] = PERCENTILES,
+                     top: int = TOP_TRANSACTIONS) -> List[Dict[str, Any]]:
+    """Считает показатели сумм по каждой категории.
+
+    Args:
+        columns: Колонки транзакций.
+        percentiles: Перцентили сумм (от 0 до 100).
+        top: Сколько крупнейших транзакций вернуть по каждой категории.
+
+    Returns:
+        List[Dict[str, Any]]: Категории по убыванию итога в формате
+        {"category", "total", "count", "mean", "percentiles": {"50": ..., ...},
+         "top": [{"id", "amount"}, ...]}; суммы в копейках.
+    """
+    if len(columns) == 0:
+        return []
+    if load_numpy() is not None:
+        return _summary_numpy(columns, percentiles, top)
+    return _summary_python(columns, percentiles, top)
+
+
+def _summary_numpy(columns: TransactionColumns, percentiles: Sequence[float], top: int) -> List[Dict[str, Any]]:
+    """Векторная реализация category_summary."""
+    np: Any = load_numpy()
+    amounts = _sorted_by_category(columns)
+    counts_by_code = np.bincount(columns.codes, minlength=len(columns.categories))
+    codes = np.flatnonzero(counts_by_code)  # Группы идут в порядке возрастания кода
+    counts = counts_by_code[codes]
+    ends = np.cumsum(counts)
+    starts = ends - counts
+    totals = np.add.reduceat(amounts, starts)
+
+    quantiles: Dict[str, Any] = {}
+    for q in percentiles:
+        position = starts + (counts - 1) * (q / 100)
+        lower = np.floor(position).astype(np.int64)
+        upper = np.minimum(lower + 1, ends - 1)
+        quantiles[f"{q:g}"] = amounts[lower] + (amounts[upper] - amounts[lower]) * (position - lower)
+
+    top_rows: Dict[int, List[Dict[str, int]]] = _top_transactions(columns, amounts, codes, counts, ends, top)
+    summary: List[Dict[str, Any]] = []
+    for group, (code, total, count) in enumerate(zip(codes.tolist(), totals.tolist(), counts.tolist())):
+        summary.append({
+            "category": columns.categories[code],
+            "total": total,
+            "count": count,
+            "mean": total / count,
+            "percentiles": {name: float(values[group]) for name, values in quantiles.items()},
+            "top": top_rows.get(code, []),
+        })
+    summary.sort(key=lambda row: row["total"], reverse=True)
+    return summary
+
+
+def _sorted_by_category(columns: TransactionColumns) -> Any:
+    """Возвращает суммы, отсортированные по (категория, сумма).
+
+    Категория и сумма упаковываются в один ключ int64, который сортируется
+    np.sort: это в разы быстрее np.lexsort по двум колонкам. Если ключ
+    не помещается в int64, используется np.lexsort.
+    """
+    np: Any = load_numpy()
+    low: int = int(columns.amounts.min())
+    span: int = int(columns.amounts.max()) - low + 1
+    if span * len(columns.categories) >= 2 ** 62:
+        return columns.amounts[np.lexsort((columns.amounts, columns.codes))]
+    return np.sort(columns.codes * span + (columns.amounts - low)) % span + low
+
+
+def _top_transactions(columns: TransactionColumns, amounts: Any, codes: Any, counts: Any, ends: Any,
+                      top: int) -> Dict[int, List[Dict[str, int]]]:
+    """Находит top крупнейших транзакций каждой категории.
+
+    Порог каждой категории - top-я по величине сумма из отсортированного массива.
+    Транзакций не меньше порога немного, поэтому только они сортируются
+    по (категория, сумма по убыванию, id по убыванию).
+    """
+    np: Any = load_numpy()
+    if top == 0:
+        return {}
+    thresholds = np.zeros(len(columns.categories), dtype=np.int64)
+    thresholds[codes] = amounts[ends - np.minimum(counts, top)]
+    candidates = np.flatnonzero(columns.amounts >= thresholds[columns.codes])
+    candidate_codes = columns.codes[candidates]
+    order = np.lexsort((-columns.ids[candidates], -columns.amounts[candidates], candidate_codes))
+    top_rows: Dict[int, List[Dict[str, int]]] = {}
+    for code, transaction_id, amount in zip(candidate_codes[order].tolist(), columns.ids[candidates][order].tolist(),
+                                            columns.amounts[candidates][order].tolist()):
+        rows: List[Dict[str, int]] = top_rows.setdefault(code, [])
+        if len(rows) < top:
+            rows.append({"id": transaction_id, "amount": amount})
+    return top_rows
+
+
+def _percentile(values: List[int], q: float) -> float:
+    """Перцентиль отсортированного списка с линейной интерполяцией."""
+    position: float = (len(values) - 1) * (q / 100)
+    lower: int = math.floor(position)
+    upper: int = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+def _summary_python(columns: TransactionColumns, percentiles: Sequence[float], top: int) -> List[Dict[str, Any]]:
+    """Реализация category_summary без NumPy."""
+    groups: Dict[int, List[Tuple[int, int]]] = {}
+    for transaction_id, amount, code in zip(columns.ids, columns.amounts, columns.codes):
+        groups.setdefault(code, []).append((amount, transaction_id))
+    summary: List[Dict[str, Any]] = []
+    for code, items in groups.items():
+        items.sort()
+        values: List[int] = [amount for amount, _ in items]
+        total: int = sum(values)
+        summary.append({
+            "category": columns.categories[code],
+            "total": total,
+            "count": len(values),
+            "mean": total / len(values),
+            "percentiles": {f"{q:g}": float(_percentile(values, q)) for q in percentiles},
+            "top": [{"id": transaction_id, "amount": amount} for amount, transaction_id in items[:-top - 1:-1]],
+        })
+    summary.sort(key=lambda row: row["total"], reverse=True)
+    return summary
@@ -1,119 +1,1828 @@
-from flask import Flask, request, jsonify
+import csv
+import datetime as dt
+import functools
+import hashlib
+import io
+import json
+import os
+import re
+from array import array
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+import click
+from flask import Blueprint, Flask, Response, current_app, g, request, jsonify, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime
-from sqlalchemy import create_engine, select
+from sqlalchemy import (DDL, String, case, create_engine, delete, event, insert, literal, select, text,
+                        type_coerce, update)
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, sessionmaker
-from typing import Dict, List, Any, Optional, Union
+from typing import IO, Callable, Dict, Iterable, Iterator, List, Any, Optional, Sequence, Set, Tuple, Union
+
+try:
+    import msgpack  # Необязательная зависимость для ответов в формате MessagePack
+except ImportError:
+    msgpack = None
+
+from analytics import PERCENTILES, TOP_TRANSACTIONS, TransactionColumns, category_summary
+from cache import LRUCache
+from export import CSV_MIMETYPE, XLSX_MIMETYPE, stream_csv, stream_xlsx
+from ledgers import DEFAULT_LEDGER, Ledger, LedgerRouter, LedgerSession, ledger_context
+from maintenance import MaintenanceScheduler, full_vacuum, run_maintenance
+from metrics import Metrics
+from migrations import BULK_INSERT_STATEMENTS, upgrade
+from write_queue import GroupCommitWriter
+
+# SQLAlchemy подключается к приложению в create_app; сессия работает с базой журнала запроса (см. ledgers.py)
+db: SQLAlchemy = SQLAlchemy(session_options={"class_": LedgerSession})
+# Все маршруты API и CLI-команды; регистрируются в приложении в create_app дважды:
+# /api/... - журнал по умолчанию, /api/ledgers/<ledger_id>/... - журнал ledger_id
+api: Blueprint = Blueprint("api", __name__, url_prefix="/api", cli_group=None)
+# Список и создание журналов
+ledgers_api: Blueprint = Blueprint("ledgers", __name__, url_prefix="/api/ledgers")
+
+# PRAGMA, выполняемые на каждом новом соединении с SQLite (порядок важен: busy_timeout первым,
+# чтобы смена journal_mode тоже ждала блокировку, а не падала с "database is locked")
+SQLITE_PRAGMAS: Dict[str, Any] = {
+    "busy_timeout": 5000,  # Сколько миллисекунд ждать блокировку другого писателя
+    # Новая база создается с возвратом свободных страниц по PRAGMA incremental_vacuum (см. maintenance.py);
+    # режим должен быть задан до journal_mode, иначе пустая база успеет создаться без него
+    "auto_vacuum": "INCREMENTAL",
+    "journal_mode": "WAL",  # Читатели не блокируют писателя, писатель не блокирует читателей
+    "synchronous": "NORMAL",  # В режиме WAL целостность сохраняется, fsync только при checkpoint
+    "mmap_size": 256 * 1024 * 1024,  # Чтение страниц БД через отображение файла в память
+    "cache_size": -64000,  # Кэш страниц на соединение: отрицательное значение - в КиБ (~64 МБ)
+}
+
+STREAM_BATCH_SIZE: int = 1000  # Сколько строк читаем из БД и сериализуем за один раз
+MAX_PAGE_SIZE: int = 10000  # Максимальный размер страницы для ?limit=
+MAX_BATCH_SIZE: int = 10000  # Максимальное количество транзакций в одном пакетном запросе
+MAX_IDEMPOTENCY_KEY_LENGTH: int = 128  # Максимальная длина ключа идемпотентности ("idempotency_key")
+IMPORT_CHUNK_SIZE: int = 20000  # Сколько строк CSV фиксируется одним коммитом при импорте
+BULK_INSERT_BATCH_SIZE: int = 5000  # Сколько строк вставляет один executemany массовой вставки
+DELETE_CHUNK_SIZE: int = 1000  # Сколько транзакций удаляется одним коммитом (блокировка записи держится недолго)
+MAX_REPORTED_ERRORS: int = 100  # Сколько ошибок строк CSV возвращается в отчете об импорте
+MAX_CACHED_BODY: int = 1024 * 1024  # Ответы больше этого размера (в байтах) не кэшируются
+MINOR_UNITS: int = 100  # Суммы хранятся в копейках: столько минимальных единиц в рубле
+TRANSACTION_FIELDS: Tuple[str, ...] = ("id", "amount", "category", "date", "type", "description")
+MSGPACK_MIMETYPE: str = "application/x-msgpack"
+GROUP_COMMIT_TIMEOUT: float = 30.0  # Сколько секунд запрос ждет коммита своей пачки
+SEARCH_PAGE_SIZE: int = 50  # Размер страницы результатов поиска по умолчанию
+SEARCH_RANK_LIMIT: int = 5000  # До скольких совпадений результаты ранжируются по bm25
+SEARCH_TERM_RE: re.Pattern = re.compile(r"\w+")  # Слова поискового запроса
+
+# Сериализованные ответы GET-запросов по ключу (запрос, версия журнала)
+response_cache: LRUCache = LRUCache(max_entries=256, max_bytes=64 * 1024 * 1024)
+# Закрытые периоды временных рядов по ключу (база, период, категория), см. timeseries
+timeseries_cache: LRUCache = LRUCache(max_entries=64)
+
+
+class Base(DeclarativeBase):
+    """Базовый класс для декларативных моделей SQLAlchemy."""
+    pass
+
+
+class Transaction(db.Model):
+    """Модель для представления финансовой транзакции в базе данных.
+
+    Attributes:
+        id (Mapped[int]): Уникальный идентификатор транзакции (первичный ключ).
+        amount (Mapped[int]): Сумма транзакции в копейках (см. MINOR_UNITS). Не может быть None.
+        category (Mapped[str]): Категория транзакции (например, "Еда", "Транспорт"). Не может быть None.
+        date (Mapped[dt.date]): Дата транзакции. Не может быть None.
+        type (Mapped[str]): Тип транзакции ("доход" или "расход"). Не может быть None.
+        description (Mapped[str]): Описание транзакции. По умолчанию пустая строка.
+    """
+    __tablename__: str = "transactions"
+    __table_args__ = (
+        # Покрывает удаление по (category, date, type) и выборки по типу/категории за период
+        db.Index("ix_transactions_type_category_date", "type", "category", "date"),
+        # Выборки по диапазону дат без фильтра по типу
+        db.Index("ix_transactions_date", "date"),
+        # Сортировка списка по сумме и категории (id в индексе SQLite неявно идет последним)
+        db.Index("ix_transactions_amount", "amount"),
+        db.Index("ix_transactions_category", "category"),
+        # id удаленных транзакций не выдаются заново (см. migrations._autoincrement_ids)
+        {"sqlite_autoincrement": True},
+    )
+    
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    amount: Mapped[int] = mapped_column(nullable=False)
+    category: Mapped[str] = mapped_column(nullable=False)
+    date: Mapped[dt.date] = mapped_column(nullable=False)
+    type: Mapped[str] = mapped_column(nullable=False)
+    description: Mapped[str] = mapped_column(default="")
+
+
+# Сумма транзакции в рублях для ответов API: деление выполняет SQLite при чтении строки
+AMOUNT: Any = (Transaction.amount / float(MINOR_UNITS)).label("amount")
+
+# Полнотекстовый индекс по description и category (FTS5, см. migrations.VIRTUAL_TABLES).
+# rank - скрытая колонка FTS5 со значением bm25: чем меньше, тем релевантнее
+transactions_fts: Any = db.table("transactions_fts", db.column("rowid"), db.column("rank"))
+
+# Начало периода временного ряда (?bucket=) для даты транзакции, в виде строки "YYYY-MM-DD"
+BUCKET_EXPRESSIONS: Dict[str, Any] = {
+    "day": db.func.date(Transaction.date),
+    "week": db.func.date(Transaction.date, "-6 days", "weekday 1"),  # Понедельник недели
+    "month": db.func.strftime("%Y-%m-01", Transaction.date),
+}
+
+# Колонки, по которым можно сортировать список транзакций (?sort=)
+SORT_COLUMNS: Dict[str, Any] = {
+    "id": Transaction.id,
+    "amount": Transaction.amount,
+    "category": Transaction.category,
+    "type": Transaction.type,
+    "date": Transaction.date,
+}
+
+
+class CategoryTotal(db.Model):
+    """Модель сводной таблицы сумм транзакций по типу, категории и месяцу.
+
+    Таблица поддерживается триггерами на transactions (см. migrations.TRIGGERS),
+    поэтому обновляется в той же транзакции БД, что и сами транзакции.
+
+    Attributes:
+        type (Mapped[str]): Тип транзакций ("доход" или "расход").
+        category (Mapped[str]): Категория транзакций.
+        month (Mapped[str]): Месяц в формате "YYYY-MM".
+        total (Mapped[int]): Сумма транзакций за месяц в копейках.
+        count (Mapped[int]): Количество транзакций за месяц.
+    """
+    __tablename__: str = "category_totals"
+
+    type: Mapped[str] = mapped_column(primary_key=True)
+    category: Mapped[str] = mapped_column(primary_key=True)
+    month: Mapped[str] = mapped_column(primary_key=True)
+    total: Mapped[int] = mapped_column(nullable=False, default=0)
+    count: Mapped[int] = mapped_column(nullable=False, default=0)
+
+
+class LedgerState(db.Model):
+    """Модель с единственной строкой состояния журнала транзакций.
+
+    Attributes:
+        id (Mapped[int]): Всегда 1.
+        version (Mapped[int]): Версия журнала, увеличивается каждым изменяющим запросом.
+        bulk_insert (Mapped[bool]): Идет массовая вставка (см. insert_transactions_bulk): триггеры
+            AFTER INSERT ее пропускают. Поднимается только внутри транзакции и в базе всегда False.
+    """
+    __tablename__: str = "ledger_state"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    version: Mapped[int] = mapped_column(nullable=False, default=0)
+    bulk_insert: Mapped[bool] = mapped_column(nullable=False, default=False)
+
+
+event.listen(
+    LedgerState.__table__, "after_create",
+    DDL("INSERT INTO ledger_state (id, version, bulk_insert) VALUES (1, 0, 0)")
+)
+
+
+class Change(db.Model):
+    """Модель журнала изменений таблицы transactions для дельта-синхронизации клиентов.
+
+    Записи добавляются триггерами (см. migrations.TRIGGERS) в той же транзакции БД,
+    что и изменения transactions. Номер seq монотонно растет и не переиспользуется.
+
+    Attributes:
+        seq (Mapped[int]): Порядковый номер изменения.
+        op (Mapped[str]): Операция: "upsert" (транзакция добавлена или изменена) или "delete".
+        transaction_id (Mapped[int]): Идентификатор измененной транзакции.
+    """
+    __tablename__: str = "changes"
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    seq: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    op: Mapped[str] = mapped_column(nullable=False)
+    transaction_id: Mapped[int] = mapped_column(nullable=False)
+
+
+class DeletedTransaction(db.Model):
+    """Модель корзины: транзакции, удаленные с "soft": true, которые можно восстановить.
+
+    Строка переносится сюда из transactions в той же транзакции БД, что и удаление,
+    поэтому для остальных запросов (списки, итоги, поиск, дельта-синхронизация)
+    транзакция удалена. Записи старше TRASH_RETENTION_DAYS удаляет обслуживание
+    (см. maintain_database). id транзакций не переиспользуются (AUTOINCREMENT),
+    поэтому id записи корзины уникален и совпадает с прежним id в журнале.
+
+    Attributes:
+        id (Mapped[int]): Идентификатор удаленной транзакции.
+        amount, category, date, type, description: Поля транзакции (см. Transaction).
+        deleted_at (Mapped[dt.datetime]): Время удаления (UTC).
+    """
+    __tablename__: str = "deleted_transactions"
+    __table_args__ = (db.Index("ix_deleted_transactions_deleted_at", "deleted_at"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    amount: Mapped[int] = mapped_column(nullable=False)
+    category: Mapped[str] = mapped_column(nullable=False)
+    date: Mapped[dt.date] = mapped_column(nullable=False)
+    type: Mapped[str] = mapped_column(nullable=False)
+    description: Mapped[str] = mapped_column(default="")
+    deleted_at: Mapped[dt.datetime] = mapped_column(nullable=False, server_default=db.func.current_timestamp())
+
+
+class IdempotencyKey(db.Model):
+    """Модель ключей идемпотентности пакетного добавления транзакций.
+
+    Клиент, который повторяет запрос после сетевой ошибки (например, журнал
+    офлайн-записей client/outbox.py), передает в каждой транзакции ключ; транзакция
+    с уже известным ключом не добавляется повторно, а в ответе возвращается ее id.
+    id транзакций не переиспользуются (AUTOINCREMENT), поэтому после удаления
+    транзакции ключ не указывает на другую: повтор вернет id удаленной.
+    Записи старше IDEMPOTENCY_RETENTION_DAYS удаляет обслуживание (см. maintain_database).
+
+    Attributes:
+        key (Mapped[str]): Ключ, присланный клиентом.
+        transaction_id (Mapped[int]): Идентификатор транзакции, добавленной с этим ключом.
+        created_at (Mapped[dt.datetime]): Время добавления (UTC).
+    """
+    __tablename__: str = "idempotency_keys"
+    __table_args__ = (db.Index("ix_idempotency_keys_created_at", "created_at"),)
+
+    key: Mapped[str] = mapped_column(primary_key=True)
+    transaction_id: Mapped[int] = mapped_column(nullable=False)
+    created_at: Mapped[dt.datetime] = mapped_column(nullable=False, server_default=db.func.current_timestamp())
+
+
+def current_ledger() -> Ledger:
+    """Возвращает журнал текущего запроса или CLI-команды (по умолчанию - DEFAULT_LEDGER)."""
+    ledger: Optional[Ledger] = g.get("ledger")
+    return ledger if ledger is not None else current_app.extensions["ledgers"].default
+
+
+@api.url_value_preprocessor
+def _pop_ledger_id(endpoint: Optional[str], values: Optional[Dict[str, Any]]) -> None:
+    """Забирает ledger_id из параметров URL, чтобы обработчики маршрутов его не получали."""
+    g.ledger_id = values.pop("ledger_id", DEFAULT_LEDGER) if values else DEFAULT_LEDGER
+
+
+@api.before_request
+def _select_ledger() -> Optional[tuple]:
+    """Открывает журнал запроса; неизвестный журнал - ошибка 404."""
+    try:
+        g.ledger = current_app.extensions["ledgers"].get(g.ledger_id)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except LookupError as e:
+        return jsonify({"error": str(e)}), 404
+    return None
+
+
+def ledger_option(command: Callable[..., Any]) -> Callable[..., Any]:
+    """Добавляет CLI-команде опцию --ledger: команда работает с базой этого журнала."""
+    @click.option("--ledger", "ledger_id", default=DEFAULT_LEDGER, show_default=True,
+                  help="Журнал, с базой которого работает команда.")
+    @functools.wraps(command)
+    def wrapper(ledger_id: str, *args: Any, **kwargs: Any) -> Any:
+        try:
+            g.ledger = current_app.extensions["ledgers"].get(ledger_id)
+        except (ValueError, LookupError) as e:
+            raise click.BadParameter(str(e), param_hint="--ledger") from None
+        return command(*args, **kwargs)
+
+    return wrapper
+
+
+def current_ledger_version() -> int:
+    """Возвращает текущую версию журнала транзакций."""
+    return db.session.execute(db.select(LedgerState.version).where(LedgerState.id == 1)).scalar_one()
+
+
+def bump_ledger_version() -> None:
+    """Увеличивает версию журнала в текущей транзакции сессии.
+
+    Вызывается каждым запросом, изменяющим transactions, перед коммитом,
+    чтобы ETag и кэш ответов GET-запросов стали неактуальными.
+    """
+    db.session.execute(update(LedgerState).where(LedgerState.id == 1).values(version=LedgerState.version + 1))
+
+
+def _capture_body(chunks: Iterable[bytes], key: Tuple[Any, ...], mimetype: str,
+                  headers: Dict[str, str]) -> Iterator[bytes]:
+    """Передает части потокового ответа дальше и кэширует тело, если оно не больше MAX_CACHED_BODY."""
+    parts: Optional[List[bytes]] = []
+    size: int = 0
+    for chunk in chunks:
+        if parts is not None:
+            size += len(chunk)
+            if size <= MAX_CACHED_BODY:
+                parts.append(chunk)
+            else:
+                parts = None  # Слишком большой ответ - отдаем потоково без кэширования
+        yield chunk
+    if parts is not None:
+        response_cache.put(key, (b"".join(parts), mimetype, headers), size)
+
+
+def cached_read(view: Callable[..., Any]) -> Callable[..., Any]:
+    """Декоратор GET-обработчика: ETag, условные запросы и кэш ответов.
+
+    ETag строится из версии журнала и параметров запроса. Если клиент прислал
+    совпадающий If-None-Match, возвращается 304 без выполнения обработчика.
+    Иначе ответ берется из response_cache или формируется обработчиком и
+    кэшируется по ключу (запрос, версия журнала).
+    """
+    @functools.wraps(view)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        version: int = current_ledger_version()
+        key: Tuple[Any, ...] = (request.full_path, str(request.accept_mimetypes), version)
+        digest: str = hashlib.sha1(repr(key[:2]).encode()).hexdigest()[:16]
+        etag: str = f"{version}-{digest}"
+        if request.if_none_match.contains(etag):
+            response: Response = Response(status=304)
+            response.set_etag(etag)
+            return response
+
+        cached: Optional[Tuple[bytes, str, Dict[str, str]]] = response_cache.get(key)
+        if cached is not None:
+            body, mimetype, headers = cached
+            response = Response(body, mimetype=mimetype, headers=headers)
+        else:
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            headers: Dict[str, str] = {name: value for name, value in response.headers
+                                       if name.lower().startswith("x-")}
+            if response.is_streamed:
+                response.response = _capture_body(response.iter_encoded(), key, response.mimetype, headers)
+            else:
+                response_cache.put(key, (response.get_data(), response.mimetype, headers),
+                                   response.content_length or 0)
+        response.set_etag(etag)
+        return response
+
+    return wrapper
+
+
+def serialize_transaction(t: Transaction) -> Dict[str, Any]:
+    """Преобразует транзакцию в словарь для JSON-ответа.
+
+    Args:
+        t: Транзакция из базы данных.
+
+    Returns:
+        Dict[str, Any]: Словарь с полями транзакции.
+    """
+    return {
+        "id": t.id,
+        "amount": from_minor_units(t.amount),
+        "category": t.category,
+        "date": t.date.isoformat(),
+        "type": t.type,
+        "description": t.description
+    }
+
+
+def to_minor_units(value: Any) -> int:
+    """Переводит сумму в рублях в целое количество копеек без потерь точности.
+
+    Args:
+        value: Сумма из запроса: число, Decimal или строка.
+
+    Returns:
+        int: Сумма в копейках.
+
+    Raises:
+        ValueError: Если значение не является конечным числом или у него больше двух знаков после запятой.
+    """
+    shown: str = repr(str(value)) if isinstance(value, Decimal) else repr(value)
+    if isinstance(value, bool):
+        raise ValueError(f"Invalid amount: {shown}")
+    try:
+        minor: Decimal = Decimal(str(value)) * MINOR_UNITS
+    except InvalidOperation:
+        raise ValueError(f"Invalid amount: {shown}") from None
+    if not minor.is_finite() or minor != minor.to_integral_value():
+        raise ValueError(f"Invalid amount: {shown}, expected at most 2 decimal places")
+    return int(minor)
+
+
+def from_minor_units(value: int) -> float:
+    """Переводит сумму в копейках в рубли для JSON-ответа."""
+    return value / MINOR_UNITS
+
+
+def parse_date(value: Any) -> dt.date:
+    """Разбирает дату в формате "YYYY-MM-DD".
+
+    Args:
+        value: Значение из запроса.
+
+    Returns:
+        dt.date: Разобранная дата.
+
+    Raises:
+        ValueError: Если значение не является корректной датой.
+    """
+    if not isinstance(value, str):
+        raise ValueError(f"Invalid date: {value!r}")
+    try:
+        return dt.date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid date: {value!r}, expected YYYY-MM-DD") from None
+
+
+def validate_transaction(data: Any) -> Dict[str, Any]:
+    """Проверяет и нормализует транзакцию из тела запроса.
+
+    Args:
+        data: Объект из JSON с полями amount, category, date, type и необязательным description.
+
+    Returns:
+        Dict[str, Any]: Значения колонок для вставки в таблицу transactions.
+
+    Raises:
+        ValueError: Если поле отсутствует или имеет некорректное значение.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Transaction must be a JSON object")
+    missing: List[str] = [field for field in ("amount", "category", "date", "type") if field not in data]
+    if missing:
+        raise ValueError(f"Missing required field: {missing[0]!r}")
+    amount: Any = data["amount"]
+    if isinstance(amount, bool) or not isinstance(amount, (int, float, Decimal)):
+        raise ValueError(f"Invalid amount: {amount!r}")
+    for field in ("category", "type"):
+        if not isinstance(data[field], str) or not data[field]:
+            raise ValueError(f"Invalid {field}: {data[field]!r}")
+    description: Any = data.get("description", "")
+    if not isinstance(description, str):
+        raise ValueError(f"Invalid description: {description!r}")
+    return {
+        "amount": to_minor_units(amount),
+        "category": data["category"],
+        "date": parse_date(data["date"]),
+        "type": data["type"],
+        "description": description
+    }
+
+
+def insert_transactions(rows: List[Dict[str, Any]]) -> List[int]:
+    """Вставляет проверенные транзакции одним executemany в текущей транзакции сессии.
+
+    Коммит выполняет вызывающий код, чтобы вся пачка записывалась одним fsync.
+
+    Args:
+        rows: Значения колонок, полученные из validate_transaction.
+
+    Returns:
+        List[int]: Идентификаторы новых транзакций в порядке rows.
+    """
+    if not rows:
+        return []
+    statement = insert(Transaction.__table__).returning(Transaction.id, sort_by_parameter_order=True)
+    return list(db.session.execute(statement, rows).scalars())
+
+
+def insert_transactions_bulk(rows: List[Dict[str, Any]]) -> None:
+    """Вставляет большую пачку транзакций, обновляя производные таблицы один раз на пачку.
+
+    Пока в ledger_state поднят флаг bulk_insert, триггеры AFTER INSERT пропускают
+    строки, а category_totals, transactions_fts и changes затем обновляются
+    запросами migrations.BULK_INSERT_STATEMENTS по всем новым строкам сразу -
+    это в несколько раз быстрее построчных триггеров. Флаг поднимается и
+    опускается в текущей транзакции сессии, поэтому другие соединения его не
+    видят. Коммит (и откат при ошибке) выполняет вызывающий код.
+
+    Args:
+        rows: Значения колонок, полученные из validate_transaction.
+    """
+    # UPDATE берет блокировку записи до чтения max(id): чужие строки не попадут в диапазон пачки
+    db.session.execute(update(LedgerState).where(LedgerState.id == 1).values(bulk_insert=True))
+    after_id: int = db.session.execute(select(db.func.coalesce(db.func.max(Transaction.id), 0))).scalar_one()
+    statement = insert(Transaction.__table__)
+    for batch in _chunks(rows, BULK_INSERT_BATCH_SIZE):
+        db.session.execute(statement, batch)
+    for statement in BULK_INSERT_STATEMENTS:
+        db.session.execute(text(statement), {"after_id": after_id})
+    db.session.execute(update(LedgerState).where(LedgerState.id == 1).values(bulk_insert=False))
+
+
+def iter_transactions(after_id: int = 0, limit: Optional[int] = None, offset: int = 0,
+                      sort: str = "id", descending: bool = False,
+                      filters: Iterable[Any] = ()) -> Iterator[Tuple[Any, ...]]:
+    """Лениво перебирает транзакции в заданном порядке в виде кортежей.
+
+    Читаются строки Core-запроса без создания ORM-объектов: кортеж содержит
+    значения полей в порядке TRANSACTION_FIELDS, а дата остается строкой
+    "YYYY-MM-DD" в том виде, в котором хранится в SQLite.
+    Строки читаются из БД пачками по STREAM_BATCH_SIZE (yield_per),
+    поэтому в памяти одновременно находится только одна пачка.
+    При равных значениях колонки сортировки порядок задает id, поэтому
+    страницы с разным offset не пересекаются.
+
+    Args:
+        after_id: Курсор - возвращаются только транзакции с id больше этого значения.
+        limit: Максимальное количество транзакций (None - без ограничения).
+        offset: Сколько транзакций пропустить от начала выборки.
+        sort: Колонка сортировки (ключ SORT_COLUMNS).
+        descending: Сортировать по убыванию.
+        filters: Дополнительные условия для .where() (см. _transaction_filters).
+
+    Yields:
+        Tuple[Any, ...]: Значения полей очередной транзакции.
+    """
+    column: Any = SORT_COLUMNS[sort]
+    order: List[Any] = [column.desc(), Transaction.id.desc()] if descending else [column, Transaction.id]
+    if sort == "id":
+        order = order[:1]
+    query = (
+        select(Transaction.id, AMOUNT, Transaction.category,
+               type_coerce(Transaction.date, String), Transaction.type, Transaction.description)
+        .where(Transaction.id > after_id, *filters)
+        .order_by(*order)
+    )
+    if offset:
+        query = query.offset(offset)
+    if limit is not None:
+        query = query.limit(limit)
+    yield from db.session.execute(query.execution_options(yield_per=STREAM_BATCH_SIZE)).tuples()
+
+
+def _transaction_filters() -> Tuple[List[Any], Dict[str, Any]]:
+    """Читает фильтры списка транзакций из параметров запроса category, type, from и to.
+
+    Returns:
+        Tuple[List[Any], Dict[str, Any]]: Условия для .where() и те же фильтры
+        в виде словаря для count_transactions.
+
+    Raises:
+        ValueError: Если одна из дат некорректна.
+    """
+    start, end = _date_range_args()
+    criteria: Dict[str, Any] = {
+        "category": request.args.get("category") or None,
+        "transaction_type": request.args.get("type") or None,
+        "start": start,
+        "end": end,
+    }
+    filters: List[Any] = _date_range_filters(Transaction.date, start, end)
+    if criteria["category"] is not None:
+        filters.append(Transaction.category == criteria["category"])
+    if criteria["transaction_type"] is not None:
+        filters.append(Transaction.type == criteria["transaction_type"])
+    return filters, criteria
+
+
+def count_transactions(category: Optional[str] = None, transaction_type: Optional[str] = None,
+                       start: Optional[dt.date] = None, end: Optional[dt.date] = None) -> int:
+    """Считает транзакции, подходящие под фильтры списка.
+
+    Количество берется из тех же агрегатов, что и /api/stats (см. aggregate_stats),
+    поэтому не требует просмотра всего журнала.
+
+    Args:
+        category: Категория (None - любая).
+        transaction_type: Тип транзакции (None - любой).
+        start: Начальная дата включительно (None - с начала журнала).
+        end: Конечная дата включительно (None - до конца журнала).
+
+    Returns:
+        int: Количество транзакций.
+    """
+    return sum(
+        count for (row_type, row_category), (_, count) in aggregate_stats(start, end).items()
+        if (category is None or row_category == category)
+        and (transaction_type is None or row_type == transaction_type)
+    )
+
+
+def _chunks(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Разбивает итерируемый объект на списки длиной не более size."""
+    iterator = iter(items)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _stream_json_array(rows: Iterable[Tuple[Any, ...]]) -> Iterator[str]:
+    """Сериализует транзакции в JSON-массив объектов по частям."""
+    yield "["
+    separator = ""
+    for chunk in _chunks(rows, STREAM_BATCH_SIZE):
+        yield separator + ",".join(json.dumps(dict(zip(TRANSACTION_FIELDS, row)), ensure_ascii=False)
+                                   for row in chunk)
+        separator = ","
+    yield "]"
+
+
+def _stream_ndjson(rows: Iterable[Tuple[Any, ...]]) -> Iterator[str]:
+    """Сериализует транзакции в NDJSON (один JSON-объект на строку) по частям."""
+    for chunk in _chunks(rows, STREAM_BATCH_SIZE):
+        yield "".join(json.dumps(dict(zip(TRANSACTION_FIELDS, row)), ensure_ascii=False) + "\n" for row in chunk)
+
+
+def _to_columns(rows: Iterable[Tuple[Any, ...]]) -> Dict[str, List[Any]]:
+    """Собирает транзакции в словарь "поле -> массив значений" (колоночный формат)."""
+    columns: Tuple[Tuple[Any, ...], ...] = tuple(zip(*rows))
+    if not columns:
+        return {field: [] for field in TRANSACTION_FIELDS}
+    return {field: list(values) for field, values in zip(TRANSACTION_FIELDS, columns)}
+
+
+def _response_format() -> Optional[str]:
+    """Выбирает формат списка транзакций: json, ndjson, columnar или msgpack.
+
+    Явный параметр ?format= важнее заголовка Accept. MessagePack выбирается
+    только если установлен пакет msgpack.
+
+    Returns:
+        Optional[str]: Формат ответа или None, если запрошенный формат недоступен.
+    """
+    requested: Optional[str] = request.args.get("format")
+    if requested is not None:
+        if requested == "msgpack" and msgpack is None:
+            return None
+        return requested if requested in ("json", "ndjson", "columnar", "msgpack") else None
+    offered: List[str] = ["application/json", "application/x-ndjson"]
+    if msgpack is not None:
+        offered.append(MSGPACK_MIMETYPE)
+    best: Optional[str] = request.accept_mimetypes.best_match(offered, default="application/json")
+    return {"application/x-ndjson": "ndjson", MSGPACK_MIMETYPE: "msgpack"}.get(best, "json")
+
+
+@api.route("/transactions", methods=["GET"])
+@cached_read
+def get_transactions() -> Union[Response, tuple]:
+    """Обрабатывает GET-запрос для получения списка транзакций.
+
+    Поддерживает пагинацию через параметры запроса:
+    - after_id: int - вернуть транзакции с id больше указанного (по умолчанию 0)
+    - offset: int - пропустить указанное количество транзакций (по умолчанию 0)
+    - limit: int - размер страницы (не больше MAX_PAGE_SIZE)
+
+    Сортировка и фильтры:
+    - sort: str - колонка сортировки: id (по умолчанию), amount, category, type или date
+    - order: str - asc (по умолчанию) или desc
+    - category: str, type: str - точное совпадение категории и типа
+    - from: str, to: str - диапазон дат включительно ("YYYY-MM-DD")
+
+    При сортировке по возрастанию id и заполненной странице в заголовке
+    X-Next-After-Id передается курсор для следующего запроса (keyset-пагинация).
+    Для остальных порядков страницы запрашиваются через offset. На первой
+    странице (limit задан, after_id и offset не заданы) в заголовке X-Total-Count
+    передается количество подходящих транзакций; следующие страницы его не
+    пересчитывают.
+    Без limit возвращаются все транзакции.
+
+    Строки читаются без создания ORM-объектов (см. iter_transactions).
+    Формат ответа выбирается параметром ?format= или заголовком Accept:
+    - json (по умолчанию) - массив объектов, формируется потоково, поэтому
+      память сервера не зависит от размера журнала
+    - ndjson (Accept: application/x-ndjson) - по одному объекту на строку, потоково
+    - columnar - JSON-объект с массивом значений для каждого поля
+    - msgpack (Accept: application/x-msgpack) - те же массивы в MessagePack;
+      доступен, если установлен пакет msgpack, иначе ?format=msgpack вернет 406
+    Колоночные форматы собираются в памяти целиком, поэтому рассчитаны на
+    постраничные запросы с limit. Поддерживаются ETag и If-None-Match (см. cached_read).
+
+    Returns:
+        Union[Response, tuple]: JSON-ответ со списком транзакций в формате:
+        [
+            {
+                "id": int,
+                "amount": float,
+                "category": str,
+                "date": str,
+                "type": str,
+                "description": str
+            },
+            ...
+        ]
+        В случае некорректных параметров возвращает JSON с описанием ошибки и статусом 400.
+
+    Examples:
+        >>> GET /api/transactions?after_id=100&limit=2
+        <<< 200 OK
+        <<< X-Next-After-Id: 102
+        <<< [{"id": 101, "amount": 100.0, "category": "Food", ...}, {"id": 102, ...}]
+
+        >>> GET /api/transactions?sort=amount&order=desc&type=расход&limit=100
+        <<< 200 OK
+        <<< X-Total-Count: 5230
+        <<< [{"id": 17, "amount": 90000.0, ...}, ...]
+
+        >>> GET /api/transactions?format=columnar&limit=2
+        <<< 200 OK
+        <<< {"id": [1, 2], "amount": [100.0, 250.0], "category": ["Food", "Rent"], ...}
+    """
+    try:
+        after_id: int = int(request.args.get("after_id", 0))
+        offset: int = int(request.args.get("offset", 0))
+        limit_arg: Optional[str] = request.args.get("limit")
+        limit: Optional[int] = int(limit_arg) if limit_arg is not None else None
+    except ValueError as e:
+        return jsonify({"error": f"Invalid pagination parameters: {str(e)}"}), 400
+    if limit is not None and not 0 < limit <= MAX_PAGE_SIZE:
+        return jsonify({"error": f"limit must be between 1 and {MAX_PAGE_SIZE}"}), 400
+    if offset < 0:
+        return jsonify({"error": "offset must not be negative"}), 400
+
+    sort: str = request.args.get("sort", "id")
+    order: str = request.args.get("order", "asc")
+    if sort not in SORT_COLUMNS:
+        return jsonify({"error": f"sort must be one of: {', '.join(SORT_COLUMNS)}"}), 400
+    if order not in ("asc", "desc"):
+        return jsonify({"error": "order must be asc or desc"}), 400
+    keyset: bool = sort == "id" and order == "asc"
+    if after_id and not keyset:
+        return jsonify({"error": "after_id can only be used with sort=id&order=asc, use offset"}), 400
+    try:
+        filters, criteria = _transaction_filters()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    response_format: Optional[str] = _response_format()
+    if response_format is None:
+        return jsonify({"error": f"Unsupported format: {request.args.get('format')}"}), 406
+
+    headers: Dict[str, str] = {}
+    if limit is not None:
+        if not after_id and not offset:
+            headers["X-Total-Count"] = str(count_transactions(**criteria))
+        if keyset:
+            # Курсор следующей страницы узнаем заранее дешевым запросом по первичному ключу
+            next_after_id: Optional[int] = db.session.execute(
+                db.select(Transaction.id).where(Transaction.id > after_id, *filters)
+                .order_by(Transaction.id).offset(offset + limit - 1).limit(1)
+            ).scalar()
+            if next_after_id is not None:
+                headers["X-Next-After-Id"] = str(next_after_id)
+
+    rows: Iterator[Tuple[Any, ...]] = iter_transactions(after_id, limit, offset, sort, order == "desc", filters)
+    if response_format == "ndjson":
+        return Response(stream_with_context(_stream_ndjson(rows)),
+                        mimetype="application/x-ndjson", headers=headers)
+    if response_format == "columnar":
+        return Response(json.dumps(_to_columns(rows), ensure_ascii=False),
+                        mimetype="application/json", headers=headers)
+    if response_format == "msgpack":
+        return Response(msgpack.packb(_to_columns(rows)), mimetype=MSGPACK_MIMETYPE, headers=headers)
+    return Response(stream_with_context(_stream_json_array(rows)),
+                    mimetype="application/json", headers=headers)
+
+
+def fts_query(text: str) -> Optional[str]:
+    """Преобразует пользовательский запрос в запрос FTS5.
+
+    Каждое слово ищется по началу (префиксный поиск), все слова должны
+    встретиться в описании или категории. Синтаксис FTS5 (операторы,
+    кавычки, имена колонок) из пользовательского текста не используется.
+
+    Args:
+        text: Текст из строки поиска.
+
+    Returns:
+        Optional[str]: Выражение для MATCH или None, если в тексте нет слов.
+    """
+    terms: List[str] = SEARCH_TERM_RE.findall(text)
+    return " ".join(f'"{term}"*' for term in terms) or None
+
+
+@api.route("/transactions/search", methods=["GET"])
+@cached_read
+def search_transactions() -> Union[Response, tuple]:
+    """Обрабатывает GET-запрос полнотекстового поиска транзакций по описанию и категории.
+
+    Поиск идет по индексу FTS5 transactions_fts, который триггеры обновляют вместе
+    с transactions, поэтому журнал целиком не просматривается.
+    Если совпадений не больше SEARCH_RANK_LIMIT, результаты упорядочены по
+    релевантности (bm25), при равной - по id. Для более частых слов bm25 пришлось бы
+    считать для каждого совпадения, поэтому результаты идут от новых к старым:
+    этот порядок FTS5 отдает прямо из индекса. Порядок передается в заголовке
+    X-Search-Order ("rank" или "recent").
+    Параметры запроса:
+    - q: str - поисковый запрос; каждое слово ищется по началу ("прод" найдет "продукты")
+    - offset: int, limit: int - пагинация (по умолчанию 0 и SEARCH_PAGE_SIZE, limit не больше MAX_PAGE_SIZE)
+    - min_amount: float, max_amount: float - диапазон сумм включительно
+    - category: str, type: str, from: str, to: str - те же фильтры, что у GET /api/transactions
+    Если есть следующая страница, ее offset передается в заголовке X-Next-Offset.
+    Поддерживаются ETag и If-None-Match (см. cached_read).
+
+    Returns:
+        Union[Response, tuple]: JSON-ответ со списком транзакций в формате GET /api/transactions.
+        В случае некорректных параметров возвращает JSON с описанием ошибки и статусом 400.
+
+    Examples:
+        >>> GET /api/transactions/search?q=кофе&min_amount=100&limit=20
+        <<< 200 OK
+        <<< X-Next-Offset: 20
+        <<< [{"id": 512, "amount": 250.0, "category": "Food", "description": "Кофе с собой", ...}, ...]
+    """
+    query: Optional[str] = fts_query(request.args.get("q", ""))
+    if query is None:
+        return jsonify({"error": "q must contain at least one word"}), 400
+    try:
+        offset: int = int(request.args.get("offset", 0))
+        limit: int = int(request.args.get("limit", SEARCH_PAGE_SIZE))
+        min_amount: Optional[int] = to_minor_units(request.args["min_amount"]) if request.args.get("min_amount") else None
+        max_amount: Optional[int] = to_minor_units(request.args["max_amount"]) if request.args.get("max_amount") else None
+    except ValueError as e:
+        return jsonify({"error": f"Invalid parameters: {str(e)}"}), 400
+    if not 0 < limit <= MAX_PAGE_SIZE:
+        return jsonify({"error": f"limit must be between 1 and {MAX_PAGE_SIZE}"}), 400
+    if offset < 0:
+        return jsonify({"error": "offset must not be negative"}), 400
+    try:
+        filters, _ = _transaction_filters()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if min_amount is not None:
+        filters.append(Transaction.amount >= min_amount)
+    if max_amount is not None:
+        filters.append(Transaction.amount <= max_amount)
+
+    match: Any = db.text("transactions_fts MATCH :query").bindparams(query=query)
+    # Сколько всего совпадений, считаем только до SEARCH_RANK_LIMIT + 1, чтобы не читать весь индекс
+    matches: int = db.session.execute(
+        select(db.func.count()).select_from(
+            select(transactions_fts.c.rowid).where(match).limit(SEARCH_RANK_LIMIT + 1).subquery())
+    ).scalar_one()
+    ranked: bool = matches <= SEARCH_RANK_LIMIT
+    order: List[Any] = [transactions_fts.c.rank, Transaction.id] if ranked else [transactions_fts.c.rowid.desc()]
+    rows: List[Tuple[Any, ...]] = list(db.session.execute(
+        select(Transaction.id, AMOUNT, Transaction.category,
+               type_coerce(Transaction.date, String), Transaction.type, Transaction.description)
+        .select_from(transactions_fts)
+        .join(Transaction, Transaction.id == transactions_fts.c.rowid)
+        .where(match, *filters)
+        .order_by(*order)
+        .offset(offset)
+        .limit(limit + 1)  # Лишняя строка показывает, есть ли следующая страница
+    ).tuples())
+    headers: Dict[str, str] = {"X-Search-Order": "rank" if ranked else "recent"}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers["X-Next-Offset"] = str(offset + limit)
+    return Response(_stream_json_array(rows), mimetype="application/json", headers=headers)
+
+
+@api.route("/transactions/export", methods=["GET"])
+def export_transactions() -> Union[Response, tuple]:
+    """Обрабатывает GET-запрос выгрузки транзакций в файл CSV или XLSX.
+
+    Файл формируется по мере чтения строк из БД (iter_transactions читает их
+    пачками) и отправляется частями, поэтому память сервера не зависит
+    от размера журнала. Колонки - TRANSACTION_FIELDS, так что выгруженный CSV
+    можно снова загрузить через POST /api/transactions/import.
+    Параметры запроса:
+    - format: str - csv (по умолчанию) или xlsx
+    - category: str, type: str, from: str, to: str - те же фильтры, что у GET /api/transactions
+
+    Returns:
+        Union[Response, tuple]: Файл с заголовком Content-Disposition: attachment.
+        В случае некорректных параметров возвращает JSON с описанием ошибки и статусом 400.
+
+    Examples:
+        >>> GET /api/transactions/export?format=xlsx&from=2024-01-01&to=2024-12-31
+        <<< 200 OK
+        <<< Content-Disposition: attachment; filename=transactions.xlsx
+    """
+    export_format: str = request.args.get("format", "csv")
+    if export_format not in ("csv", "xlsx"):
+        return jsonify({"error": "format must be csv or xlsx"}), 400
+    try:
+        filters, _ = _transaction_filters()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    rows: Iterator[Tuple[Any, ...]] = iter_transactions(filters=filters)
+    if export_format == "xlsx":
+        body: Iterator[bytes] = stream_xlsx(TRANSACTION_FIELDS, rows, (TRANSACTION_FIELDS.index("date"),))
+        mimetype: str = XLSX_MIMETYPE
+    else:
+        body, mimetype = stream_csv(TRANSACTION_FIELDS, rows), CSV_MIMETYPE
+    return Response(stream_with_context(body), mimetype=mimetype,
+                    headers={"Content-Disposition": f"attachment; filename=transactions.{export_format}"})
+
+
+def _date_range_args() -> Tuple[Optional[dt.date], Optional[dt.date]]:
+    """Читает границы диапазона дат из параметров запроса from/to.
+
+    Returns:
+        Tuple[Optional[dt.date], Optional[dt.date]]: Начальная и конечная даты (None, если не заданы).
+
+    Raises:
+        ValueError: Если одна из дат некорректна.
+    """
+    start: Optional[dt.date] = parse_date(request.args["from"]) if request.args.get("from") else None
+    end: Optional[dt.date] = parse_date(request.args["to"]) if request.args.get("to") else None
+    return start, end
+
+
+def _date_range_filters(column: Any, start: Optional[dt.date], end: Optional[dt.date]) -> List[Any]:
+    """Строит условия фильтрации по диапазону дат.
+
+    Args:
+        column: Колонка с датой, к которой применяются условия.
+        start: Начальная дата включительно (None - без ограничения).
+        end: Конечная дата включительно (None - без ограничения).
+
+    Returns:
+        List[Any]: Список условий для .where().
+    """
+    filters: List[Any] = []
+    if start is not None:
+        filters.append(column >= start)
+    if end is not None:
+        filters.append(column <= end)
+    return filters
+
+
+def _month_start(day: dt.date) -> dt.date:
+    """Возвращает первый день месяца даты day."""
+    return day.replace(day=1)
+
+
+def _next_month_start(day: dt.date) -> dt.date:
+    """Возвращает первый день месяца, следующего за месяцем даты day."""
+    return (day.replace(day=28) + dt.timedelta(days=4)).replace(day=1)
+
+
+def aggregate_stats(start: Optional[dt.date] = None,
+                    end: Optional[dt.date] = None) -> Dict[Tuple[str, str], List[Any]]:
+    """Считает суммы и количество транзакций по типу и категории за период.
+
+    Полные месяцы берутся из сводной таблицы category_totals, а неполные
+    месяцы на краях периода досчитываются по индексу на transactions.date.
+    Поэтому стоимость запроса зависит от количества категорий и месяцев,
+    а не от размера журнала.
+
+    Args:
+        start: Начальная дата включительно (None - с начала журнала).
+        end: Конечная дата включительно (None - до конца журнала).
+
+    Returns:
+        Dict[Tuple[str, str], List[Any]]: Словарь "(type, category) -> [total, count]", total в копейках.
+    """
+    # Границы полных месяцев внутри периода
+    first_full: Optional[dt.date] = start if start is None or start.day == 1 else _next_month_start(start)
+    after_full: Optional[dt.date] = None if end is None else _month_start(end + dt.timedelta(days=1))
+
+    queries: List[Any] = []
+    if first_full is None or after_full is None or first_full < after_full:
+        month_filters: List[Any] = []
+        if first_full is not None:
+            month_filters.append(CategoryTotal.month >= first_full.strftime("%Y-%m"))
+        if after_full is not None:
+            month_filters.append(CategoryTotal.month < after_full.strftime("%Y-%m"))
+        queries.append(
+            db.select(CategoryTotal.type, CategoryTotal.category,
+                      db.func.sum(CategoryTotal.total), db.func.sum(CategoryTotal.count))
+            .where(*month_filters)
+            .group_by(CategoryTotal.type, CategoryTotal.category)
+        )
+        raw_ranges: List[Tuple[Optional[dt.date], Optional[dt.date]]] = []
+        if start is not None and start < first_full:
+            raw_ranges.append((start, first_full - dt.timedelta(days=1)))
+        if end is not None and after_full <= end:
+            raw_ranges.append((after_full, end))
+    else:
+        raw_ranges = [(start, end)]  # Период целиком внутри одного месяца
+
+    for range_start, range_end in raw_ranges:
+        queries.append(
+            db.select(Transaction.type, Transaction.category,
+                      db.func.sum(Transaction.amount), db.func.count(Transaction.id))
+            .where(*_date_range_filters(Transaction.date, range_start, range_end))
+            .group_by(Transaction.type, Transaction.category)
+        )
+
+    stats: Dict[Tuple[str, str], List[Any]] = {}
+    for query in queries:
+        for transaction_type, category, total, count in db.session.execute(query):
+            row: List[Any] = stats.setdefault((transaction_type, category), [0, 0])
+            row[0] += total
+            row[1] += count
+    return stats
+
+
+@api.route("/stats", methods=["GET"])
+@cached_read
+def get_stats() -> Union[jsonify, tuple]:
+    """Обрабатывает GET-запрос для получения сумм транзакций по типам и категориям.
+
+    Суммы читаются из сводной таблицы category_totals (см. aggregate_stats), поэтому
+    размер ответа и время запроса зависят только от количества категорий.
+    Необязательные параметры запроса:
+    - from: str - начальная дата включительно ("YYYY-MM-DD")
+    - to: str - конечная дата включительно ("YYYY-MM-DD")
+    Поддерживаются ETag и If-None-Match (см. cached_read).
+
+    Returns:
+        Union[jsonify, tuple]: JSON-ответ со списком агрегатов в формате:
+        [
+            {
+                "type": str,
+                "category": str,
+                "total": float,
+                "count": int
+            },
+            ...
+        ]
+        В случае некорректных дат возвращает JSON с описанием ошибки и статусом 400.
+
+    Examples:
+        >>> GET /api/stats?from=2023-01-01&to=2023-12-31
+        <<< 200 OK
+        <<< [{"type": "расход", "category": "Food", "total": 1500.0, "count": 12}, ...]
+    """
+    try:
+        start, end = _date_range_args()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify([{
+        "type": transaction_type,
+        "category": category,
+        "total": from_minor_units(total),
+        "count": count
+    } for (transaction_type, category), (total, count) in aggregate_stats(start, end).items()])
+
+
+def bucket_start(day: dt.date, bucket: str) -> dt.date:
+    """Возвращает первый день периода bucket ("day", "week" или "month"), содержащего дату day."""
+    if bucket == "week":
+        return day - dt.timedelta(days=day.weekday())
+    if bucket == "month":
+        return _month_start(day)
+    return day
+
+
+def _timeseries_rows(bucket: str, category: Optional[str], start: Optional[dt.date] = None,
+                     before: Optional[dt.date] = None, opening_balance: int = 0) -> List[Tuple[Any, ...]]:
+    """Считает ряд по периодам одним SQL-запросом.
+
+    Суммы группируются по началу периода, а нарастающий остаток считается
+    оконной функцией поверх сгруппированных строк.
+
+    Args:
+        bucket: Длина периода ("day", "week" или "month").
+        category: Категория (None - все категории).
+        start: Учитывать транзакции с этой даты включительно (None - с начала журнала).
+        before: Учитывать транзакции до этой даты, не включая ее (None - до конца журнала).
+        opening_balance: Остаток до первой учтенной транзакции в копейках.
+
+    Returns:
+        List[Tuple[Any, ...]]: Строки (period, income, expense, count, balance) по возрастанию period,
+        суммы в копейках.
+    """
+    filters: List[Any] = []
+    if category is not None:
+        filters.append(Transaction.category == category)
+    if start is not None:
+        filters.append(Transaction.date >= start)
+    if before is not None:
+        filters.append(Transaction.date < before)
+    period = BUCKET_EXPRESSIONS[bucket].label("period")
+    grouped = (
+        select(
+            period,
+            db.func.sum(case((Transaction.type == "доход", Transaction.amount), else_=0)).label("income"),
+            db.func.sum(case((Transaction.type == "расход", Transaction.amount), else_=0)).label("expense"),
+            db.func.count(Transaction.id).label("count"),
+        )
+        .where(*filters)
+        .group_by(period)
+        .subquery()
+    )
+    balance = literal(opening_balance) + db.func.sum(grouped.c.income - grouped.c.expense).over(
+        order_by=grouped.c.period)
+    query = select(grouped.c.period, grouped.c.income, grouped.c.expense, grouped.c.count,
+                   balance).order_by(grouped.c.period)
+    return [tuple(row) for row in db.session.execute(query)]
+
+
+def _closed_periods(bucket: str, category: Optional[str], open_start: dt.date) -> List[Tuple[Any, ...]]:
+    """Возвращает строки ряда для периодов, закончившихся до open_start, из timeseries_cache.
+
+    Кэш проверяется по журналу изменений changes: если после его расчета в журнал
+    только добавлялись транзакции в открытые периоды (новые id с датой не раньше
+    open_start), закрытые периоды не пересчитываются. Удаление, изменение
+    существующей транзакции или добавление задним числом сбрасывают запись кэша.
+    """
+    key: Tuple[Any, ...] = (str(current_ledger().engine.url), bucket, category)
+    current_seq: int = db.session.execute(db.select(db.func.coalesce(db.func.max(Change.seq), 0))).scalar_one()
+    cached: Optional[Tuple[int, int, dt.date, List[Tuple[Any, ...]]]] = timeseries_cache.get(key)
+    if cached is not None:
+        seq, max_id, cached_open_start, rows = cached
+        if cached_open_start == open_start and seq <= current_seq:
+            stale: bool = db.session.execute(
+                db.select(Change.seq)
+                .outerjoin(Transaction, Transaction.id == Change.transaction_id)
+                .where(Change.seq > seq,
+                       (Change.op != "upsert") | (Change.transaction_id <= max_id)
+                       | Transaction.id.is_(None) | (Transaction.date < open_start))
+                .limit(1)
+            ).first() is not None
+            if not stale:
+                timeseries_cache.put(key, (current_seq, max_id, open_start, rows))
+                return rows
+
+    max_id: int = db.session.execute(db.select(db.func.coalesce(db.func.max(Transaction.id), 0))).scalar_one()
+    rows = _timeseries_rows(bucket, category, before=open_start)
+    timeseries_cache.put(key, (current_seq, max_id, open_start, rows))
+    return rows
+
+
+def timeseries(bucket: str, category: Optional[str] = None, start: Optional[dt.date] = None,
+               end: Optional[dt.date] = None) -> List[Dict[str, Any]]:
+    """Строит ряд доходов, расходов и нарастающего остатка по периодам.
+
+    Закрытые периоды (закончившиеся до сегодняшнего дня) берутся из кэша
+    (см. _closed_periods), и при каждом запросе пересчитываются только текущий
+    период и периоды после него. Нарастающий остаток учитывает всю историю,
+    а не только выбранный диапазон.
+
+    Args:
+        bucket: Длина периода ("day", "week" или "month").
+        category: Категория (None - все категории).
+        start: Дата, период которой будет первым в ряду (None - с начала журнала).
+        end: Дата, период которой будет последним в ряду (None - до конца журнала).
+
+    Returns:
+        List[Dict[str, Any]]: Периоды с транзакциями по возрастанию даты начала.
+    """
+    open_start: dt.date = bucket_start(dt.date.today(), bucket)
+    closed: List[Tuple[Any, ...]] = _closed_periods(bucket, category, open_start)
+    opening_balance: int = closed[-1][4] if closed else 0
+    rows: List[Tuple[Any, ...]] = closed + _timeseries_rows(bucket, category, start=open_start,
+                                                             opening_balance=opening_balance)
+    first: Optional[str] = bucket_start(start, bucket).isoformat() if start is not None else None
+    last: Optional[str] = bucket_start(end, bucket).isoformat() if end is not None else None
+    return [{
+        "period": period,
+        "income": from_minor_units(income),
+        "expense": from_minor_units(expense),
+        "net": from_minor_units(income - expense),
+        "balance": from_minor_units(balance),
+        "count": count
+    } for period, income, expense, count, balance in rows
+        if (first is None or period >= first) and (last is None or period <= last)]
+
+
+@api.route("/timeseries", methods=["GET"])
+@cached_read
+def get_timeseries() -> Union[jsonify, tuple]:
+    """Обрабатывает GET-запрос для получения доходов, расходов и остатка по периодам.
+
+    Ряд считается в SQL группировкой по началу периода и оконной функцией
+    для нарастающего остатка; закрытые периоды кэшируются (см. timeseries).
+    Параметры запроса:
+    - bucket: str - длина периода: "day", "week" (с понедельника) или "month" (по умолчанию)
+    - from: str - дата, с периода которой начинается ряд ("YYYY-MM-DD")
+    - to: str - дата, периодом которой заканчивается ряд ("YYYY-MM-DD")
+    - category: str - учитывать только транзакции этой категории
+    Периоды без транзакций в ответ не попадают. Поддерживаются ETag и If-None-Match (см. cached_read).
+
+    Returns:
+        Union[jsonify, tuple]: JSON-ответ в формате:
+        [
+            {
+                "period": str,      # первый день периода, "YYYY-MM-DD"
+                "income": float,
+                "expense": float,
+                "net": float,       # income - expense
+                "balance": float,   # нарастающий остаток на конец периода
+                "count": int
+            },
+            ...
+        ]
+        В случае некорректных параметров возвращает JSON с описанием ошибки и статусом 400.
+
+    Examples:
+        >>> GET /api/timeseries?bucket=month&from=2023-01-01&to=2023-03-31
+        <<< 200 OK
+        <<< [{"period": "2023-01-01", "income": 5000.0, "expense": 1500.0, "net": 3500.0, "balance": 3500.0, ...}]
+    """
+    bucket: str = request.args.get("bucket", "month")
+    if bucket not in BUCKET_EXPRESSIONS:
+        return jsonify({"error": f"bucket must be one of {', '.join(BUCKET_EXPRESSIONS)}"}), 400
+    try:
+        start, end = _date_range_args()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(timeseries(bucket, request.args.get("category") or None, start, end))
+
+
+@api.route("/analytics", methods=["GET"])
+@cached_read
+def get_analytics() -> Union[jsonify, tuple]:
+    """Обрабатывает GET-запрос для получения показателей сумм по категориям.
+
+    Суммы, категории и id подходящих транзакций загружаются колонками
+    и обрабатываются векторно (см. analytics.category_summary).
+    Параметры запроса:
+    - category: str, type: str, from: str, to: str - те же фильтры, что у GET /api/transactions
+    - top: int - сколько крупнейших транзакций вернуть по каждой категории (по умолчанию TOP_TRANSACTIONS)
+    Средние и перцентили округляются до копеек. Поддерживаются ETag и If-None-Match (см. cached_read).
+
+    Returns:
+        Union[jsonify, tuple]: JSON-ответ со списком категорий по убыванию итога в формате:
+        [
+            {
+                "category": str,
+                "total": float,
+                "count": int,
+                "mean": float,
+                "percentiles": {"50": float, "90": float, "99": float},
+                "top": [{"id": int, "amount": float}, ...]
+            },
+            ...
+        ]
+        В случае некорректных параметров возвращает JSON с описанием ошибки и статусом 400.
+
+    Examples:
+        >>> GET /api/analytics?type=расход&from=2023-01-01&to=2023-12-31&top=3
+        <<< 200 OK
+        <<< [{"category": "Rent", "total": 360000.0, "count": 12, "mean": 30000.0, ...}, ...]
+    """
+    try:
+        top: int = int(request.args.get("top", TOP_TRANSACTIONS))
+        filters, _ = _transaction_filters()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if not 0 <= top <= MAX_PAGE_SIZE:
+        return jsonify({"error": f"top must be between 0 and {MAX_PAGE_SIZE}"}), 400
+    columns: TransactionColumns = TransactionColumns.from_rows(db.session.execute(
+        select(Transaction.id, Transaction.amount, Transaction.category).where(*filters).order_by(Transaction.id)
+        .execution_options(yield_per=STREAM_BATCH_SIZE)
+    ).tuples())
+    return jsonify([{
+        "category": row["category"],
+        "total": from_minor_units(row["total"]),
+        "count": row["count"],
+        "mean": round(from_minor_units(row["mean"]), 2),
+        "percentiles": {name: round(from_minor_units(value), 2) for name, value in row["percentiles"].items()},
+        "top": [{"id": item["id"], "amount": from_minor_units(item["amount"])} for item in row["top"]]
+    } for row in category_summary(columns, PERCENTILES, top)])
+
+
+@api.route("/changes", methods=["GET"])
+@cached_read
+def get_changes() -> Union[jsonify, tuple]:
+    """Обрабатывает GET-запрос для получения изменений журнала после заданного номера.
+
+    Параметры запроса:
+    - since: int - вернуть изменения с seq больше указанного (по умолчанию 0)
+    - limit: int - максимальное количество изменений (по умолчанию STREAM_BATCH_SIZE, не больше MAX_PAGE_SIZE)
+
+    Для "upsert" передается транзакция целиком, для "delete" - только id (tombstone).
+    Изменения "upsert" уже удаленных транзакций пропускаются: за ними в журнале
+    всегда следует "delete". Если since больше current_seq, база сервера была
+    пересоздана и клиенту нужно синхронизироваться заново с since=0.
+
+    Returns:
+        Union[jsonify, tuple]: JSON-ответ в формате:
+        {
+            "changes": [
+                {"seq": int, "op": "upsert", "id": int, "transaction": {...}},
+                {"seq": int, "op": "delete", "id": int},
+                ...
+            ],
+            "next_since": int,     # значение since для следующего запроса
+            "has_more": bool,      # есть ли еще изменения после next_since
+            "current_seq": int     # последний номер изменения на сервере
+        }
+        В случае некорректных параметров возвращает JSON с описанием ошибки и статусом 400.
+
+    Examples:
+        >>> GET /api/changes?since=10&limit=2
+        <<< 200 OK
+        <<< {"changes": [{"seq": 11, "op": "delete", "id": 3}, ...], "next_since": 12, "has_more": true, ...}
+    """
+    try:
+        since: int = int(request.args.get("since", 0))
+        limit: int = int(request.args.get("limit", STREAM_BATCH_SIZE))
+    except ValueError as e:
+        return jsonify({"error": f"Invalid parameters: {str(e)}"}), 400
+    if not 0 < limit <= MAX_PAGE_SIZE:
+        return jsonify({"error": f"limit must be between 1 and {MAX_PAGE_SIZE}"}), 400
+
+    current_seq: int = db.session.execute(db.select(db.func.coalesce(db.func.max(Change.seq), 0))).scalar_one()
+    rows = db.session.execute(
+        db.select(Change, Transaction)
+        .outerjoin(Transaction, (Transaction.id == Change.transaction_id) & (Change.op == "upsert"))
+        .where(Change.seq > since)
+        .order_by(Change.seq)
+        .limit(limit)
+    ).all()
+
+    changes: List[Dict[str, Any]] = []
+    for change, transaction in rows:
+        if change.op == "delete":
+            changes.append({"seq": change.seq, "op": "delete", "id": change.transaction_id})
+        elif transaction is not None:
+            changes.append({"seq": change.seq, "op": "upsert", "id": change.transaction_id,
+                            "transaction": serialize_transaction(transaction)})
+    next_since: int = rows[-1][0].seq if rows else since
+    return jsonify({
+        "changes": changes,
+        "next_since": next_since,
+        "has_more": next_since < current_seq,
+        "current_seq": current_seq
+    })
+
+
+@api.route("/transactions", methods=["POST"])
+def add_transaction() -> Union[jsonify, tuple]:
+    """Обрабатывает POST-запрос для добавления новой транзакции.
+
+    Ожидает JSON в теле запроса с обязательными полями:
+    - amount: float
+    - category: str
+    - date: str (формат "YYYY-MM-DD")
+    - type: str ("доход" или "расход")
+    - description: str (опционально)
+
+    При включенной групповой фиксации (GROUP_COMMIT) строка записывается фоновым
+    писателем вместе со вставками других запросов. В режиме надежности "async"
+    запрос не ждет записи и получает статус 202 без id.
+
+    Returns:
+        Union[jsonify, tuple]: В случае успеха возвращает JSON с id новой транзакции и статусом 201.
+        В случае ошибки возвращает JSON с описанием ошибки и соответствующим HTTP-кодом.
+
+    Examples:
+        >>> POST /api/transactions
+        >>> {"amount": 100.0, "category": "Food", "date": "2023-01-01", "type": "расход"}
+        <<< 201 Created
+        <<< {"status": "success", "id": 1}
+    """
+    data: Dict[str, Any] = request.get_json()
+    
+    try:
+        row: Dict[str, Any] = validate_transaction(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    writer: Optional[GroupCommitWriter] = current_ledger().extensions.get("group_commit")
+    if writer is not None:
+        future = writer.submit(row)
+        if writer.durability == "async":
+            return jsonify({"status": "accepted"}), 202
+        try:
+            return jsonify({"status": "success", "id": future.result(GROUP_COMMIT_TIMEOUT)}), 201
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+    try:
+        new_transaction: Transaction = Transaction(**row)
+        db.session.add(new_transaction)
+        bump_ledger_version()
+        db.session.commit()
+        return jsonify({"status": "success", "id": new_transaction.id}), 201
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+
+def write_transactions(rows: List[Dict[str, Any]]) -> List[int]:
+    """Записывает строки одной транзакцией БД и увеличивает версию журнала.
+
+    Используется писателем групповой фиксации (см. write_queue.GroupCommitWriter).
+
+    Args:
+        rows: Значения колонок транзакций (см. validate_transaction).
+
+    Returns:
+        List[int]: id добавленных транзакций в порядке rows.
+    """
+    try:
+        ids: List[int] = insert_transactions(rows)
+        bump_ledger_version()
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return ids
+
+
+def _idempotency_key(data: Dict[str, Any]) -> Optional[str]:
+    """Читает необязательный ключ идемпотентности транзакции из поля "idempotency_key".
+
+    Raises:
+        ValueError: Если ключ не является непустой строкой не длиннее MAX_IDEMPOTENCY_KEY_LENGTH.
+    """
+    key: Any = data.get("idempotency_key")
+    if key is None:
+        return None
+    if not isinstance(key, str) or not 0 < len(key) <= MAX_IDEMPOTENCY_KEY_LENGTH:
+        raise ValueError(f"Invalid idempotency_key: {key!r}")
+    return key
+
+
+def _known_keys(keys: Iterable[str]) -> Dict[str, int]:
+    """Возвращает id транзакций, уже добавленных с ключами keys."""
+    known: Dict[str, int] = {}
+    for chunk in _chunks(keys, DELETE_CHUNK_SIZE):
+        known.update(db.session.execute(
+            select(IdempotencyKey.key, IdempotencyKey.transaction_id).where(IdempotencyKey.key.in_(chunk))
+        ).tuples().all())
+    return known
+
+
+def insert_idempotent(rows: List[Dict[str, Any]], keys: List[Optional[str]]) -> List[int]:
+    """Добавляет транзакции, пропуская те, чей ключ идемпотентности уже известен, и фиксирует их.
+
+    Новые строки и их ключи записываются одной транзакцией БД, поэтому ключ
+    сохраняется тогда и только тогда, когда сохранена транзакция. Если тот же
+    ключ одновременно записал другой запрос, вставка ключа нарушает первичный
+    ключ idempotency_keys; тогда транзакция БД откатывается и пачка записывается
+    заново с учетом уже добавленных строк.
+
+    Args:
+        rows: Значения колонок транзакций (см. validate_transaction).
+        keys: Ключи в порядке rows (None - транзакция без ключа, добавляется всегда).
+            Строки с одинаковым ключом в одной пачке добавляются один раз.
+
+    Returns:
+        List[int]: id транзакций в порядке rows, включая добавленные ранее.
+    """
+    try:
+        return _insert_new_keys(rows, keys)
+    except IntegrityError:
+        db.session.rollback()
+        return _insert_new_keys(rows, keys)
+
+
+def _insert_new_keys(rows: List[Dict[str, Any]], keys: List[Optional[str]]) -> List[int]:
+    """Один проход insert_idempotent: вставка строк с неизвестными ключами и коммит."""
+    ids: Dict[str, int] = _known_keys({key for key in keys if key is not None})
+    first: Dict[str, int] = {}  # Ключ -> индекс первой строки с ним
+    for index, key in enumerate(keys):
+        if key is not None and key not in ids:
+            first.setdefault(key, index)
+    new_indexes: List[int] = [index for index, key in enumerate(keys) if key is None or first.get(key) == index]
+    if not new_indexes:
+        db.session.rollback()  # Закрывает транзакцию чтения
+        return [ids[key] for key in keys]
+    new_ids: List[int] = insert_transactions([rows[index] for index in new_indexes])
+    by_index: Dict[int, int] = dict(zip(new_indexes, new_ids))
+    new_keys: List[Dict[str, Any]] = [
+        {"key": keys[index], "transaction_id": by_index[index]} for index in new_indexes if keys[index] is not None
+    ]
+    if new_keys:
+        db.session.execute(insert(IdempotencyKey.__table__), new_keys)
+    bump_ledger_version()
+    db.session.commit()
+    ids.update((item["key"], item["transaction_id"]) for item in new_keys)
+    return [by_index[index] if key is None else ids[key] for index, key in enumerate(keys)]
+
+
+@api.route("/transactions/batch", methods=["POST"])
+def add_transactions_batch() -> Union[jsonify, tuple]:
+    """Обрабатывает POST-запрос для пакетного добавления транзакций.
+
+    Ожидает JSON-массив транзакций (не больше MAX_BATCH_SIZE) с теми же полями,
+    что и POST /api/transactions, и необязательным idempotency_key - строкой
+    не длиннее MAX_IDEMPOTENCY_KEY_LENGTH. Сначала проверяется весь массив: если
+    хотя бы одна транзакция некорректна, ничего не добавляется. Затем все строки
+    вставляются одним executemany и фиксируются одним коммитом. Транзакции с уже
+    известным ключом (повтор запроса) не добавляются повторно (см. insert_idempotent).
+
+    Returns:
+        Union[jsonify, tuple]: В случае успеха возвращает JSON со списком id транзакций
+        (в порядке массива; для повторов - id добавленных ранее) и статусом 201. В случае
+        ошибок проверки возвращает статус 400 и список ошибок с индексами элементов массива.
+
+    Examples:
+        >>> POST /api/transactions/batch
+        >>> [{"amount": 100.0, "category": "Food", "date": "2023-01-01", "type": "расход"}, ...]
+        <<< 201 Created
+        <<< {"status": "success", "ids": [1, 2, ...]}
+    """
+    data: Any = request.get_json()
+    if not isinstance(data, list):
+        return jsonify({"error": "Expected a JSON array of transactions"}), 400
+    if len(data) > MAX_BATCH_SIZE:
+        return jsonify({"error": f"Batch is too large, at most {MAX_BATCH_SIZE} transactions allowed"}), 400
+
+    rows: List[Dict[str, Any]] = []
+    keys: List[Optional[str]] = []
+    errors: List[Dict[str, Any]] = []
+    for index, item in enumerate(data):
+        try:
+            rows.append(validate_transaction(item))
+            keys.append(_idempotency_key(item))
+        except ValueError as e:
+            errors.append({"index": index, "error": str(e)})
+    if errors:
+        return jsonify({"error": "Invalid transactions in batch", "errors": errors}), 400
+
+    try:
+        if any(key is not None for key in keys):
+            ids: List[int] = insert_idempotent(rows, keys)
+        else:
+            ids = insert_transactions(rows)
+            bump_ledger_version()
+            db.session.commit()
+        return jsonify({"status": "success", "ids": ids}), 201
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
 
-# Инициализация Flask и SQLAlchemy
-app: Flask = Flask(__name__)
-app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///transactions.db"  # Путь к SQLite
-app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False  # Отключаем устаревшее поведение
-db: SQLAlchemy = SQLAlchemy(app)
+def read_csv_records(lines: Iterable[str], delimiter: str = ",") -> Iterator[Tuple[int, Dict[str, str]]]:
+    """Потоково читает CSV с заголовком amount, category, date, type[, description].
 
+    Args:
+        lines: Строки CSV-файла (например, открытый текстовый файл).
+        delimiter: Разделитель колонок.
 
-class Base(DeclarativeBase):
-    """Базовый класс для декларативных моделей SQLAlchemy."""
-    pass
+    Yields:
+        Tuple[int, Dict[str, str]]: Номер строки в файле и словарь "колонка -> значение".
+    """
+    reader = csv.DictReader(lines, delimiter=delimiter)
+    for record in reader:
+        yield reader.line_num, record
 
 
-class Transaction(db.Model):
-    """Модель для представления финансовой транзакции в базе данных.
+def normalize_csv_record(record: Dict[str, Optional[str]]) -> Dict[str, Any]:
+    """Приводит строку CSV к виду, который принимает validate_transaction.
 
-    Attributes:
-        id (Mapped[int]): Уникальный идентификатор транзакции (первичный ключ).
-        amount (Mapped[float]): Сумма транзакции. Не может быть None.
-        category (Mapped[str]): Категория транзакции (например, "Еда", "Транспорт"). Не может быть None.
-        date (Mapped[str]): Дата транзакции в формате строки. Не может быть None.
-        type (Mapped[str]): Тип транзакции ("доход" или "расход"). Не может быть None.
-        description (Mapped[str]): Описание транзакции. По умолчанию пустая строка.
+    Суммы вида "1 234,56" приводятся к числу, даты "DD.MM.YYYY" - к "YYYY-MM-DD",
+    тип транзакции - к нижнему регистру.
+
+    Args:
+        record: Словарь "колонка -> значение" из read_csv_records.
+
+    Returns:
+        Dict[str, Any]: Транзакция в формате API.
+
+    Raises:
+        ValueError: Если сумма или дата не разбираются.
     """
-    __tablename__: str = "transactions"
-    
-    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
-    amount: Mapped[float] = mapped_column(nullable=False)
-    category: Mapped[str] = mapped_column(nullable=False)
-    date: Mapped[str] = mapped_column(nullable=False)
-    type: Mapped[str] = mapped_column(nullable=False)
-    description: Mapped[str] = mapped_column(default="")
+    data: Dict[str, Any] = {
+        key.strip().lower(): value.strip() for key, value in record.items()
+        if key is not None and value is not None
+    }
+    if "amount" in data:
+        amount: str = data["amount"].replace("\u00a0", "").replace(" ", "").replace(",", ".")
+        try:
+            data["amount"] = Decimal(amount)
+        except InvalidOperation:
+            raise ValueError(f"Invalid amount: {data['amount']!r}") from None
+    if "date" in data and "." in data["date"]:
+        try:
+            data["date"] = dt.datetime.strptime(data["date"], "%d.%m.%Y").date().isoformat()
+        except ValueError:
+            raise ValueError(f"Invalid date: {data['date']!r}") from None
+    if "type" in data:
+        data["type"] = data["type"].lower()
+    return data
 
 
-@app.route("/api/transactions", methods=["GET"])
-def get_transactions() -> jsonify:
-    """Обрабатывает GET-запрос для получения списка всех транзакций.
+def import_csv(lines: Iterable[str], delimiter: str = ",", chunk_size: int = IMPORT_CHUNK_SIZE,
+               on_progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    """Импортирует транзакции из CSV, фиксируя их пачками по chunk_size.
 
-    Returns:
-        jsonify: JSON-ответ со списком всех транзакций в формате:
-        [
-            {
-                "id": int,
-                "amount": float,
-                "category": str,
-                "date": str,
-                "type": str,
-                "description": str
-            },
-            ...
-        ]
+    Строки проходят конвейер генераторов "чтение -> нормализация -> проверка",
+    поэтому в памяти одновременно находится не больше одной пачки. Некорректные
+    строки пропускаются и попадают в отчет, остальной файл импортируется.
 
-    Examples:
-        >>> GET /api/transactions
-        <<< 200 OK
-        <<< [{"id": 1, "amount": 100.0, "category": "Food", ...}, ...]
+    Args:
+        lines: Строки CSV-файла.
+        delimiter: Разделитель колонок.
+        chunk_size: Количество строк в одной транзакции БД.
+        on_progress: Вызывается с текущим отчетом после каждого коммита.
+
+    Returns:
+        Dict[str, Any]: Отчет об импорте в формате:
+        {
+            "imported": int,
+            "failed": int,
+            "errors": [{"line": int, "error": str}, ...]  # не больше MAX_REPORTED_ERRORS
+        }
     """
-    transactions: List[Transaction] = db.session.execute(db.select(Transaction)).scalars().all()
-    return jsonify([{
-        "id": t.id,
-        "amount": t.amount,
-        "category": t.category,
-        "date": t.date,
-        "type": t.type,
-        "description": t.description
-    } for t in transactions])
+    report: Dict[str, Any] = {"imported": 0, "failed": 0, "errors": []}
 
+    def valid_rows() -> Iterator[Dict[str, Any]]:
+        for line, record in read_csv_records(lines, delimiter):
+            try:
+                yield validate_transaction(normalize_csv_record(record))
+            except ValueError as e:
+                report["failed"] += 1
+                if len(report["errors"]) < MAX_REPORTED_ERRORS:
+                    report["errors"].append({"line": line, "error": str(e)})
 
-@app.route("/api/transactions", methods=["POST"])
-def add_transaction() -> Union[jsonify, tuple]:
-    """Обрабатывает POST-запрос для добавления новой транзакции.
+    for chunk in _chunks(valid_rows(), chunk_size):
+        try:
+            insert_transactions_bulk(chunk)
+            bump_ledger_version()
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        report["imported"] += len(chunk)
+        if on_progress is not None:
+            on_progress(report)
+    return report
 
-    Ожидает JSON в теле запроса с обязательными полями:
-    - amount: float
-    - category: str
-    - date: str (формат "YYYY-MM-DD")
-    - type: str ("доход" или "расход")
-    - description: str (опционально)
+
+@api.route("/transactions/import", methods=["POST"])
+def import_transactions() -> Union[jsonify, tuple]:
+    """Обрабатывает POST-запрос для импорта транзакций из CSV-файла.
+
+    Файл передается полем file формы multipart/form-data или прямо в теле
+    запроса (Content-Type: text/csv), кодировка UTF-8. Первая строка - заголовок
+    с колонками amount, category, date, type и необязательной description.
+    Необязательный параметр запроса delimiter задает разделитель (по умолчанию ",").
+
+    Файл читается потоково и фиксируется пачками по IMPORT_CHUNK_SIZE строк.
+    Уже зафиксированные пачки остаются в базе, даже если импорт прервется.
 
     Returns:
-        Union[jsonify, tuple]: В случае успеха возвращает JSON с id новой транзакции и статусом 201.
-        В случае ошибки возвращает JSON с описанием ошибки и соответствующим HTTP-кодом.
+        Union[jsonify, tuple]: JSON-отчет import_csv со статусом 200.
+        Если файл не передан, возвращает JSON с описанием ошибки и статусом 400.
 
     Examples:
-        >>> POST /api/transactions
-        >>> {"amount": 100.0, "category": "Food", "date": "2023-01-01", "type": "расход"}
-        <<< 201 Created
-        <<< {"status": "success", "id": 1}
+        >>> POST /api/transactions/import?delimiter=;
+        >>> amount;category;date;type
+        >>> 1 500,00;Food;01.02.2023;Расход
+        <<< 200 OK
+        <<< {"imported": 1, "failed": 0, "errors": []}
     """
-    data: Dict[str, Any] = request.get_json()
-    
+    delimiter: str = request.args.get("delimiter", ",")
+    if len(delimiter) != 1:
+        return jsonify({"error": "delimiter must be a single character"}), 400
+    if "file" in request.files:
+        stream: IO[bytes] = request.files["file"].stream
+    elif request.mimetype == "text/csv":
+        stream = request.stream
+    else:
+        return jsonify({"error": "Expected a CSV file in the 'file' form field or a text/csv body"}), 400
+
+    lines = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
     try:
-        new_transaction: Transaction = Transaction(
-            amount=data["amount"],
-            category=data["category"],
-            date=data["date"],
-            type=data["type"],
-            description=data.get("description", "")
-        )
-        db.session.add(new_transaction)
-        db.session.commit()
-        return jsonify({"status": "success", "id": new_transaction.id}), 201
-    except KeyError as e:
-        return jsonify({"error": f"Missing required field: {str(e)}"}), 400
+        return jsonify(import_csv(lines, delimiter))
+    except (csv.Error, UnicodeDecodeError) as e:
+        return jsonify({"error": f"Malformed CSV: {str(e)}"}), 400
     except Exception as e:
-        db.session.rollback()
         return jsonify({"error": str(e)}), 500
 
 
-@app.route("/api/transactions", methods=["DELETE"])
+@api.cli.command("import-csv")
+@ledger_option
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--delimiter", default=",", show_default=True, help="Разделитель колонок.")
+@click.option("--chunk-size", default=IMPORT_CHUNK_SIZE, show_default=True, help="Строк на один коммит.")
+def import_csv_command(path: str, delimiter: str, chunk_size: int) -> None:
+    """Импортирует транзакции из CSV-файла PATH."""
+    upgrade(current_ledger().engine, db.metadata)
+
+    def show_progress(report: Dict[str, Any]) -> None:
+        click.echo(f"\rimported: {report['imported']}, failed: {report['failed']}", nl=False)
+
+    with open(path, encoding="utf-8-sig", newline="") as lines:
+        report: Dict[str, Any] = import_csv(lines, delimiter, chunk_size, show_progress)
+    click.echo(f"\rimported: {report['imported']}, failed: {report['failed']}")
+    for error in report["errors"]:
+        click.echo(f"line {error['line']}: {error['error']}", err=True)
+
+
+def _delete_chunk(ids: List[int], soft: bool) -> int:
+    """Удаляет транзакции с заданными id одной транзакцией БД и фиксирует ее.
+
+    Args:
+        ids: Идентификаторы транзакций (не больше DELETE_CHUNK_SIZE).
+        soft: Перенести транзакции в корзину deleted_transactions.
+
+    Returns:
+        int: Количество удаленных транзакций.
+    """
+    if soft:
+        db.session.execute(
+            insert(DeletedTransaction.__table__).from_select(
+                TRANSACTION_FIELDS,
+                select(*(Transaction.__table__.c[column] for column in TRANSACTION_FIELDS))
+                .where(Transaction.id.in_(ids))
+            )
+        )
+    deleted: int = db.session.execute(delete(Transaction.__table__).where(Transaction.id.in_(ids))).rowcount
+    if deleted:
+        bump_ledger_version()
+    db.session.commit()
+    return deleted
+
+
+def _delete_sorted(ids: Sequence[int], soft: bool) -> int:
+    """Удаляет транзакции по возрастающему списку уникальных id пачками по DELETE_CHUNK_SIZE.
+
+    Каждая пачка - отдельный короткий коммит: SQLite держит блокировку записи
+    только на время одной пачки, и другие запросы на запись не ждут конца
+    всего удаления. Соседние id лежат на соседних страницах таблицы, поэтому
+    пачка из идущих подряд id переписывает меньше страниц, чем случайная.
+    Если удаление прервется, уже удаленные пачки остаются удаленными.
+    """
+    deleted: int = sum(_delete_chunk(list(ids[start:start + DELETE_CHUNK_SIZE]), soft)
+                       for start in range(0, len(ids), DELETE_CHUNK_SIZE))
+    if deleted:
+        schedule_maintenance()
+    return deleted
+
+
+def delete_transaction_ids(ids: Iterable[int], soft: bool = False) -> int:
+    """Удаляет транзакции по списку id пачками (см. _delete_sorted).
+
+    Args:
+        ids: Идентификаторы транзакций; несуществующие пропускаются.
+        soft: Перенести транзакции в корзину вместо окончательного удаления.
+
+    Returns:
+        int: Количество удаленных транзакций.
+    """
+    return _delete_sorted(sorted(set(ids)), soft)
+
+
+def delete_matching(filters: List[Any], soft: bool = False) -> int:
+    """Удаляет транзакции, подходящие под условия, пачками (см. _delete_sorted).
+
+    Сначала одним запросом по индексу выбираются id всех подходящих транзакций
+    (в компактном array, 8 байт на id), затем они удаляются по первичному ключу.
+    Транзакции, добавленные во время удаления, не удаляются.
+
+    Args:
+        filters: Условия для .where() (например, из _date_range_filters).
+        soft: Перенести транзакции в корзину вместо окончательного удаления.
+
+    Returns:
+        int: Количество удаленных транзакций.
+    """
+    ids: array = array("q", db.session.execute(
+        select(Transaction.id).where(*filters).order_by(Transaction.id)
+        .execution_options(yield_per=STREAM_BATCH_SIZE)
+    ).scalars())
+    return _delete_sorted(ids, soft)
+
+
+def restore_transactions(ids: Iterable[int]) -> Dict[int, int]:
+    """Возвращает транзакции из корзины в журнал пачками по DELETE_CHUNK_SIZE.
+
+    Транзакция восстанавливается с прежним id, если он не занят, иначе получает новый.
+
+    Args:
+        ids: Идентификаторы удаленных транзакций; отсутствующие в корзине пропускаются.
+
+    Returns:
+        Dict[int, int]: Восстановленные транзакции: прежний id -> id в журнале.
+    """
+    restored: Dict[int, int] = {}
+    for chunk in _chunks(sorted(set(ids)), DELETE_CHUNK_SIZE):
+        rows: List[Dict[str, Any]] = [dict(row) for row in db.session.execute(
+            select(*(DeletedTransaction.__table__.c[column] for column in TRANSACTION_FIELDS))
+            .where(DeletedTransaction.id.in_(chunk))
+        ).mappings()]
+        if not rows:
+            continue
+        taken: Set[int] = set(db.session.execute(
+            select(Transaction.id).where(Transaction.id.in_([row["id"] for row in rows]))).scalars())
+        # Сначала строки с прежним id, затем остальные: новые id выдаются после максимального
+        same_id: List[Dict[str, Any]] = [row for row in rows if row["id"] not in taken]
+        new_id: List[Dict[str, Any]] = [row for row in rows if row["id"] in taken]
+        if same_id:
+            db.session.execute(insert(Transaction.__table__), same_id)
+            restored.update((row["id"], row["id"]) for row in same_id)
+        new_ids: List[int] = insert_transactions([{k: v for k, v in row.items() if k != "id"} for row in new_id])
+        restored.update((row["id"], transaction_id) for row, transaction_id in zip(new_id, new_ids))
+        db.session.execute(delete(DeletedTransaction.__table__).where(DeletedTransaction.id.in_(chunk)))
+        bump_ledger_version()
+        db.session.commit()
+    return restored
+
+
+def _soft_flag(data: Dict[str, Any]) -> bool:
+    """Читает флаг "soft" из тела запроса на удаление.
+
+    Raises:
+        ValueError: Если значение не логическое.
+    """
+    soft: Any = data.get("soft", False)
+    if not isinstance(soft, bool):
+        raise ValueError("soft must be true or false")
+    return soft
+
+
+def _id_list(data: Dict[str, Any]) -> List[int]:
+    """Читает непустой список id (не больше MAX_BATCH_SIZE) из поля "ids" тела запроса.
+
+    Raises:
+        ValueError: Если поле отсутствует, пустое, слишком длинное или содержит не целые числа.
+    """
+    ids: Any = data.get("ids")
+    if not isinstance(ids, list) or not ids:
+        raise ValueError("ids must be a non-empty list of transaction ids")
+    if len(ids) > MAX_BATCH_SIZE:
+        raise ValueError(f"Too many ids: {len(ids)}, maximum is {MAX_BATCH_SIZE}")
+    if not all(isinstance(value, int) and not isinstance(value, bool) for value in ids):
+        raise ValueError("ids must contain only integers")
+    return ids
+
+
+@api.route("/transactions", methods=["DELETE"])
 def delete_transactions() -> Union[jsonify, tuple]:
     """Обрабатывает DELETE-запрос для удаления транзакций по критериям.
 
@@ -121,8 +1830,9 @@ def delete_transactions() -> Union[jsonify, tuple]:
     - category: str
     - date: str
     - type: str
+    и необязательным soft: bool - перенести транзакции в корзину (см. DeletedTransaction).
 
-    Удаляет все транзакции, соответствующие указанным критериям.
+    Удаляет все транзакции, соответствующие указанным критериям (см. delete_matching).
 
     Returns:
         Union[jsonify, tuple]: В случае успеха возвращает JSON с количеством удаленных транзакций.
@@ -145,14 +1855,21 @@ def delete_transactions() -> Union[jsonify, tuple]:
         }), 400
 
     try:
-        # Ищем и удаляем все подходящие транзакции
-        deleted_transactions: int = Transaction.query.filter_by(
-            category=data['category'],
-            date=data['date'],
-            type=data['type']
-        ).delete()
-        
-        db.session.commit()
+        transaction_date: dt.date = parse_date(data['date'])
+        soft: bool = _soft_flag(data)
+    except ValueError as e:
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 400
+
+    try:
+        # Ищем и удаляем все подходящие транзакции (поиск идет по индексу type, category, date)
+        deleted_transactions: int = delete_matching([
+            Transaction.category == data['category'],
+            Transaction.date == transaction_date,
+            Transaction.type == data['type'],
+        ], soft)
         
         return jsonify({
             "status": "success",
@@ -168,7 +1885,572 @@ def delete_transactions() -> Union[jsonify, tuple]:
         }), 500
 
 
+@api.route("/transactions/batch", methods=["DELETE"])
+def delete_transactions_batch() -> Union[jsonify, tuple]:
+    """Обрабатывает DELETE-запрос для удаления транзакций по списку id.
+
+    Ожидает JSON {"ids": [...], "soft": false}: не больше MAX_BATCH_SIZE id,
+    несуществующие id пропускаются. Удаление идет пачками по DELETE_CHUNK_SIZE
+    с отдельным коммитом каждой (см. delete_transaction_ids).
+
+    Returns:
+        Union[jsonify, tuple]: JSON с количеством удаленных транзакций.
+        В случае некорректного тела возвращает JSON с описанием ошибки и статусом 400.
+
+    Examples:
+        >>> DELETE /api/transactions/batch
+        >>> {"ids": [12, 15, 16], "soft": true}
+        <<< 200 OK
+        <<< {"status": "success", "deleted_count": 3}
+    """
+    data: Any = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"status": "error", "message": "Expected a JSON object"}), 400
+    try:
+        ids: List[int] = _id_list(data)
+        soft: bool = _soft_flag(data)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    try:
+        return jsonify({"status": "success", "deleted_count": delete_transaction_ids(ids, soft)})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+@api.route("/transactions/range", methods=["DELETE"])
+def delete_transactions_range() -> Union[jsonify, tuple]:
+    """Обрабатывает DELETE-запрос для удаления транзакций за период.
+
+    Ожидает JSON с обязательными полями from и to (даты включительно) и
+    необязательными category, type и soft. Удаление идет пачками по
+    DELETE_CHUNK_SIZE с отдельным коммитом каждой (см. delete_matching).
+
+    Returns:
+        Union[jsonify, tuple]: JSON с количеством удаленных транзакций.
+        В случае некорректного тела возвращает JSON с описанием ошибки и статусом 400.
+
+    Examples:
+        >>> DELETE /api/transactions/range
+        >>> {"from": "2020-01-01", "to": "2020-12-31", "category": "Food"}
+        <<< 200 OK
+        <<< {"status": "success", "deleted_count": 412}
+    """
+    data: Any = request.get_json(silent=True)
+    if not isinstance(data, dict) or "from" not in data or "to" not in data:
+        return jsonify({"status": "error", "message": "Missing required fields (from, to)"}), 400
+    try:
+        start: dt.date = parse_date(data["from"])
+        end: dt.date = parse_date(data["to"])
+        soft: bool = _soft_flag(data)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    filters: List[Any] = _date_range_filters(Transaction.date, start, end)
+    if data.get("category"):
+        filters.append(Transaction.category == data["category"])
+    if data.get("type"):
+        filters.append(Transaction.type == data["type"])
+    try:
+        return jsonify({"status": "success", "deleted_count": delete_matching(filters, soft)})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+@api.route("/transactions/restore", methods=["POST"])
+def restore_transactions_batch() -> Union[jsonify, tuple]:
+    """Обрабатывает POST-запрос для восстановления транзакций из корзины.
+
+    Ожидает JSON {"ids": [...]} с id транзакций, удаленных с "soft": true.
+    Если id уже занят новой транзакцией, восстановленная получает новый id.
+
+    Returns:
+        Union[jsonify, tuple]: JSON с количеством восстановленных транзакций и
+        соответствием "прежний id -> id в журнале".
+        В случае некорректного тела возвращает JSON с описанием ошибки и статусом 400.
+
+    Examples:
+        >>> POST /api/transactions/restore
+        >>> {"ids": [12, 15]}
+        <<< 200 OK
+        <<< {"status": "success", "restored_count": 2, "ids": {"12": 12, "15": 15}}
+    """
+    data: Any = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"status": "error", "message": "Expected a JSON object"}), 400
+    try:
+        ids: List[int] = _id_list(data)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    try:
+        restored: Dict[int, int] = restore_transactions(ids)
+        return jsonify({"status": "success", "restored_count": len(restored),
+                        "ids": {str(old): new for old, new in restored.items()}})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+def find_totals_drift() -> List[Dict[str, Any]]:
+    """Сравнивает category_totals с суммами, пересчитанными по transactions.
+
+    Returns:
+        List[Dict[str, Any]]: Расхождения в формате
+        {"type", "category", "month", "expected": [total, count], "actual": [total, count]}.
+    """
+    month = db.func.substr(Transaction.date, 1, 7)
+    expected: Dict[Tuple[str, str, str], Tuple[int, int]] = {
+        (transaction_type, category, key): (total, count)
+        for transaction_type, category, key, total, count in db.session.execute(
+            db.select(Transaction.type, Transaction.category, month,
+                      db.func.sum(Transaction.amount), db.func.count(Transaction.id))
+            .group_by(Transaction.type, Transaction.category, month)
+        )
+    }
+    actual: Dict[Tuple[str, str, str], Tuple[int, int]] = {
+        (t.type, t.category, t.month): (t.total, t.count)
+        for t in db.session.execute(db.select(CategoryTotal)).scalars()
+    }
+    drift: List[Dict[str, Any]] = []
+    for key in sorted(expected.keys() | actual.keys()):
+        expected_row = expected.get(key, (0, 0))
+        actual_row = actual.get(key, (0, 0))
+        if expected_row != actual_row:  # Суммы в копейках целые, поэтому сравниваются точно
+            drift.append({
+                "type": key[0], "category": key[1], "month": key[2],
+                "expected": list(expected_row), "actual": list(actual_row)
+            })
+    return drift
+
+
+def rebuild_category_totals() -> None:
+    """Пересчитывает category_totals с нуля по таблице transactions."""
+    db.session.execute(db.delete(CategoryTotal))
+    month = db.func.substr(Transaction.date, 1, 7)
+    db.session.execute(
+        insert(CategoryTotal.__table__).from_select(
+            ["type", "category", "month", "total", "count"],
+            db.select(Transaction.type, Transaction.category, month,
+                      db.func.sum(Transaction.amount), db.func.count(Transaction.id))
+            .group_by(Transaction.type, Transaction.category, month)
+        )
+    )
+    bump_ledger_version()  # Итоги могли измениться: ETag и кэш /api/stats должны устареть
+    db.session.commit()
+
+
+@api.cli.group("totals")
+def totals_command() -> None:
+    """Обслуживание сводной таблицы category_totals."""
+
+
+@totals_command.command("verify")
+@ledger_option
+def verify_totals_command() -> None:
+    """Проверяет category_totals на расхождения с transactions."""
+    upgrade(current_ledger().engine, db.metadata)
+    drift: List[Dict[str, Any]] = find_totals_drift()
+    for row in drift:
+        click.echo(f"{row['type']} / {row['category']} / {row['month']}: "
+                   f"expected {row['expected']}, actual {row['actual']}")
+    if drift:
+        raise click.ClickException(f"Found {len(drift)} mismatched rows, run 'totals rebuild'")
+    click.echo("category_totals is consistent")
+
+
+@totals_command.command("rebuild")
+@ledger_option
+def rebuild_totals_command() -> None:
+    """Пересчитывает category_totals по transactions."""
+    upgrade(current_ledger().engine, db.metadata)
+    rebuild_category_totals()
+    click.echo("category_totals rebuilt")
+
+
+def schedule_maintenance() -> None:
+    """Запрашивает фоновое обслуживание базы после удаления (если оно включено, см. MAINTENANCE)."""
+    scheduler: Optional[MaintenanceScheduler] = current_ledger().extensions.get("maintenance")
+    if scheduler is not None:
+        scheduler.schedule()
+
+
+def purge_trash(older_than: dt.datetime) -> int:
+    """Окончательно удаляет из корзины транзакции, удаленные раньше older_than, пачками по DELETE_CHUNK_SIZE.
+
+    Args:
+        older_than: Граница времени удаления (UTC).
+
+    Returns:
+        int: Количество удаленных записей корзины.
+    """
+    purged: int = 0
+    while ids := list(db.session.execute(
+            select(DeletedTransaction.id).where(DeletedTransaction.deleted_at < older_than)
+            .limit(DELETE_CHUNK_SIZE)).scalars()):
+        purged += db.session.execute(
+            delete(DeletedTransaction.__table__).where(DeletedTransaction.id.in_(ids))).rowcount
+        db.session.commit()
+    return purged
+
+
+def maintain_database(analyze: bool = False) -> Dict[str, int]:
+    """Очищает корзину и ключи идемпотентности от устаревших записей и обслуживает файл базы
+    (см. maintenance.run_maintenance).
+
+    Args:
+        analyze: Выполнить полный ANALYZE вместо PRAGMA optimize.
+
+    Returns:
+        Dict[str, int]: Отчет run_maintenance и количество очищенных записей корзины ("purged").
+    """
+    retention: float = current_app.config["TRASH_RETENTION_DAYS"]
+    now: dt.datetime = dt.datetime.now(dt.timezone.utc).replace(tzinfo=None)
+    report: Dict[str, int] = {"purged": purge_trash(now - dt.timedelta(days=retention))}
+    key_retention: float = current_app.config["IDEMPOTENCY_RETENTION_DAYS"]
+    db.session.execute(delete(IdempotencyKey.__table__)
+                       .where(IdempotencyKey.created_at < now - dt.timedelta(days=key_retention)))
+    db.session.commit()
+    db.session.close()  # Соединение сессии не нужно на время VACUUM и checkpoint
+    report.update(run_maintenance(current_ledger().engine, analyze=analyze))
+    return report
+
+
+@api.cli.group("maintenance")
+def maintenance_command() -> None:
+    """Обслуживание файла базы данных."""
+
+
+@maintenance_command.command("run")
+@ledger_option
+@click.option("--analyze", is_flag=True, help="Полный ANALYZE вместо PRAGMA optimize.")
+def run_maintenance_command(analyze: bool) -> None:
+    """Очищает корзину, возвращает свободные страницы и обновляет статистику."""
+    upgrade(current_ledger().engine, db.metadata)
+    report: Dict[str, int] = maintain_database(analyze)
+    click.echo(f"Purged {report['purged']} trashed transactions, freed {report['freed_pages']} pages "
+               f"({report['freed_pages'] * report['page_size'] // 1024} KiB)")
+    if report["free_pages"]:
+        click.echo(f"{report['free_pages']} free pages remain: run 'maintenance vacuum' "
+                   "to enable incremental vacuum for this database")
+
+
+@maintenance_command.command("vacuum")
+@ledger_option
+def vacuum_command() -> None:
+    """Уплотняет базу полным VACUUM (блокирует запись до конца) и включает incremental vacuum."""
+    upgrade(current_ledger().engine, db.metadata)
+    page_count = db.text("PRAGMA page_count")
+    before: int = db.session.execute(page_count).scalar()
+    db.session.close()
+    full_vacuum(current_ledger().engine)
+    after: int = db.session.execute(page_count).scalar()
+    click.echo(f"Database compacted from {before} to {after} pages")
+
+
+@ledgers_api.route("", methods=["GET"])
+def list_ledgers() -> jsonify:
+    """Возвращает идентификаторы журналов: журнал по умолчанию и журналы с базами в LEDGER_DIR.
+
+    Examples:
+        >>> GET /api/ledgers
+        <<< {"ledgers": ["default", "family", "work"]}
+    """
+    return jsonify({"ledgers": current_app.extensions["ledgers"].ids()})
+
+
+@ledgers_api.route("/<ledger_id>", methods=["PUT"])
+def create_ledger(ledger_id: str) -> Union[jsonify, tuple]:
+    """Создает журнал ledger_id (базу с актуальной схемой), если его еще нет.
+
+    Returns:
+        Union[jsonify, tuple]: Статус 201, если журнал создан, 200 - если он уже был,
+        400 - если идентификатор некорректен.
+
+    Examples:
+        >>> PUT /api/ledgers/family
+        <<< 201 Created
+        <<< {"status": "success", "ledger": "family"}
+    """
+    router: LedgerRouter = current_app.extensions["ledgers"]
+    try:
+        existed: bool = router.exists(ledger_id)
+        router.get(ledger_id, create=True)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"status": "success", "ledger": ledger_id}), 200 if existed else 201
+
+
+def migrate_transactions(source: Ledger, target: Ledger, filters: Iterable[Any] = (), move: bool = False,
+                         chunk_size: int = IMPORT_CHUNK_SIZE,
+                         on_progress: Optional[Callable[[int], None]] = None) -> int:
+    """Копирует (при move - переносит) транзакции журнала source, подходящие под filters, в журнал target.
+
+    Транзакции читаются по возрастанию id пачками по chunk_size. Каждая пачка
+    записывается в target одним коммитом с ключами идемпотентности
+    "<source>:<id>:<дата>:<сумма>" (см. insert_idempotent), а при move затем удаляется
+    из source. Поэтому прерванный перенос можно запустить повторно: пачка, которая
+    успела записаться в target, но не удалилась из source, не будет скопирована дважды.
+
+    Args:
+        source: Журнал, из которого читаются транзакции.
+        target: Журнал, в который они записываются.
+        filters: Условия для .where() по колонкам Transaction.
+        move: Удалить скопированные транзакции из source.
+        chunk_size: Сколько транзакций переносится за один коммит.
+        on_progress: Вызывается с количеством перенесенных транзакций после каждой пачки.
+
+    Returns:
+        int: Количество скопированных транзакций.
+
+    Raises:
+        ValueError: Если source и target - один журнал.
+    """
+    if source.id == target.id:
+        raise ValueError("Source and target ledgers must differ")
+    app: Flask = current_app._get_current_object()
+    filters = list(filters)
+    after_id: int = 0
+    migrated: int = 0
+    while True:
+        with ledger_context(app, source):
+            rows = db.session.execute(
+                select(Transaction.id, Transaction.amount, Transaction.category, Transaction.date,
+                       Transaction.type, Transaction.description)
+                .where(Transaction.id > after_id, *filters)
+                .order_by(Transaction.id)
+                .limit(chunk_size)
+            ).all()
+        if not rows:
+            return migrated
+        with ledger_context(app, target):
+            insert_idempotent(
+                [{field: getattr(row, field) for field in ("amount", "category", "date", "type", "description")}
+                 for row in rows],
+                [f"{source.id}:{row.id}:{row.date.isoformat()}:{row.amount}" for row in rows],
+            )
+        if move:
+            with ledger_context(app, source):
+                delete_transaction_ids([row.id for row in rows])
+        migrated += len(rows)
+        after_id = rows[-1].id
+        if on_progress is not None:
+            on_progress(migrated)
+
+
+@api.cli.group("ledgers")
+def ledgers_command() -> None:
+    """Журналы и перенос транзакций между их базами."""
+
+
+@ledgers_command.command("list")
+def list_ledgers_command() -> None:
+    """Выводит журналы и количество транзакций в каждом."""
+    app: Flask = current_app._get_current_object()
+    router: LedgerRouter = app.extensions["ledgers"]
+    for ledger_id in router.ids():
+        with ledger_context(app, router.get(ledger_id)):
+            upgrade(current_ledger().engine, db.metadata)
+            count: int = db.session.execute(select(db.func.count()).select_from(Transaction)).scalar_one()
+        click.echo(f"{ledger_id}\t{count}")
+
+
+@ledgers_command.command("create")
+@click.argument("ledger_id")
+def create_ledger_command(ledger_id: str) -> None:
+    """Создает журнал LEDGER_ID (базу с актуальной схемой)."""
+    try:
+        current_app.extensions["ledgers"].get(ledger_id, create=True)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="LEDGER_ID") from None
+    click.echo(f"Ledger {ledger_id} is ready")
+
+
+@ledgers_command.command("migrate")
+@click.argument("source_id")
+@click.argument("target_id")
+@click.option("--category", help="Переносить только транзакции этой категории.")
+@click.option("--type", "transaction_type", help="Переносить только транзакции этого типа.")
+@click.option("--from", "date_from", help="Начало периода YYYY-MM-DD.")
+@click.option("--to", "date_to", help="Конец периода YYYY-MM-DD.")
+@click.option("--move", is_flag=True, help="Удалить перенесенные транзакции из исходного журнала.")
+@click.option("--chunk-size", default=IMPORT_CHUNK_SIZE, show_default=True, help="Транзакций на один коммит.")
+def migrate_ledger_command(source_id: str, target_id: str, category: Optional[str], transaction_type: Optional[str],
+                           date_from: Optional[str], date_to: Optional[str], move: bool, chunk_size: int) -> None:
+    """Копирует или переносит (--move) транзакции из журнала SOURCE_ID в журнал TARGET_ID.
+
+    Целевой журнал создается, если его нет. Так общую базу можно разделить
+    на журналы по счетам (фильтры --category, --type, --from, --to) или
+    перераспределить журналы между базами.
+    """
+    router: LedgerRouter = current_app.extensions["ledgers"]
+    try:
+        source: Ledger = router.get(source_id)
+        target: Ledger = router.get(target_id, create=True)
+        filters: List[Any] = _date_range_filters(
+            Transaction.date,
+            parse_date(date_from) if date_from else None,
+            parse_date(date_to) if date_to else None,
+        )
+    except (ValueError, LookupError) as e:
+        raise click.BadParameter(str(e)) from None
+    if category:
+        filters.append(Transaction.category == category)
+    if transaction_type:
+        filters.append(Transaction.type == transaction_type)
+    with ledger_context(current_app._get_current_object(), source):
+        upgrade(source.engine, db.metadata)
+
+    def show_progress(migrated: int) -> None:
+        click.echo(f"\r{'moved' if move else 'copied'}: {migrated}", nl=False)
+
+    try:
+        migrated: int = migrate_transactions(source, target, filters, move, chunk_size, show_progress)
+    except ValueError as e:
+        raise click.ClickException(str(e)) from None
+    click.echo(f"\r{'Moved' if move else 'Copied'} {migrated} transactions from {source_id} to {target_id}")
+
+
+def default_config() -> Dict[str, Any]:
+    """Собирает конфигурацию приложения из переменных окружения.
+
+    - FINANCE_DATABASE_URI - адрес базы данных (по умолчанию instance/transactions.db)
+    - FINANCE_DB_POOL_SIZE, FINANCE_DB_MAX_OVERFLOW, FINANCE_DB_POOL_TIMEOUT - настройки
+      пула соединений SQLAlchemy (если не заданы, используются значения SQLAlchemy)
+    - FINANCE_GROUP_COMMIT=1 - включает групповую фиксацию POST /api/transactions;
+      FINANCE_GROUP_COMMIT_MAX_ROWS, FINANCE_GROUP_COMMIT_INTERVAL_MS и
+      FINANCE_GROUP_COMMIT_DURABILITY ("full" или "async") - ее параметры
+    - FINANCE_METRICS=0 - отключает метрики и /metrics; FINANCE_SLOW_QUERY_MS - порог
+      медленного SQL-запроса для записи в лог (по умолчанию 200)
+    - FINANCE_PROFILING=1 - разрешает профилировать запросы с заголовком X-Profile: 1;
+      FINANCE_PROFILE_DIR - каталог для отчетов (по умолчанию instance/profiles)
+    - FINANCE_MAINTENANCE=0 - отключает фоновое обслуживание базы после удалений;
+      FINANCE_MAINTENANCE_DELAY_S - через сколько секунд после удаления оно запускается (по умолчанию 5),
+      FINANCE_MAINTENANCE_INTERVAL_S - период обслуживания по расписанию (по умолчанию 3600, 0 - выключено)
+    - FINANCE_TRASH_RETENTION_DAYS - сколько дней хранить транзакции в корзине (по умолчанию 30)
+    - FINANCE_IDEMPOTENCY_RETENTION_DAYS - сколько дней хранить ключи идемпотентности (по умолчанию 90)
+    - FINANCE_LEDGER_DIR - каталог баз журналов /api/ledgers/<ledger_id>/ (по умолчанию instance/ledgers);
+      FINANCE_LEDGER_AUTO_CREATE=1 - создавать журнал при первом запросе к нему (иначе - PUT /api/ledgers/<id>)
+
+    Returns:
+        Dict[str, Any]: Значения для app.config.
+    """
+    engine_options: Dict[str, Any] = {}
+    for option, variable, cast in (("pool_size", "FINANCE_DB_POOL_SIZE", int),
+                                   ("max_overflow", "FINANCE_DB_MAX_OVERFLOW", int),
+                                   ("pool_timeout", "FINANCE_DB_POOL_TIMEOUT", float)):
+        if variable in os.environ:
+            engine_options[option] = cast(os.environ[variable])
+    return {
+        "SQLALCHEMY_DATABASE_URI": os.environ.get("FINANCE_DATABASE_URI", "sqlite:///transactions.db"),
+        "SQLALCHEMY_TRACK_MODIFICATIONS": False,  # Отключаем устаревшее поведение
+        "SQLALCHEMY_ENGINE_OPTIONS": engine_options,
+        "SQLITE_PRAGMAS": dict(SQLITE_PRAGMAS),
+        "GROUP_COMMIT": os.environ.get("FINANCE_GROUP_COMMIT") == "1",
+        "GROUP_COMMIT_MAX_ROWS": int(os.environ.get("FINANCE_GROUP_COMMIT_MAX_ROWS", 500)),
+        "GROUP_COMMIT_INTERVAL_MS": float(os.environ.get("FINANCE_GROUP_COMMIT_INTERVAL_MS", 5)),
+        "GROUP_COMMIT_DURABILITY": os.environ.get("FINANCE_GROUP_COMMIT_DURABILITY", "full"),
+        "METRICS": os.environ.get("FINANCE_METRICS", "1") == "1",
+        "SLOW_QUERY_MS": float(os.environ.get("FINANCE_SLOW_QUERY_MS", 200)),
+        "PROFILING": os.environ.get("FINANCE_PROFILING") == "1",
+        "PROFILE_DIR": os.environ.get("FINANCE_PROFILE_DIR"),
+        "MAINTENANCE": os.environ.get("FINANCE_MAINTENANCE", "1") == "1",
+        "MAINTENANCE_DELAY_S": float(os.environ.get("FINANCE_MAINTENANCE_DELAY_S", 5)),
+        "MAINTENANCE_INTERVAL_S": float(os.environ.get("FINANCE_MAINTENANCE_INTERVAL_S", 3600)),
+        "TRASH_RETENTION_DAYS": float(os.environ.get("FINANCE_TRASH_RETENTION_DAYS", 30)),
+        "IDEMPOTENCY_RETENTION_DAYS": float(os.environ.get("FINANCE_IDEMPOTENCY_RETENTION_DAYS", 90)),
+        "LEDGER_DIR": os.environ.get("FINANCE_LEDGER_DIR"),
+        "LEDGER_AUTO_CREATE": os.environ.get("FINANCE_LEDGER_AUTO_CREATE") == "1",
+    }
+
+
+def _sqlite_pragmas_listener(pragmas: Dict[str, Any]) -> Callable[[Any, Any], None]:
+    """Создает обработчик события connect, выполняющий PRAGMA на новом соединении SQLite."""
+    def set_pragmas(dbapi_connection: Any, connection_record: Any) -> None:
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
+
+    return set_pragmas
+
+
+def create_app(config: Optional[Dict[str, Any]] = None) -> Flask:
+    """Создает и настраивает приложение Flask.
+
+    Фабрика не обращается к базе данных: схему обновляет тот, кто запускает
+    сервер (см. __main__ и wsgi.py), поэтому ее можно вызывать в каждом
+    процессе многопроцессного WSGI-сервера.
+
+    Args:
+        config: Значения, переопределяющие default_config (например, в тестах и бенчмарках).
+
+    Returns:
+        Flask: Готовое приложение.
+    """
+    app: Flask = Flask(__name__)
+    app.config.update(default_config())
+    if config:
+        app.config.update(config)
+    db.init_app(app)
+    if app.config["METRICS"]:
+        Metrics(
+            slow_query_seconds=app.config["SLOW_QUERY_MS"] / 1000,
+            profiling=app.config["PROFILING"],
+            profile_dir=app.config["PROFILE_DIR"] or os.path.join(app.instance_path, "profiles"),
+            logger=app.logger,
+        ).init_app(app)
+    with app.app_context():
+        # Фоновые службы журнала по умолчанию хранятся в app.extensions, как и до появления журналов
+        default: Ledger = Ledger(DEFAULT_LEDGER, db.engine, app.extensions)
+    _setup_ledger(app, default)
+    app.extensions["ledgers"] = LedgerRouter(
+        default,
+        app.config["LEDGER_DIR"] or os.path.join(app.instance_path, "ledgers"),
+        engine_options=app.config["SQLALCHEMY_ENGINE_OPTIONS"],
+        setup=functools.partial(_open_ledger, app),
+        auto_create=app.config["LEDGER_AUTO_CREATE"],
+    )
+    app.register_blueprint(api)
+    app.register_blueprint(api, name="ledger_api", url_prefix="/api/ledgers/<ledger_id>")
+    app.register_blueprint(ledgers_api)
+    return app
+
+
+def _setup_ledger(app: Flask, ledger: Ledger) -> None:
+    """Подключает к базе журнала PRAGMA и метрики и создает его фоновые службы."""
+    engine = ledger.engine
+    if engine.dialect.name == "sqlite" and app.config["SQLITE_PRAGMAS"]:
+        event.listen(engine, "connect", _sqlite_pragmas_listener(app.config["SQLITE_PRAGMAS"]))
+    metrics: Optional[Metrics] = app.extensions.get("metrics")
+    if metrics is not None:
+        metrics.instrument(engine)
+    context: Callable[[], Any] = functools.partial(ledger_context, app, ledger)
+    if app.config["GROUP_COMMIT"]:
+        ledger.extensions["group_commit"] = GroupCommitWriter(
+            write_transactions, context,
+            max_rows=app.config["GROUP_COMMIT_MAX_ROWS"],
+            interval_ms=app.config["GROUP_COMMIT_INTERVAL_MS"],
+            durability=app.config["GROUP_COMMIT_DURABILITY"],
+            on_error=lambda e: app.logger.error("Group commit failed (ledger %s): %s", ledger.id, e),
+        )
+    if app.config["MAINTENANCE"] and engine.dialect.name == "sqlite":
+        ledger.extensions["maintenance"] = MaintenanceScheduler(
+            maintain_database, context,
+            delay=app.config["MAINTENANCE_DELAY_S"],
+            interval=app.config["MAINTENANCE_INTERVAL_S"],
+            on_error=lambda e: app.logger.error("Database maintenance failed (ledger %s): %s", ledger.id, e),
+        )
+
+
+def _open_ledger(app: Flask, ledger: Ledger) -> None:
+    """Готовит базу журнала при первом обращении к нему в процессе: схема, PRAGMA, фоновые службы."""
+    _setup_ledger(app, ledger)
+    upgrade(ledger.engine, db.metadata)
+
+
 if __name__ == "__main__":
+    # Сервер для разработки; в production используйте WSGI-сервер (см. wsgi.py)
+    app: Flask = create_app()
     with app.app_context():
-        db.create_all()  # Создаём таблицы в БД, если их нет
-    app.run(host="0.0.0.0", port=5000, debug=True)
\ No newline at end of file
+        upgrade(db.engine, db.metadata)  # Создаём таблицы или обновляем схему существующей БД
+    app.run(host="0.0.0.0", port=5000, debug=True)
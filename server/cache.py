@@ -0,0 +1,65 @@
+"""Потокобезопасный LRU-кэш для ответов и промежуточных результатов сервера."""
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class LRUCache:
+    """Кэш с вытеснением давно не использованных записей.
+
+    Ограничен и количеством записей, и суммарным размером значений,
+    поэтому не может вырасти больше заданного объема памяти.
+
+    Attributes:
+        max_entries: Максимальное количество записей.
+        max_bytes: Максимальный суммарный размер значений в байтах.
+    """
+
+    def __init__(self, max_entries: int = 128, max_bytes: int = 64 * 1024 * 1024) -> None:
+        """Инициализирует пустой кэш.
+
+        Args:
+            max_entries: Максимальное количество записей.
+            max_bytes: Максимальный суммарный размер значений в байтах.
+        """
+        self.max_entries: int = max_entries
+        self.max_bytes: int = max_bytes
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._size: int = 0
+        self._lock: threading.Lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Возвращает значение по ключу или None и отмечает запись как недавно использованную."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any, size: int = 0) -> None:
+        """Сохраняет значение, вытесняя старые записи при превышении лимитов.
+
+        Args:
+            key: Ключ записи.
+            value: Сохраняемое значение.
+            size: Размер значения в байтах (учитывается в max_bytes).
+        """
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._size -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self._size += size
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                self._size -= self._entries.popitem(last=False)[1][1]
+
+    def clear(self) -> None:
+        """Удаляет все записи."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,193 @@
+"""Потоковая выгрузка транзакций в CSV и XLSX.
+
+Обе функции принимают итератор строк и отдают файл частями (bytes), не
+собирая его в памяти: память сервера не зависит от размера выгрузки, а
+первые байты уходят клиенту сразу после первой пачки строк.
+
+XLSX собирается вручную: это ZIP-архив с XML-частями, и zipfile умеет писать
+его в поток без перемотки (размеры и CRC записей идут в data descriptor после
+данных). Лист Excel вмещает не больше XLSX_MAX_ROWS строк, поэтому длинная
+выгрузка делится на несколько листов; список листов (workbook.xml) пишется
+в конце архива, когда их количество уже известно.
+"""
+import csv
+import datetime as dt
+import io
+import re
+import zipfile
+from itertools import chain, islice
+from typing import Any, Iterable, Iterator, List, Sequence, Tuple
+from xml.sax.saxutils import escape
+
+EXPORT_BATCH_SIZE: int = 1000  # Сколько строк сериализуется в одну часть ответа
+XLSX_MAX_ROWS: int = 1_048_576  # Ограничение Excel на количество строк листа (вместе с заголовком)
+EXCEL_EPOCH: dt.date = dt.date(1899, 12, 30)  # Дата с порядковым номером 0 в Excel
+CSV_MIMETYPE: str = "text/csv"  # Flask добавляет charset=utf-8
+XLSX_MIMETYPE: str = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# Символы, недопустимые в XML 1.0 (управляющие, кроме табуляции и переводов строк)
+_XML_INVALID_RE: re.Pattern = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+_XLSX_RELS: str = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/'
+    'officeDocument" Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+# Стиль 1 - дата (встроенный формат 14), остальные ячейки без оформления
+_XLSX_STYLES: str = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="1"><fill><patternFill patternType="none"/></fill></fills>'
+    '<borders count="1"><border/></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="14" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/></cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+_SHEET_HEAD: bytes = (
+    b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+_SHEET_TAIL: bytes = b"</sheetData></worksheet>"
+
+
+def stream_csv(header: Sequence[str], rows: Iterable[Sequence[Any]]) -> Iterator[bytes]:
+    """Отдает CSV (UTF-8 с BOM, чтобы Excel правильно открыл кириллицу) частями.
+
+    Args:
+        header: Названия колонок.
+        rows: Строки с значениями в порядке header.
+
+    Yields:
+        bytes: Очередная часть файла.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    yield ("﻿" + buffer.getvalue()).encode("utf-8")
+    iterator = iter(rows)
+    while chunk := list(islice(iterator, EXPORT_BATCH_SIZE)):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(chunk)
+        yield buffer.getvalue().encode("utf-8")
+
+
+class _ChunkBuffer(io.RawIOBase):
+    """Поток только для записи, из которого накопленные байты забираются частями.
+
+    У потока нет seek и tell, поэтому zipfile пишет архив последовательно.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._parts: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: Any) -> int:
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def take(self) -> bytes:
+        """Возвращает все записанное с прошлого вызова."""
+        data, self._parts = b"".join(self._parts), []
+        return data
+
+
+def _xlsx_cell(value: Any, date: bool = False) -> str:
+    """Сериализует значение в ячейку листа: число, дату или строку."""
+    if value is None:
+        return "<c/>"
+    if date:
+        return f'<c s="1"><v>{(dt.date.fromisoformat(value) - EXCEL_EPOCH).days}</v></c>'
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return f"<c><v>{value!r}</v></c>"
+    text: str = escape(_XML_INVALID_RE.sub("", str(value)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _xlsx_row(values: Sequence[Any], date_columns: Tuple[int, ...]) -> str:
+    """Сериализует строку листа; колонки date_columns записываются как даты."""
+    return "<row>" + "".join(_xlsx_cell(value, index in date_columns) for index, value in enumerate(values)) + "</row>"
+
+
+def _xlsx_workbook_parts(sheets: int) -> List[Tuple[str, str]]:
+    """Возвращает части книги, зависящие от количества листов."""
+    overrides: str = "".join(
+        f'<Override PartName="/xl/worksheets/sheet{n}.xml" '
+        f'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        for n in range(1, sheets + 1)
+    )
+    content_types: str = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/styles.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        f'{overrides}</Types>'
+    )
+    workbook: str = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"><sheets>'
+        + "".join(f'<sheet name="Transactions {n}" sheetId="{n}" r:id="rId{n}"/>' for n in range(1, sheets + 1))
+        + "</sheets></workbook>"
+    )
+    workbook_rels: str = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        + "".join(f'<Relationship Id="rId{n}" Type="http://schemas.openxmlformats.org/officeDocument/2006/'
+                  f'relationships/worksheet" Target="worksheets/sheet{n}.xml"/>' for n in range(1, sheets + 1))
+        + f'<Relationship Id="rId{sheets + 1}" Type="http://schemas.openxmlformats.org/officeDocument/2006/'
+          'relationships/styles" Target="styles.xml"/>'
+        + "</Relationships>"
+    )
+    return [
+        ("[Content_Types].xml", content_types),
+        ("_rels/.rels", _XLSX_RELS),
+        ("xl/workbook.xml", workbook),
+        ("xl/_rels/workbook.xml.rels", workbook_rels),
+        ("xl/styles.xml", _XLSX_STYLES),
+    ]
+
+
+def stream_xlsx(header: Sequence[str], rows: Iterable[Sequence[Any]],
+                date_columns: Tuple[int, ...] = ()) -> Iterator[bytes]:
+    """Отдает книгу XLSX частями, сжимая листы на лету.
+
+    Args:
+        header: Названия колонок.
+        rows: Строки с значениями в порядке header.
+        date_columns: Номера колонок с датами "YYYY-MM-DD" (записываются как даты Excel).
+
+    Yields:
+        bytes: Очередная часть файла.
+    """
+    output = _ChunkBuffer()
+    header_xml: bytes = _xlsx_row(header, ()).encode("utf-8")
+    sheets: int = 0
+    iterator = iter(rows)
+    first: List[Sequence[Any]] = list(islice(iterator, 1))
+    with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as archive:
+        while first or not sheets:  # Пустая выгрузка - один лист с заголовком
+            sheets += 1
+            sheet_rows = chain(first, islice(iterator, XLSX_MAX_ROWS - 2))
+            with archive.open(f"xl/worksheets/sheet{sheets}.xml", "w") as sheet:
+                sheet.write(_SHEET_HEAD + header_xml)
+                while chunk := list(islice(sheet_rows, EXPORT_BATCH_SIZE)):
+                    sheet.write("".join(_xlsx_row(row, date_columns) for row in chunk).encode("utf-8"))
+                    yield output.take()
+                sheet.write(_SHEET_TAIL)
+            first = list(islice(iterator, 1))
+        for name, content in _xlsx_workbook_parts(sheets):
+            archive.writestr(name, content)
+    yield output.take()
@@ -0,0 +1,160 @@
+"""Журналы (ledgers): отдельная база SQLite на каждый журнал.
+
+SQLite допускает только одного писателя на файл, поэтому журналы разных
+пользователей или счетов в одной базе ждали бы друг друга. Здесь у каждого
+журнала свой файл <каталог>/<ledger_id>.db со своим движком и пулом
+соединений: записи в разные журналы не конкурируют за блокировку и
+выполняются параллельно - в потоках одного процесса и в разных процессах
+WSGI-сервера.
+
+Журнал запроса выбирается по префиксу URL /api/ledgers/<ledger_id>/ и
+хранится в flask.g.ledger; LedgerSession направляет запросы db.session в
+движок этого журнала. Журнал по умолчанию (DEFAULT_LEDGER, префикс /api/)
+- база SQLALCHEMY_DATABASE_URI, как и раньше.
+"""
+import glob
+import os
+import re
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from flask import Flask, g, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import Engine, create_engine
+
+DEFAULT_LEDGER: str = "default"
+LEDGER_ID_RE: re.Pattern = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+LEDGER_SUFFIX: str = ".db"
+
+
+class Ledger:
+    """Журнал транзакций со своей базой данных.
+
+    Attributes:
+        id: Идентификатор журнала.
+        engine: Движок SQLAlchemy базы журнала.
+        extensions: Фоновые службы журнала по имени ("group_commit", "maintenance"),
+            как app.extensions для журнала по умолчанию.
+    """
+
+    def __init__(self, ledger_id: str, engine: Engine, extensions: Optional[Dict[str, Any]] = None) -> None:
+        self.id: str = ledger_id
+        self.engine: Engine = engine
+        self.extensions: Dict[str, Any] = extensions if extensions is not None else {}
+
+
+class LedgerSession(Session):
+    """Сессия Flask-SQLAlchemy, которая выполняет запросы в базе журнала flask.g.ledger."""
+
+    def get_bind(self, mapper: Any = None, clause: Any = None, bind: Any = None, **kwargs: Any) -> Any:
+        if bind is None and has_app_context():
+            ledger: Optional[Ledger] = g.get("ledger")
+            if ledger is not None:
+                return ledger.engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@contextmanager
+def ledger_context(app: Flask, ledger: Ledger) -> Iterator[None]:
+    """Контекст приложения, в котором db.session работает с базой журнала ledger.
+
+    Нужен фоновым потокам (групповая фиксация, обслуживание) и командам,
+    переносящим транзакции между журналами: у каждого контекста своя сессия.
+    """
+    with app.app_context():
+        g.ledger = ledger
+        yield
+
+
+class LedgerRouter:
+    """Сопоставляет идентификаторы журналов с их базами и открывает их по требованию.
+
+    Attributes:
+        default: Журнал по умолчанию (база SQLALCHEMY_DATABASE_URI).
+        directory: Каталог файлов журналов.
+        engine_options: Параметры create_engine для баз журналов.
+        setup: Вызывается один раз для каждого открытого журнала (PRAGMA, метрики,
+            схема, фоновые службы) до первого запроса к нему.
+        auto_create: Создавать базу неизвестного журнала при первом обращении.
+    """
+
+    def __init__(self, default: Ledger, directory: str, engine_options: Optional[Dict[str, Any]] = None,
+                 setup: Optional[Callable[[Ledger], None]] = None, auto_create: bool = False) -> None:
+        """Создает маршрутизатор; базы журналов открываются при первом обращении.
+
+        Args:
+            default: Журнал по умолчанию.
+            directory: Каталог файлов журналов.
+            engine_options: Параметры create_engine для баз журналов.
+            setup: Подготовка открытого журнала.
+            auto_create: Создавать базу неизвестного журнала при первом обращении.
+        """
+        self.default: Ledger = default
+        self.directory: str = directory
+        self.engine_options: Dict[str, Any] = dict(engine_options or {})
+        self.setup: Optional[Callable[[Ledger], None]] = setup
+        self.auto_create: bool = auto_create
+        self._ledgers: Dict[str, Ledger] = {}
+        self._lock: threading.Lock = threading.Lock()
+
+    def path(self, ledger_id: str) -> str:
+        """Путь к файлу базы журнала.
+
+        Raises:
+            ValueError: Если идентификатор не подходит под LEDGER_ID_RE.
+        """
+        if not LEDGER_ID_RE.match(ledger_id):
+            raise ValueError(f"Invalid ledger id: {ledger_id!r}, expected 1-64 characters A-Z, a-z, 0-9, _ or -")
+        return os.path.join(self.directory, ledger_id + LEDGER_SUFFIX)
+
+    def exists(self, ledger_id: str) -> bool:
+        """Есть ли у журнала база (журнал по умолчанию существует всегда)."""
+        return ledger_id == DEFAULT_LEDGER or ledger_id in self._ledgers or os.path.exists(self.path(ledger_id))
+
+    def ids(self) -> List[str]:
+        """Идентификаторы журналов: журнал по умолчанию и журналы с файлами в каталоге, по алфавиту."""
+        found: List[str] = [
+            os.path.basename(path)[:-len(LEDGER_SUFFIX)]
+            for path in glob.glob(os.path.join(glob.escape(self.directory), "*" + LEDGER_SUFFIX))
+        ]
+        return [DEFAULT_LEDGER] + sorted(ledger_id for ledger_id in found
+                                         if LEDGER_ID_RE.match(ledger_id) and ledger_id != DEFAULT_LEDGER)
+
+    def get(self, ledger_id: str, create: bool = False) -> Ledger:
+        """Возвращает журнал, при первом обращении открывая (и при необходимости создавая) его базу.
+
+        Args:
+            ledger_id: Идентификатор журнала.
+            create: Создать базу, если ее нет (независимо от auto_create).
+
+        Returns:
+            Ledger: Журнал.
+
+        Raises:
+            ValueError: Если идентификатор некорректен.
+            LookupError: Если базы журнала нет, а создавать ее нельзя.
+        """
+        if ledger_id == DEFAULT_LEDGER:
+            return self.default
+        ledger: Optional[Ledger] = self._ledgers.get(ledger_id)
+        if ledger is not None:
+            return ledger
+        path: str = self.path(ledger_id)
+        with self._lock:
+            ledger = self._ledgers.get(ledger_id)
+            if ledger is not None:
+                return ledger
+            if not os.path.exists(path):
+                if not (create or self.auto_create):
+                    raise LookupError(f"Unknown ledger: {ledger_id!r}")
+                os.makedirs(self.directory, exist_ok=True)
+            ledger = Ledger(ledger_id, create_engine(f"sqlite:///{path}", **self.engine_options))
+            if self.setup is not None:
+                try:
+                    self.setup(ledger)
+                except Exception:
+                    ledger.engine.dispose()
+                    raise
+            self._ledgers[ledger_id] = ledger  # Журнал доступен другим потокам только после подготовки
+            return ledger
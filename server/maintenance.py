@@ -0,0 +1,158 @@
+"""Обслуживание базы SQLite после массовых изменений: возврат места и статистика планировщика.
+
+Удаленные строки оставляют в файле базы свободные страницы: файл не уменьшается,
+а полный VACUUM переписывает всю базу и все это время держит блокировку записи.
+Поэтому база создается с auto_vacuum = INCREMENTAL (см. app.SQLITE_PRAGMAS), и
+run_maintenance возвращает свободные страницы файловой системе короткими шагами
+PRAGMA incremental_vacuum(N) - каждый шаг отдельная транзакция, и запись другим
+соединениям блокируется только на время шага. Затем PRAGMA optimize обновляет
+статистику ANALYZE для таблиц, которые заметно изменились, а checkpoint
+с TRUNCATE сокращает файл WAL.
+
+MaintenanceScheduler выполняет обслуживание в фоновом потоке: запрос, удаливший
+транзакции, только отмечает, что обслуживание нужно, а оно запускается через
+delay секунд, поэтому серия удалений обслуживается один раз.
+"""
+import atexit
+import threading
+from typing import Any, Callable, ContextManager, Dict, Optional
+
+from sqlalchemy import Connection, Engine
+
+VACUUM_STEP_PAGES: int = 1000  # Сколько свободных страниц возвращается за один шаг incremental_vacuum
+ANALYSIS_LIMIT: int = 1000  # Сколько строк индекса читает ANALYZE в PRAGMA optimize (приблизительная статистика)
+AUTO_VACUUM_INCREMENTAL: int = 2  # Значение PRAGMA auto_vacuum в режиме INCREMENTAL
+
+
+def _autocommit(engine: Engine) -> Connection:
+    """Открывает соединение без неявной транзакции: PRAGMA и VACUUM выполняются сами по себе."""
+    return engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+
+
+def run_maintenance(engine: Engine, step_pages: int = VACUUM_STEP_PAGES, analyze: bool = False) -> Dict[str, int]:
+    """Возвращает свободные страницы файловой системе, обновляет статистику и сокращает WAL.
+
+    Args:
+        engine: Движок SQLAlchemy, подключенный к базе SQLite.
+        step_pages: Сколько страниц освобождается за один шаг incremental_vacuum.
+        analyze: Выполнить полный ANALYZE вместо PRAGMA optimize.
+
+    Returns:
+        Dict[str, int]: Отчет {"freed_pages", "free_pages", "page_size"}; free_pages -
+        свободные страницы, оставшиеся в файле (если база создана без auto_vacuum = INCREMENTAL,
+        их освобождает только full_vacuum).
+    """
+    with _autocommit(engine) as conn:
+        free_before: int = conn.exec_driver_sql("PRAGMA freelist_count").scalar()
+        if conn.exec_driver_sql("PRAGMA auto_vacuum").scalar() == AUTO_VACUUM_INCREMENTAL:
+            # incremental_vacuum освобождает по странице на каждый шаг выполнения, а execute модуля
+            # sqlite3 делает только один шаг; executescript выполняет команду до конца
+            driver_connection: Any = conn.connection.driver_connection
+            while conn.exec_driver_sql("PRAGMA freelist_count").scalar() > 0:
+                driver_connection.executescript(f"PRAGMA incremental_vacuum({int(step_pages)})")
+        free_after: int = conn.exec_driver_sql("PRAGMA freelist_count").scalar()
+        if analyze:
+            conn.exec_driver_sql("ANALYZE")
+        else:
+            conn.exec_driver_sql(f"PRAGMA analysis_limit = {ANALYSIS_LIMIT}")
+            conn.exec_driver_sql("PRAGMA optimize")
+        conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+        return {
+            "freed_pages": free_before - free_after,
+            "free_pages": free_after,
+            "page_size": conn.exec_driver_sql("PRAGMA page_size").scalar(),
+        }
+
+
+def full_vacuum(engine: Engine) -> None:
+    """Переписывает базу полным VACUUM и включает для нее auto_vacuum = INCREMENTAL.
+
+    incremental_vacuum возвращает только полностью освободившиеся страницы; страницы,
+    оставшиеся заполненными частично (например, после удаления каждой второй строки),
+    уплотняет только VACUUM. Он переписывает весь файл и держит блокировку записи
+    до конца, поэтому выполняется вручную (flask maintenance vacuum), а не в фоне.
+    Для базы, созданной без auto_vacuum = INCREMENTAL, это же включает режим.
+
+    Args:
+        engine: Движок SQLAlchemy, подключенный к базе SQLite.
+    """
+    with _autocommit(engine) as conn:
+        conn.exec_driver_sql("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.exec_driver_sql("VACUUM")
+        conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+
+
+class MaintenanceScheduler:
+    """Фоновый поток, выполняющий обслуживание базы после изменений и по расписанию.
+
+    Attributes:
+        task: Функция обслуживания (например, app.maintain_database).
+        context: Фабрика контекста, в котором выполняется task (например, app.app_context).
+        delay: Через сколько секунд после первого schedule() запускается обслуживание;
+            вызовы schedule() за это время объединяются в один запуск.
+        interval: Период обслуживания без вызовов schedule(), в секундах (0 - только по schedule()).
+        on_error: Вызывается с исключением, если обслуживание завершилось ошибкой.
+    """
+
+    def __init__(self, task: Callable[[], Any], context: Callable[[], ContextManager[Any]],
+                 delay: float = 5.0, interval: float = 0.0,
+                 on_error: Optional[Callable[[BaseException], None]] = None) -> None:
+        """Создает планировщик; поток запускается при первом вызове schedule().
+
+        Args:
+            task: Функция обслуживания.
+            context: Фабрика контекста для task.
+            delay: Задержка запуска после schedule(), в секундах.
+            interval: Период обслуживания по расписанию, в секундах (0 - без расписания).
+            on_error: Обработчик ошибок обслуживания.
+        """
+        self.task: Callable[[], Any] = task
+        self.context: Callable[[], ContextManager[Any]] = context
+        self.delay: float = delay
+        self.interval: float = interval
+        self.on_error: Optional[Callable[[BaseException], None]] = on_error
+        self._requested: threading.Event = threading.Event()
+        self._stopping: threading.Event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock: threading.Lock = threading.Lock()
+        atexit.register(self.close)
+
+    def schedule(self) -> None:
+        """Отмечает, что базе нужно обслуживание; оно выполнится через delay секунд."""
+        self._ensure_started()
+        self._requested.set()
+
+    def close(self) -> None:
+        """Останавливает поток; начатое обслуживание завершается, запланированное отменяется."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None and thread.is_alive():
+            self._stopping.set()
+            self._requested.set()
+            thread.join()
+
+    def _ensure_started(self) -> None:
+        """Запускает поток, если он еще не запущен (в том числе после fork)."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping.clear()
+                self._thread = threading.Thread(target=self._run, name="db-maintenance", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        """Ждет запроса или истечения периода и выполняет обслуживание, пока не получит сигнал остановки."""
+        while True:
+            requested: bool = self._requested.wait(self.interval or None)
+            if requested and self._stopping.wait(self.delay):
+                return
+            if self._stopping.is_set():
+                return
+            self._requested.clear()
+            try:
+                with self.context():
+                    self.task()
+            except Exception as e:
+                if self.on_error is not None:
+                    self.on_error(e)
@@ -0,0 +1,268 @@
+"""Метрики запросов и SQL в формате Prometheus и профилирование отдельных запросов.
+
+Metrics подключается к приложению в create_app:
+- WSGI-обертка замеряет полное время запроса, включая потоковую отдачу тела,
+  и считает байты запроса и ответа
+- события движка SQLAlchemy считают количество и длительность SQL-запросов,
+  в том числе в пределах каждого HTTP-запроса, и пишут в лог медленные запросы
+- GET /metrics отдает все метрики в текстовом формате Prometheus
+- при включенном профилировании запрос с заголовком X-Profile: 1 профилируется
+  (pyinstrument, если установлен, иначе cProfile), а отчет сохраняется в файл;
+  профилировщики импортируются при первом профилировании, а не при запуске
+
+Метрики хранятся в памяти процесса: у каждого воркера многопроцессного
+WSGI-сервера они свои.
+"""
+import io
+import logging
+import os
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from flask import Flask, Response, request
+from sqlalchemy import Engine, event
+
+LATENCY_BUCKETS: Tuple[float, ...] = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS: Tuple[float, ...] = (0, 1, 2, 5, 10, 20, 50, 100, 500)
+PROFILE_HEADER: str = "X-Profile"
+PROFILE_STATS_LINES: int = 50  # Сколько строк отчета cProfile сохраняется
+PROMETHEUS_MIMETYPE: str = "text/plain; version=0.0.4"
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Гистограмма с фиксированными границами корзин, как histogram в Prometheus."""
+
+    def __init__(self, buckets: Tuple[float, ...]) -> None:
+        self.buckets: Tuple[float, ...] = buckets
+        self.counts: List[int] = [0] * len(buckets)
+        self.sum: float = 0.0
+        self.count: int = 0
+
+    def observe(self, value: float) -> None:
+        """Добавляет наблюдение (вызывается под блокировкой Metrics)."""
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+
+class RequestStats:
+    """Счетчики SQL-запросов, выполненных в рамках одного HTTP-запроса."""
+
+    def __init__(self) -> None:
+        self.queries: int = 0
+        self.sql_seconds: float = 0.0
+
+
+def _escape_label(value: str) -> str:
+    """Экранирует значение метки по правилам текстового формата Prometheus."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Labels) -> str:
+    """Форматирует метки в виде {name="value",...}."""
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label(value)}"' for name, value in labels) + "}"
+
+
+class Metrics:
+    """Реестр метрик приложения.
+
+    Attributes:
+        slow_query_seconds: Порог длительности SQL-запроса для записи в лог (None - не писать).
+        profiling: Разрешено ли профилирование запросов заголовком X-Profile.
+        profile_dir: Каталог для отчетов профилировщика.
+        logger: Логгер для медленных запросов.
+    """
+
+    def __init__(self, slow_query_seconds: Optional[float] = None, profiling: bool = False,
+                 profile_dir: Optional[str] = None, logger: Optional[logging.Logger] = None) -> None:
+        self.slow_query_seconds: Optional[float] = slow_query_seconds
+        self.profiling: bool = profiling
+        self.profile_dir: Optional[str] = profile_dir
+        self.logger: logging.Logger = logger or logging.getLogger(__name__)
+        self._lock: threading.Lock = threading.Lock()
+        self._local: threading.local = threading.local()
+        self._histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+
+    def init_app(self, app: Flask) -> None:
+        """Подключает метрики к приложению и добавляет маршрут /metrics; движки БД подключает instrument."""
+        app.wsgi_app = self.wsgi_middleware(app.wsgi_app)
+        app.before_request(self._remember_route)
+        app.add_url_rule("/metrics", "metrics", self.metrics_view)
+        app.extensions["metrics"] = self
+
+    def instrument(self, engine: Engine) -> None:
+        """Подключает метрики SQL-запросов к движку БД (по одному на журнал, см. ledgers.py)."""
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+
+    # --- Сбор ---
+
+    def observe(self, name: str, labels: Labels, value: float, buckets: Tuple[float, ...]) -> None:
+        """Добавляет наблюдение в гистограмму name с метками labels."""
+        with self._lock:
+            histogram = self._histograms.get((name, labels))
+            if histogram is None:
+                histogram = self._histograms[(name, labels)] = Histogram(buckets)
+            histogram.observe(value)
+
+    def inc(self, name: str, labels: Labels = (), value: float = 1) -> None:
+        """Увеличивает счетчик name с метками labels."""
+        with self._lock:
+            self._counters[(name, labels)] = self._counters.get((name, labels), 0) + value
+
+    @staticmethod
+    def _remember_route() -> None:
+        """Сохраняет шаблон маршрута в environ, чтобы WSGI-обертка пометила им метрики."""
+        request.environ["finance.route"] = request.url_rule.rule if request.url_rule else "<unmatched>"
+
+    def _before_cursor_execute(self, conn: Any, cursor: Any, statement: str, parameters: Any,
+                               context: Any, executemany: bool) -> None:
+        context._finance_query_started = time.perf_counter()
+
+    def _after_cursor_execute(self, conn: Any, cursor: Any, statement: str, parameters: Any,
+                              context: Any, executemany: bool) -> None:
+        elapsed: float = time.perf_counter() - context._finance_query_started
+        self.inc("finance_sql_queries_total")
+        self.inc("finance_sql_duration_seconds_total", value=elapsed)
+        stats: Optional[RequestStats] = getattr(self._local, "stats", None)
+        if stats is not None:
+            stats.queries += 1
+            stats.sql_seconds += elapsed
+        if self.slow_query_seconds is not None and elapsed >= self.slow_query_seconds:
+            self.inc("finance_slow_queries_total")
+            self.logger.warning("Slow query (%.1f ms): %s", elapsed * 1000, " ".join(statement.split())[:1000])
+
+    def wsgi_middleware(self, wsgi_app: Callable[..., Iterable[bytes]]) -> Callable[..., Iterable[bytes]]:
+        """Оборачивает WSGI-приложение замером времени, байтов и SQL каждого запроса."""
+        def middleware(environ: Dict[str, Any], start_response: Callable[..., Any]) -> Iterable[bytes]:
+            started: float = time.perf_counter()
+            self._local.stats = stats = RequestStats()
+            profiler, profile_path = self._start_profiler(environ)
+            status: List[str] = ["500"]
+
+            def capture_start_response(status_line: str, headers: List[Tuple[str, str]],
+                                       exc_info: Any = None) -> Any:
+                status[0] = status_line.split(" ", 1)[0]
+                if profile_path is not None:
+                    headers.append(("X-Profile-File", os.path.basename(profile_path)))
+                return start_response(status_line, headers, exc_info)
+
+            def finish(sent: int) -> None:
+                self._local.stats = None
+                if profiler is not None:
+                    self._save_profile(profiler, profile_path)
+                route: str = environ.get("finance.route", "<unmatched>")
+                method: str = environ.get("REQUEST_METHOD", "")
+                self.observe("finance_http_request_duration_seconds",
+                             (("method", method), ("route", route), ("status", status[0])),
+                             time.perf_counter() - started, LATENCY_BUCKETS)
+                self.inc("finance_http_request_bytes_total", (("method", method), ("route", route)),
+                         int(environ.get("CONTENT_LENGTH") or 0))
+                self.inc("finance_http_response_bytes_total", (("method", method), ("route", route)), sent)
+                self.observe("finance_request_sql_queries", (("route", route),), stats.queries, QUERY_COUNT_BUCKETS)
+                self.observe("finance_request_sql_duration_seconds", (("route", route),),
+                             stats.sql_seconds, LATENCY_BUCKETS)
+
+            try:
+                body: Iterable[bytes] = wsgi_app(environ, capture_start_response)
+            except BaseException:
+                finish(0)
+                raise
+            return _CountingIterable(body, finish)
+
+        return middleware
+
+    # --- Профилирование ---
+
+    def _start_profiler(self, environ: Dict[str, Any]) -> Tuple[Any, Optional[str]]:
+        """Запускает профилировщик, если он разрешен и запрошен заголовком X-Profile."""
+        if not self.profiling or environ.get("HTTP_" + PROFILE_HEADER.upper().replace("-", "_")) != "1":
+            return None, None
+        os.makedirs(self.profile_dir, exist_ok=True)
+        name: str = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}.txt"
+        try:
+            from pyinstrument import Profiler as SamplingProfiler  # Необязательная зависимость
+        except ImportError:
+            import cProfile
+            profiler = cProfile.Profile()
+            profiler.enable()
+        else:
+            profiler = SamplingProfiler()
+            profiler.start()
+        return profiler, os.path.join(self.profile_dir, name)
+
+    def _save_profile(self, profiler: Any, path: str) -> None:
+        """Останавливает профилировщик и записывает текстовый отчет."""
+        if hasattr(profiler, "output_text"):  # pyinstrument
+            profiler.stop()
+            report: str = profiler.output_text()
+        else:
+            import pstats
+            profiler.disable()
+            buffer = io.StringIO()
+            pstats.Stats(profiler, stream=buffer).sort_stats("cumulative").print_stats(PROFILE_STATS_LINES)
+            report = buffer.getvalue()
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(report)
+
+    # --- Экспорт ---
+
+    def render(self) -> str:
+        """Возвращает все метрики в текстовом формате Prometheus."""
+        with self._lock:
+            histograms = {key: (list(h.counts), h.sum, h.count, h.buckets) for key, h in self._histograms.items()}
+            counters = dict(self._counters)
+        lines: List[str] = []
+        for name in sorted({name for name, _ in histograms}):
+            lines.append(f"# TYPE {name} histogram")
+            for (metric, labels), (counts, total, count, buckets) in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, bucket_count in zip(buckets, counts):
+                    cumulative += bucket_count
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', repr(float(bound))),))} {cumulative}")
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {total}")
+                lines.append(f"{name}_count{_format_labels(labels)} {count}")
+        for name in sorted({name for name, _ in counters}):
+            lines.append(f"# TYPE {name} counter")
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def metrics_view(self) -> Response:
+        """Обработчик GET /metrics."""
+        return Response(self.render(), mimetype=PROMETHEUS_MIMETYPE)
+
+
+class _CountingIterable:
+    """Тело WSGI-ответа, считающее отданные байты и вызывающее on_close после отдачи."""
+
+    def __init__(self, body: Iterable[bytes], on_close: Callable[[int], None]) -> None:
+        self._body: Iterable[bytes] = body
+        self._on_close: Callable[[int], None] = on_close
+        self._sent: int = 0
+
+    def __iter__(self) -> Iterable[bytes]:
+        for chunk in self._body:
+            self._sent += len(chunk)
+            yield chunk
+
+    def close(self) -> None:
+        try:
+            if hasattr(self._body, "close"):
+                self._body.close()
+        finally:
+            self._on_close(self._sent)
@@ -0,0 +1,408 @@
+"""Миграции схемы базы данных SQLite.
+
+Версия схемы хранится в PRAGMA user_version. Новая база создается сразу по
+текущим моделям, а существующая (например, instance/transactions.db)
+последовательно проходит все миграции, которые к ней еще не применялись.
+Каждая миграция выполняется в той же транзакции, что и запись новой версии,
+поэтому при ошибке база остается в прежнем состоянии.
+
+Производные таблицы (например, category_totals) поддерживаются триггерами из
+TRIGGERS. Они создаются при каждом вызове upgrade, если их еще нет. Так же
+создаются виртуальные таблицы из VIRTUAL_TABLES, которых нет среди моделей.
+Массовая вставка (импорт CSV) поднимает флаг ledger_state.bulk_insert, и
+триггеры AFTER INSERT пропускают ее строки: производные таблицы обновляются
+запросами BULK_INSERT_STATEMENTS один раз на пачку.
+"""
+import calendar
+import re
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import Connection, Engine, MetaData, inspect
+
+ISO_DATE_RE = re.compile(r"^\s*(\d{4})-(\d{1,2})-(\d{1,2})\s*$")
+DOTTED_DATE_RE = re.compile(r"^\s*(\d{1,2})\.(\d{1,2})\.(\d{4})\s*$")
+
+# Виртуальные таблицы SQLite, которые не описываются моделями SQLAlchemy
+VIRTUAL_TABLES: Dict[str, str] = {
+    # Полнотекстовый индекс FTS5 по описанию и категории. Таблица external content:
+    # текст хранится только в transactions, индекс ссылается на него по rowid = id.
+    # prefix ускоряет поиск по началу слова из 2 и 3 символов
+    "transactions_fts": """
+        CREATE VIRTUAL TABLE IF NOT EXISTS transactions_fts USING fts5(
+            description, category,
+            content='transactions', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )
+    """,
+}
+
+# Условие триггеров AFTER INSERT: строки массовой вставки обрабатывает BULK_INSERT_STATEMENTS
+BULK_INSERT_OFF: str = "WHEN NOT (SELECT bulk_insert FROM ledger_state WHERE id = 1)"
+INSERT_TRIGGERS: Tuple[str, ...] = (
+    "category_totals_after_insert", "transactions_fts_after_insert", "changes_after_insert",
+)
+
+# Триггеры, поддерживающие производные таблицы в той же транзакции, что и изменения transactions
+TRIGGERS: Dict[str, str] = {
+    "category_totals_after_insert": f"""
+        CREATE TRIGGER IF NOT EXISTS category_totals_after_insert AFTER INSERT ON transactions
+        {BULK_INSERT_OFF}
+        BEGIN
+            INSERT INTO category_totals (type, category, month, total, count)
+            VALUES (NEW.type, NEW.category, substr(NEW.date, 1, 7), NEW.amount, 1)
+            ON CONFLICT (type, category, month)
+            DO UPDATE SET total = total + excluded.total, count = count + 1;
+        END
+    """,
+    "category_totals_after_delete": """
+        CREATE TRIGGER IF NOT EXISTS category_totals_after_delete AFTER DELETE ON transactions
+        BEGIN
+            UPDATE category_totals SET total = total - OLD.amount, count = count - 1
+            WHERE type = OLD.type AND category = OLD.category AND month = substr(OLD.date, 1, 7);
+            DELETE FROM category_totals
+            WHERE type = OLD.type AND category = OLD.category AND month = substr(OLD.date, 1, 7) AND count <= 0;
+        END
+    """,
+    "category_totals_after_update": """
+        CREATE TRIGGER IF NOT EXISTS category_totals_after_update
+        AFTER UPDATE OF amount, category, date, type ON transactions
+        BEGIN
+            UPDATE category_totals SET total = total - OLD.amount, count = count - 1
+            WHERE type = OLD.type AND category = OLD.category AND month = substr(OLD.date, 1, 7);
+            DELETE FROM category_totals
+            WHERE type = OLD.type AND category = OLD.category AND month = substr(OLD.date, 1, 7) AND count <= 0;
+            INSERT INTO category_totals (type, category, month, total, count)
+            VALUES (NEW.type, NEW.category, substr(NEW.date, 1, 7), NEW.amount, 1)
+            ON CONFLICT (type, category, month)
+            DO UPDATE SET total = total + excluded.total, count = count + 1;
+        END
+    """,
+    "transactions_fts_after_insert": f"""
+        CREATE TRIGGER IF NOT EXISTS transactions_fts_after_insert AFTER INSERT ON transactions
+        {BULK_INSERT_OFF}
+        BEGIN
+            INSERT INTO transactions_fts (rowid, description, category)
+            VALUES (NEW.id, NEW.description, NEW.category);
+        END
+    """,
+    "transactions_fts_after_delete": """
+        CREATE TRIGGER IF NOT EXISTS transactions_fts_after_delete AFTER DELETE ON transactions
+        BEGIN
+            INSERT INTO transactions_fts (transactions_fts, rowid, description, category)
+            VALUES ('delete', OLD.id, OLD.description, OLD.category);
+        END
+    """,
+    "transactions_fts_after_update": """
+        CREATE TRIGGER IF NOT EXISTS transactions_fts_after_update
+        AFTER UPDATE OF description, category ON transactions
+        BEGIN
+            INSERT INTO transactions_fts (transactions_fts, rowid, description, category)
+            VALUES ('delete', OLD.id, OLD.description, OLD.category);
+            INSERT INTO transactions_fts (rowid, description, category)
+            VALUES (NEW.id, NEW.description, NEW.category);
+        END
+    """,
+    "changes_after_insert": f"""
+        CREATE TRIGGER IF NOT EXISTS changes_after_insert AFTER INSERT ON transactions
+        {BULK_INSERT_OFF}
+        BEGIN
+            INSERT INTO changes (op, transaction_id) VALUES ('upsert', NEW.id);
+        END
+    """,
+    "changes_after_update": """
+        CREATE TRIGGER IF NOT EXISTS changes_after_update AFTER UPDATE ON transactions
+        BEGIN
+            INSERT INTO changes (op, transaction_id) VALUES ('upsert', NEW.id);
+        END
+    """,
+    "changes_after_delete": """
+        CREATE TRIGGER IF NOT EXISTS changes_after_delete AFTER DELETE ON transactions
+        BEGIN
+            INSERT INTO changes (op, transaction_id) VALUES ('delete', OLD.id);
+        END
+    """,
+}
+
+# То же, что триггеры AFTER INSERT, для всех строк пачки с id > :after_id сразу
+BULK_INSERT_STATEMENTS: Tuple[str, ...] = (
+    """
+    INSERT INTO category_totals (type, category, month, total, count)
+    SELECT type, category, substr(date, 1, 7), sum(amount), count(*)
+    FROM transactions WHERE id > :after_id GROUP BY type, category, substr(date, 1, 7)
+    ON CONFLICT (type, category, month)
+    DO UPDATE SET total = total + excluded.total, count = count + excluded.count
+    """,
+    """
+    INSERT INTO transactions_fts (rowid, description, category)
+    SELECT id, description, category FROM transactions WHERE id > :after_id
+    """,
+    """
+    INSERT INTO changes (op, transaction_id)
+    SELECT 'upsert', id FROM transactions WHERE id > :after_id ORDER BY id
+    """,
+)
+
+
+def normalize_legacy_date(value: str) -> Optional[str]:
+    """Приводит дату из старой строковой колонки к формату "YYYY-MM-DD".
+
+    Понимает форматы "YYYY-MM-DD" и "DD.MM.YYYY". Несуществующий день месяца
+    (например, "2023-06-31") заменяется последним днем этого месяца.
+
+    Args:
+        value: Исходная строка даты.
+
+    Returns:
+        Optional[str]: Дата в ISO-формате или None, если строку не удалось разобрать.
+    """
+    if match := ISO_DATE_RE.match(value):
+        year, month, day = (int(part) for part in match.groups())
+    elif match := DOTTED_DATE_RE.match(value):
+        day, month, year = (int(part) for part in match.groups())
+    else:
+        return None
+    if not 1 <= month <= 12 or day < 1:
+        return None
+    day = min(day, calendar.monthrange(year, month)[1])
+    return f"{year:04d}-{month:02d}-{day:02d}"
+
+
+def _typed_date_and_indexes(conn: Connection) -> None:
+    """Переводит колонку date в тип DATE и добавляет вторичные индексы."""
+    fixed: List[Tuple[str, int]] = []
+    invalid: List[int] = []
+    for transaction_id, value in conn.exec_driver_sql("SELECT id, date FROM transactions"):
+        normalized = normalize_legacy_date(value)
+        if normalized is None:
+            invalid.append(transaction_id)
+        elif normalized != value:
+            fixed.append((normalized, transaction_id))
+    if invalid:
+        raise RuntimeError(f"Cannot parse date of transactions with ids: {invalid}")
+
+    # SQLite не умеет менять тип колонки, поэтому пересоздаем таблицу
+    conn.exec_driver_sql("""
+        CREATE TABLE transactions_new (
+            id INTEGER NOT NULL,
+            amount FLOAT NOT NULL,
+            category VARCHAR NOT NULL,
+            date DATE NOT NULL,
+            type VARCHAR NOT NULL,
+            description VARCHAR NOT NULL,
+            PRIMARY KEY (id)
+        )
+    """)
+    conn.exec_driver_sql("""
+        INSERT INTO transactions_new (id, amount, category, date, type, description)
+        SELECT id, amount, category, date, type, description FROM transactions
+    """)
+    if fixed:
+        conn.exec_driver_sql("UPDATE transactions_new SET date = ? WHERE id = ?", fixed)
+    conn.exec_driver_sql("DROP TABLE transactions")
+    conn.exec_driver_sql("ALTER TABLE transactions_new RENAME TO transactions")
+    conn.exec_driver_sql("CREATE INDEX ix_transactions_type_category_date ON transactions (type, category, date)")
+    conn.exec_driver_sql("CREATE INDEX ix_transactions_date ON transactions (date)")
+
+
+def _category_totals(conn: Connection) -> None:
+    """Создает сводную таблицу category_totals и заполняет ее по transactions."""
+    conn.exec_driver_sql("""
+        CREATE TABLE category_totals (
+            type VARCHAR NOT NULL,
+            category VARCHAR NOT NULL,
+            month VARCHAR NOT NULL,
+            total FLOAT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (type, category, month)
+        )
+    """)
+    conn.exec_driver_sql("""
+        INSERT INTO category_totals (type, category, month, total, count)
+        SELECT type, category, substr(date, 1, 7), sum(amount), count(*)
+        FROM transactions GROUP BY type, category, substr(date, 1, 7)
+    """)
+
+
+def _ledger_state(conn: Connection) -> None:
+    """Создает таблицу ledger_state с версией журнала."""
+    conn.exec_driver_sql("""
+        CREATE TABLE ledger_state (
+            id INTEGER NOT NULL,
+            version INTEGER NOT NULL,
+            PRIMARY KEY (id)
+        )
+    """)
+    conn.exec_driver_sql("INSERT INTO ledger_state (id, version) VALUES (1, 0)")
+
+
+def _changes_log(conn: Connection) -> None:
+    """Создает журнал изменений changes и записывает в него существующие транзакции."""
+    conn.exec_driver_sql("""
+        CREATE TABLE changes (
+            seq INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT,
+            op VARCHAR NOT NULL,
+            transaction_id INTEGER NOT NULL
+        )
+    """)
+    conn.exec_driver_sql("""
+        INSERT INTO changes (op, transaction_id)
+        SELECT 'upsert', id FROM transactions ORDER BY id
+    """)
+
+
+def _sort_indexes(conn: Connection) -> None:
+    """Добавляет индексы для сортировки списка транзакций по сумме и категории."""
+    conn.exec_driver_sql("CREATE INDEX ix_transactions_amount ON transactions (amount)")
+    conn.exec_driver_sql("CREATE INDEX ix_transactions_category ON transactions (category)")
+
+
+def _search_index(conn: Connection) -> None:
+    """Создает полнотекстовый индекс transactions_fts и заполняет его по transactions."""
+    conn.exec_driver_sql(VIRTUAL_TABLES["transactions_fts"])
+    conn.exec_driver_sql("INSERT INTO transactions_fts (transactions_fts) VALUES ('rebuild')")
+
+
+def _integer_amounts(conn: Connection) -> None:
+    """Переводит суммы из рублей с плавающей точкой в целые копейки.
+
+    SQLite не умеет менять тип колонки, поэтому transactions и category_totals
+    пересоздаются. id сохраняются, поэтому полнотекстовый индекс и журнал
+    изменений остаются согласованными; индексы создаются заново, а триггеры -
+    в upgrade после миграций.
+    """
+    conn.exec_driver_sql("""
+        CREATE TABLE transactions_new (
+            id INTEGER NOT NULL,
+            amount INTEGER NOT NULL,
+            category VARCHAR NOT NULL,
+            date DATE NOT NULL,
+            type VARCHAR NOT NULL,
+            description VARCHAR NOT NULL,
+            PRIMARY KEY (id)
+        )
+    """)
+    conn.exec_driver_sql("""
+        INSERT INTO transactions_new (id, amount, category, date, type, description)
+        SELECT id, CAST(round(amount * 100) AS INTEGER), category, date, type, description FROM transactions
+    """)
+    conn.exec_driver_sql("DROP TABLE transactions")
+    conn.exec_driver_sql("ALTER TABLE transactions_new RENAME TO transactions")
+    conn.exec_driver_sql("CREATE INDEX ix_transactions_type_category_date ON transactions (type, category, date)")
+    conn.exec_driver_sql("CREATE INDEX ix_transactions_date ON transactions (date)")
+    conn.exec_driver_sql("CREATE INDEX ix_transactions_amount ON transactions (amount)")
+    conn.exec_driver_sql("CREATE INDEX ix_transactions_category ON transactions (category)")
+
+    conn.exec_driver_sql("DROP TABLE category_totals")
+    conn.exec_driver_sql("""
+        CREATE TABLE category_totals (
+            type VARCHAR NOT NULL,
+            category VARCHAR NOT NULL,
+            month VARCHAR NOT NULL,
+            total INTEGER NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (type, category, month)
+        )
+    """)
+    conn.exec_driver_sql("""
+        INSERT INTO category_totals (type, category, month, total, count)
+        SELECT type, category, substr(date, 1, 7), sum(amount), count(*)
+        FROM transactions GROUP BY type, category, substr(date, 1, 7)
+    """)
+
+
+def _bulk_insert_flag(conn: Connection) -> None:
+    """Добавляет флаг массовой вставки ledger_state.bulk_insert.
+
+    Триггеры AFTER INSERT удаляются: upgrade создает их заново с условием BULK_INSERT_OFF.
+    """
+    conn.exec_driver_sql("ALTER TABLE ledger_state ADD COLUMN bulk_insert BOOLEAN NOT NULL DEFAULT 0")
+    for trigger in INSERT_TRIGGERS:
+        conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {trigger}")
+
+
+def _autoincrement_ids(conn: Connection) -> None:
+    """Пересоздает transactions с AUTOINCREMENT, чтобы id удаленных транзакций не выдавались заново.
+
+    Без AUTOINCREMENT SQLite выдает новой транзакции max(id) + 1, то есть id последней
+    удаленной. Счетчик sqlite_sequence начинается с наибольшего id, который уже мог
+    встречаться: в журнале, в корзине, в журнале изменений и в ключах идемпотентности
+    (иначе повтор запроса с ключом вернул бы id чужой транзакции). Запись корзины, чей id
+    уже занят в журнале другой транзакцией, получает новый id из счетчика.
+    id транзакций сохраняются; индексы создаются заново, а триггеры - в upgrade.
+    """
+    conn.exec_driver_sql("""
+        CREATE TABLE transactions_new (
+            id INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT,
+            amount INTEGER NOT NULL,
+            category VARCHAR NOT NULL,
+            date DATE NOT NULL,
+            type VARCHAR NOT NULL,
+            description VARCHAR NOT NULL
+        )
+    """)
+    conn.exec_driver_sql("""
+        INSERT INTO transactions_new (id, amount, category, date, type, description)
+        SELECT id, amount, category, date, type, description FROM transactions
+    """)
+    conn.exec_driver_sql("DROP TABLE transactions")
+    conn.exec_driver_sql("ALTER TABLE transactions_new RENAME TO transactions")
+    conn.exec_driver_sql("CREATE INDEX ix_transactions_type_category_date ON transactions (type, category, date)")
+    conn.exec_driver_sql("CREATE INDEX ix_transactions_date ON transactions (date)")
+    conn.exec_driver_sql("CREATE INDEX ix_transactions_amount ON transactions (amount)")
+    conn.exec_driver_sql("CREATE INDEX ix_transactions_category ON transactions (category)")
+
+    used_ids: List[str] = ["SELECT max(id) FROM transactions", "SELECT max(transaction_id) FROM changes"]
+    has_trash: bool = inspect(conn).has_table("deleted_transactions")
+    if has_trash:
+        used_ids.append("SELECT max(id) FROM deleted_transactions")
+    if inspect(conn).has_table("idempotency_keys"):
+        used_ids.append("SELECT max(transaction_id) FROM idempotency_keys")
+    seq: int = max(conn.exec_driver_sql(query).scalar() or 0 for query in used_ids)
+    if has_trash:
+        reused: List[int] = list(conn.exec_driver_sql(
+            "SELECT id FROM deleted_transactions WHERE id IN (SELECT id FROM transactions) ORDER BY id").scalars())
+        for transaction_id in reused:
+            seq += 1
+            conn.exec_driver_sql("UPDATE deleted_transactions SET id = ? WHERE id = ?", (seq, transaction_id))
+    conn.exec_driver_sql("DELETE FROM sqlite_sequence WHERE name = 'transactions'")
+    conn.exec_driver_sql("INSERT INTO sqlite_sequence (name, seq) VALUES ('transactions', ?)", (seq,))
+
+
+# Порядок менять нельзя: номер миграции - это ее позиция в списке
+MIGRATIONS: List[Callable[[Connection], None]] = [
+    _typed_date_and_indexes,
+    _category_totals,
+    _ledger_state,
+    _changes_log,
+    _sort_indexes,
+    _search_index,
+    _integer_amounts,
+    _bulk_insert_flag,
+    _autoincrement_ids,
+]
+
+
+def upgrade(engine: Engine, metadata: MetaData) -> None:
+    """Приводит схему базы данных к актуальной версии.
+
+    Args:
+        engine: Движок SQLAlchemy, подключенный к базе.
+        metadata: Метаданные моделей, по которым создается новая база.
+    """
+    with engine.begin() as conn:
+        # pysqlite сам открывает транзакцию только перед DML, а миграциям нужен и DDL.
+        # IMMEDIATE сразу берет блокировку записи: процессы WSGI-сервера, стартующие
+        # одновременно, обновляют схему по очереди
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+        version: int = conn.exec_driver_sql("PRAGMA user_version").scalar()
+        if version == 0 and not inspect(conn).has_table("transactions"):
+            metadata.create_all(conn)
+        else:
+            for migration in MIGRATIONS[version:]:
+                migration(conn)
+            metadata.create_all(conn)  # Таблицы, появившиеся в моделях без отдельной миграции
+        for virtual_table in VIRTUAL_TABLES.values():
+            conn.exec_driver_sql(virtual_table)
+        for trigger in TRIGGERS.values():
+            conn.exec_driver_sql(trigger)
+        conn.exec_driver_sql(f"PRAGMA user_version = {len(MIGRATIONS)}")
@@ -0,0 +1,130 @@
+"""Групповая фиксация (group commit) одиночных вставок.
+
+Каждый POST /api/transactions без очереди выполняет свой коммит: SQLite
+сериализует писателей, и при конкурентной нагрузке запросы стоят в очереди
+за блокировкой записи. GroupCommitWriter собирает строки из многих запросов
+в фоновом потоке и записывает их одной транзакцией, как только набралось
+max_rows строк или прошло interval_ms миллисекунд с первой строки пачки.
+"""
+import atexit
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, ContextManager, Dict, List, Optional, Tuple
+
+DURABILITY_MODES: Tuple[str, ...] = ("full", "async")
+
+
+class GroupCommitWriter:
+    """Фоновый писатель, фиксирующий вставки пачками.
+
+    Режимы надежности:
+    - "full" - запрос ждет коммита пачки и получает id транзакции
+    - "async" - запрос получает подтверждение сразу после постановки в очередь;
+      строки, не успевшие записаться до аварийной остановки процесса, теряются
+
+    Attributes:
+        flush: Функция, записывающая список строк одной транзакцией и возвращающая их id.
+        context: Фабрика контекста, в котором выполняется flush (например, app.app_context).
+        max_rows: Максимальное количество строк в одной пачке.
+        interval_ms: Сколько миллисекунд пачка ждет новых строк после первой.
+        durability: Режим надежности ("full" или "async").
+        on_error: Вызывается с исключением, если пачку не удалось записать.
+    """
+
+    def __init__(self, flush: Callable[[List[Dict[str, Any]]], List[int]],
+                 context: Callable[[], ContextManager[Any]], max_rows: int = 500,
+                 interval_ms: float = 5.0, durability: str = "full",
+                 on_error: Optional[Callable[[BaseException], None]] = None) -> None:
+        """Создает писателя; поток запускается при первой вставке.
+
+        Args:
+            flush: Функция записи пачки строк.
+            context: Фабрика контекста для flush.
+            max_rows: Максимальное количество строк в пачке.
+            interval_ms: Максимальное ожидание новых строк после первой, в миллисекундах.
+            durability: Режим надежности ("full" или "async").
+            on_error: Обработчик ошибок записи пачки.
+
+        Raises:
+            ValueError: Если режим надежности неизвестен.
+        """
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"Unknown durability mode: {durability}, expected one of {DURABILITY_MODES}")
+        self.flush: Callable[[List[Dict[str, Any]]], List[int]] = flush
+        self.context: Callable[[], ContextManager[Any]] = context
+        self.max_rows: int = max_rows
+        self.interval_ms: float = interval_ms
+        self.durability: str = durability
+        self.on_error: Optional[Callable[[BaseException], None]] = on_error
+        self._queue: "queue.Queue[Optional[Tuple[Dict[str, Any], Future]]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock: threading.Lock = threading.Lock()
+        atexit.register(self.close)  # Не теряем очередь при штатной остановке процесса
+
+    def submit(self, row: Dict[str, Any]) -> Future:
+        """Ставит строку в очередь на запись.
+
+        Args:
+            row: Значения колонок транзакции (см. validate_transaction).
+
+        Returns:
+            Future: Завершится id транзакции после коммита пачки или исключением записи.
+        """
+        self._ensure_started()
+        future: Future = Future()
+        self._queue.put((row, future))
+        return future
+
+    def close(self) -> None:
+        """Записывает оставшиеся в очереди строки и останавливает поток."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None and thread.is_alive():
+            self._queue.put(None)
+            thread.join()
+
+    def _ensure_started(self) -> None:
+        """Запускает поток писателя, если он еще не запущен (в том числе после fork)."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="group-commit-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        """Собирает пачки из очереди и записывает их, пока не получит сигнал остановки."""
+        stopping: bool = False
+        while not stopping:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch: List[Tuple[Dict[str, Any], Future]] = [item]
+            deadline: float = time.monotonic() + self.interval_ms / 1000
+            while len(batch) < self.max_rows:
+                timeout: float = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True  # Записываем накопленное и выходим
+                    break
+                batch.append(item)
+            self._write(batch)
+
+    def _write(self, batch: List[Tuple[Dict[str, Any], Future]]) -> None:
+        """Записывает пачку одной транзакцией и завершает Future каждой строки."""
+        try:
+            with self.context():
+                ids: List[int] = self.flush([row for row, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            if self.on_error is not None:
+                self.on_error(e)
+            return
+        for (_, future), transaction_id in zip(batch, ids):
+            future.set_result(transaction_id)
@@ -0,0 +1,20 @@
+"""Точка входа для многопроцессного WSGI-сервера.
+
+Пример запуска из каталога server:
+    gunicorn --workers 4 --bind 0.0.0.0:5000 wsgi:app
+
+Каждый процесс создает свое приложение и свой пул соединений. Схема БД
+обновляется при импорте модуля; миграции берут блокировку записи
+(BEGIN IMMEDIATE), поэтому одновременно стартующие процессы выполняют
+их по очереди. Базы остальных журналов (см. ledgers.py) каждый процесс
+открывает и обновляет сам при первом запросе к журналу.
+"""
+from flask import Flask
+
+from app import create_app, db
+from migrations import upgrade
+
+app: Flask = create_app()
+with app.app_context():
+    upgrade(db.engine, db.metadata)
+    db.engine.dispose()  # Не передаем открытые соединения в процессы, созданные fork (gunicorn --preload)